@@ -0,0 +1,54 @@
+# Times building, loading and querying the gazetteer index, and checks what
+# it costs at import time.
+#
+#   python -m benchmarks.bench_gazetteer
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from src.gazetteer import Gazetteer, load_gazetteer
+
+LOCATIONS = [
+    "New York, NY", "San Francisco, California; Remote", "Austin TX",
+    "Remote - US", "St. Louis, MO", "Washington, DC", "Brooklyn",
+    "Hybrid in Chicago, IL or Denver, CO", "London, United Kingdom",
+]
+
+
+def import_time_us(module: str) -> int:
+  # Cumulative microseconds for `module` as reported by -X importtime.
+  output = subprocess.run(
+      [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+      capture_output=True, text=True).stderr
+  for line in output.splitlines():
+    if line.rstrip().endswith(f"| {module}"):
+      return int(line.split("|")[1])
+  return -1
+
+
+def main():
+  start = time.perf_counter()
+  Gazetteer.build()
+  print(f"build from fixed_data.py: {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+  with tempfile.TemporaryDirectory() as directory:
+    index_path = os.path.join(directory, "gazetteer.pickle")
+    load_gazetteer(index_path)
+    start = time.perf_counter()
+    gazetteer = load_gazetteer(index_path)
+    print(f"load pickled index:       {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+  per_lookup = min(timeit.repeat(
+      lambda: [gazetteer.resolve(location) for location in LOCATIONS],
+      number=200, repeat=5)) / (200 * len(LOCATIONS))
+  print(f"resolve one location:     {per_lookup * 1e6:8.1f} us")
+
+  for module in ("src.fixed_data", "src.gazetteer", "src.parse"):
+    print(f"import {module + ':':<19}{import_time_us(module) / 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+  main()
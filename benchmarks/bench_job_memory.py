@@ -0,0 +1,46 @@
+# Memory held by parse_jobs' output, per 100k jobs: what the passed and
+# failed lists keep alive once a board is parsed, measured with tracemalloc.
+# Runs in lean mode so the jobs' raw JSON (json_str) doesn't dominate.
+#
+#   python -m benchmarks.bench_job_memory [jobs] [description bytes]
+import contextlib
+import gc
+import io
+import sys
+import tracemalloc
+
+from benchmarks.mock_server import make_postings, post_board_job
+from src.parse import parse_jobs
+
+CRITERIA = {
+    "location_whitelist": ["new york", "brooklyn"],
+    "role_terms": ["engineer", "creator"],
+    "title_blacklist": ["senior"],
+    "max_years_of_experience": 3,
+}
+API_DEFINITION = {"response": {"root": "jobs", "job_format": {
+    "title": "title", "url": "url_name", "description": "description",
+    "location": "loc.places", "created_at": "created",
+    "updated_at": "updated"}}}
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+  jobs = [post_board_job(posting) for posting in make_postings(count, size)]
+  gc.collect()
+  tracemalloc.start()
+  with contextlib.redirect_stdout(io.StringIO()):
+    result = parse_jobs(iter(jobs), API_DEFINITION, "Example", CRITERIA,
+                        lean=True)
+  gc.collect()
+  held = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  parsed = len(result["passed"]) + len(result["failed"])
+  print(f"{parsed} jobs, {size} byte descriptions: "
+        f"{held / 2**20:.1f} MB held, "
+        f"{held / 2**20 / parsed * 100000:.1f} MB per 100k jobs")
+
+
+if __name__ == "__main__":
+  main()
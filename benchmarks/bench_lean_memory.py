@@ -0,0 +1,62 @@
+# Peak RSS of parsing one large board with and without lean mode. Each mode
+# runs in its own process so the numbers don't share a high-water mark.
+#
+#   python -m benchmarks.bench_lean_memory [jobs] [description bytes]
+import json
+import os
+import resource
+import subprocess
+import sys
+
+from benchmarks.corpus import descriptions
+from src.parse import parse_jobs
+
+CRITERIA = {
+    "location_whitelist": ["new york"],
+    "role_terms": ["engineer"],
+    "title_blacklist": ["senior"],
+    "max_years_of_experience": 3,
+}
+API_DEFINITION = {"response": {"root": "jobs", "job_format": {
+    "title": "title", "url": "url", "description": "content",
+    "location": "location"}}}
+
+
+def peak_rss_mb() -> float:
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(lean: bool, count: int, size: int):
+  data = {"jobs": [
+      {"title": "Software Engineer", "url": f"https://example.com/{i}",
+       "content": text, "location": "Remote"}
+      for i, text in enumerate(descriptions(count, size))]}
+  baseline = peak_rss_mb()
+  sys.stdout = open(os.devnull, "w")
+  jobs = parse_jobs(data, API_DEFINITION, "Example", CRITERIA, lean=lean)
+  with open(os.devnull, "w") as f:
+    json.dump([job.to_dict() for job in jobs["failed"]], f, indent=2,
+              default=str)
+  sys.stdout = sys.__stdout__
+  print(json.dumps({"baseline": baseline, "peak": peak_rss_mb()}))
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+  print(f"{count} jobs, {size} byte descriptions")
+  for lean in (False, True):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_lean_memory", "--child",
+         str(int(lean)), str(count), str(size)],
+        capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"{'lean' if lean else 'full':>5}: peak RSS {result['peak']:7.1f} MB "
+          f"({result['peak'] - result['baseline']:+.1f} MB while parsing)")
+
+
+if __name__ == "__main__":
+  if sys.argv[1:2] == ["--child"]:
+    run(bool(int(sys.argv[2])), int(sys.argv[3]), int(sys.argv[4]))
+  else:
+    main()
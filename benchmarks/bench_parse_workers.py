@@ -0,0 +1,43 @@
+# Parse throughput of one large board serially and on process pools.
+#
+#   python -m benchmarks.bench_parse_workers [jobs] [max workers]
+import contextlib
+import io
+import os
+import sys
+import time
+
+from benchmarks.bench_lean_memory import API_DEFINITION, CRITERIA
+from benchmarks.corpus import descriptions
+from src.parse import create_parse_pool, parse_jobs
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+  max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+  data = {"jobs": [
+      {"title": "Software Engineer", "url": f"https://example.com/{i}",
+       "content": text, "location": "Remote"}
+      for i, text in enumerate(descriptions(count, 3000))]}
+  print(f"{count} jobs, {os.cpu_count()} CPUs")
+
+  workers = 0
+  while workers <= max_workers:
+    pool = create_parse_pool(workers, CRITERIA) if workers else None
+    if pool is not None:
+      # Start the workers before timing
+      pool.submit(len, []).result()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+      parse_jobs(data, API_DEFINITION, "Example", CRITERIA, lean=True,
+                 executor=pool)
+    elapsed = time.perf_counter() - start
+    if pool is not None:
+      pool.shutdown()
+    label = f"{workers} workers" if workers else "serial"
+    print(f"{label:>10}: {count / elapsed:9.0f} jobs/s")
+    workers = workers * 2 if workers else 1
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,210 @@
+# End-to-end and per-stage throughput against the mock boards: fetch
+# (fetch_data_from_board), parse (parse_jobs) and feed (convert_to_rss and
+# RssWriter), then the whole of main(). Results go to a JSON file; pass an
+# earlier one with --compare to see what changed between commits.
+#
+#   python -m benchmarks.bench_pipeline --jobs 2000 --latency-ms 20
+#   python -m benchmarks.bench_pipeline --compare before.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.mock_server import MockBoards, example_boards
+from src.apis import fetch_data_from_board
+from src.main import main as run_main
+from src.parse import get_json_key, parse_jobs
+from src.plans import compile_adapters
+from src.rss import RssWriter, convert_to_rss
+from src.timings import timings
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      description="Time fetch, parse and feed stages against mock boards.")
+  parser.add_argument("--jobs", type=int, default=1000,
+                      help="Jobs per board")
+  parser.add_argument("--description-size", type=int, default=3000,
+                      help="Bytes per job description")
+  parser.add_argument("--latency-ms", type=float, default=0,
+                      help="Added to every request to the mock boards")
+  parser.add_argument("--boards", type=int, default=1,
+                      help="Boards of each shape (GET and paginated POST)")
+  parser.add_argument("--repeat", type=int, default=3,
+                      help="Runs per stage; the fastest is kept")
+  parser.add_argument("--main-args", default="",
+                      help="Extra arguments for the end-to-end run, e.g. "
+                      "--main-args='--lean --workers 2'")
+  parser.add_argument("--output", default="bench_pipeline.json")
+  parser.add_argument("--compare", default=None,
+                      help="Earlier result file to compare against")
+  return parser.parse_args(argv)
+
+
+def downloaded_bytes() -> float:
+  return sum(value for (name, _), value in timings.counters.items()
+             if name == "downloaded_bytes")
+
+
+def best_of(repeat: int, run) -> float:
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def stage(seconds: float, jobs: int, **extra) -> Dict:
+  return {"seconds": round(seconds, 4),
+          "jobs_per_second": round(jobs / seconds, 1) if seconds else None,
+          **extra}
+
+
+def commit() -> str | None:
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                          capture_output=True, text=True,
+                          check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def run_stages(args: argparse.Namespace, mock: MockBoards) -> Dict:
+  api_definitions, board_configs = example_boards(mock, args.boards)
+  with open("src/criteria.example.json", "r") as f:
+    criteria = json.load(f)
+  adapters = compile_adapters(api_definitions)
+  boards = [(board, adapters[board["adapter"]].hydrate(board.get("api_vars")))
+            for board in board_configs]
+  total_jobs = args.jobs * len(boards)
+  stages = {}
+
+  # Fetch: download and decode every board. Streamed boards are read to the
+  # end here so the stage covers their whole body.
+  fetched = []
+
+  def fetch():
+    fetched.clear()
+    for board, api_def in boards:
+      data = fetch_data_from_board(board["board_uri"], api_def)
+      if isinstance(data, Iterator):
+        data = list(data)
+      else:
+        data = get_json_key(data, api_def["response"]["root"])
+      fetched.append(data)
+
+  bytes_before = downloaded_bytes()
+  requests_before = mock.requests
+  seconds = best_of(args.repeat, fetch)
+  body_bytes = (downloaded_bytes() - bytes_before) / args.repeat
+  stages["fetch"] = stage(
+      seconds, total_jobs,
+      requests=(mock.requests - requests_before) // args.repeat,
+      mb_per_second=round(body_bytes / seconds / 1024 / 1024, 2))
+
+  # Parse: the filters over the fetched jobs
+  results = []
+
+  def parse():
+    results.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+      for (board, api_def), jobs in zip(boards, fetched):
+        results.append(parse_jobs(iter(jobs), api_def, board["company_name"],
+                                  criteria, lean=True))
+
+  seconds = best_of(args.repeat, parse)
+  passed = sum(len(result["passed"]) for result in results)
+  stages["parse"] = stage(seconds, total_jobs, passed=passed)
+
+  # Feed: every parsed job, passed or not, so the feed stages have as many
+  # items as there are jobs; as one RSS string, and streamed to a file.
+  parsed = [job for result in results
+            for job in result["passed"] + result["failed"]]
+  stages["convert_to_rss"] = stage(
+      best_of(args.repeat, lambda: convert_to_rss(parsed)), len(parsed))
+  with tempfile.TemporaryDirectory() as directory:
+    def write_feed():
+      with RssWriter(os.path.join(directory, "jobs.rss")) as feed:
+        feed.add_jobs(parsed)
+    stages["rss_writer"] = stage(best_of(args.repeat, write_feed),
+                                 len(parsed))
+
+  # End to end: main() in a scratch directory holding the configs
+  with tempfile.TemporaryDirectory() as directory:
+    os.makedirs(os.path.join(directory, "src"))
+    for name, content in (("api_definitions.json", api_definitions),
+                          ("boards.json", board_configs),
+                          ("criteria.json", criteria)):
+      with open(os.path.join(directory, "src", name), "w") as f:
+        json.dump(content, f)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+      def end_to_end():
+        with contextlib.redirect_stdout(io.StringIO()):
+          run_main(args.main_args.split())
+      stages["end_to_end"] = stage(best_of(args.repeat, end_to_end),
+                                   total_jobs)
+    finally:
+      os.chdir(cwd)
+  return stages
+
+
+def compare(stages: Dict, path: str):
+  with open(path, "r") as f:
+    baseline = json.load(f)
+  print(f"\nAgainst {path} ({baseline.get('commit')}):")
+  for name, result in stages.items():
+    before = baseline["stages"].get(name)
+    if not before or not before["seconds"]:
+      continue
+    change = result["seconds"] / before["seconds"] - 1
+    print(f"{name:>15}: {before['seconds']:8.4f}s -> "
+          f"{result['seconds']:8.4f}s ({change:+.1%})")
+
+
+def main(argv: List[str] = None):
+  args = parse_args(argv)
+  with MockBoards(args.jobs, args.description_size,
+                  args.latency_ms / 1000) as mock:
+    stages = run_stages(args, mock)
+
+  result = {
+      "commit": commit(),
+      "date": datetime.now().isoformat(),
+      "python": platform.python_version(),
+      "cpus": os.cpu_count(),
+      "config": {key: value for key, value in vars(args).items()
+                 if key not in ("output", "compare")},
+      "stages": stages,
+  }
+  with open(args.output, "w") as f:
+    json.dump(result, f, indent=2)
+
+  print(f"{args.boards * 2} boards x {args.jobs} jobs, "
+        f"{args.description_size} byte descriptions, "
+        f"{args.latency_ms:g} ms latency")
+  for name, result in stages.items():
+    extra = ", ".join(f"{key} {value}" for key, value in result.items()
+                      if key not in ("seconds", "jobs_per_second"))
+    print(f"{name:>15}: {result['seconds']:8.4f}s "
+          f"{result['jobs_per_second'] or 0:10.1f} jobs/s"
+          + (f"  ({extra})" if extra else ""))
+  print(f"Wrote {args.output}")
+  if args.compare:
+    compare(stages, args.compare)
+
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
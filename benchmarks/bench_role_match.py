@@ -0,0 +1,35 @@
+# Compares the trie matcher behind role_match with the per-term substring
+# scan it replaced.
+#
+#   python -m benchmarks.bench_role_match
+import timeit
+from typing import List
+
+from benchmarks.corpus import descriptions, role_terms
+from src.matchers import TermMatcher
+
+
+def per_term_scan(text: str, terms: List[str]) -> List[str]:
+  return list(set(term for term in terms if term.lower() in text))
+
+
+def main():
+  texts = [text.lower() for text in descriptions(200, 5000)]
+  print(f"{'terms':>6} {'per-term scan':>15} {'trie matcher':>15} {'speedup':>8}")
+  for count in (10, 100, 500, 1000):
+    terms = role_terms(count)
+    matcher = TermMatcher(terms)
+    for text in texts:
+      assert set(matcher.find(text)) == set(per_term_scan(text, terms))
+    scan = min(timeit.repeat(
+        lambda: [per_term_scan(text, terms) for text in texts],
+        number=1, repeat=5)) / len(texts)
+    trie = min(timeit.repeat(
+        lambda: [matcher.find(text) for text in texts],
+        number=1, repeat=5)) / len(texts)
+    print(f"{count:>6} {scan * 1e6:>12.1f} us {trie * 1e6:>12.1f} us "
+          f"{scan / trie:>7.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,73 @@
+# Peak RSS of parsing one large board response loaded whole (response.json())
+# versus streamed with iter_json_array. Both run in lean mode, each in its own
+# process so the numbers don't share a high-water mark.
+#
+#   python -m benchmarks.bench_stream_memory [jobs] [description bytes]
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_lean_memory import API_DEFINITION, CRITERIA
+from benchmarks.corpus import descriptions
+from src.parse import parse_jobs
+from src.stream_json import iter_json_array
+
+CHUNK_SIZE = 64 * 1024
+
+
+def peak_rss_mb() -> float:
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_chunks(path: str):
+  with open(path, "rb") as f:
+    while chunk := f.read(CHUNK_SIZE):
+      yield chunk
+
+
+def run(stream: bool, path: str):
+  baseline = peak_rss_mb()
+  sys.stdout = open(os.devnull, "w")
+  if stream:
+    data = iter_json_array(read_chunks(path), "jobs")
+  else:
+    data = json.loads(b"".join(read_chunks(path)))
+  parse_jobs(data, API_DEFINITION, "Example", CRITERIA, lean=True)
+  sys.stdout = sys.__stdout__
+  print(json.dumps({"baseline": baseline, "peak": peak_rss_mb()}))
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+  # Every job passes the location filter but fails on its title, and lean
+  # failed jobs are small, so what's measured is mostly the response itself.
+  with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+    json.dump({"jobs": [
+        {"title": "Senior Engineer", "url": f"https://example.com/{i}",
+         "content": text, "location": "New York"}
+        for i, text in enumerate(descriptions(count, size))]}, f)
+  print(f"{count} jobs, {size} byte descriptions, "
+        f"{os.path.getsize(f.name) / 1024 / 1024:.1f} MB response")
+  try:
+    for stream in (False, True):
+      output = subprocess.run(
+          [sys.executable, "-m", "benchmarks.bench_stream_memory", "--child",
+           str(int(stream)), f.name],
+          capture_output=True, text=True, check=True).stdout
+      result = json.loads(output.strip().splitlines()[-1])
+      print(f"{'streamed' if stream else 'loaded':>8}: peak RSS "
+            f"{result['peak']:7.1f} MB "
+            f"({result['peak'] - result['baseline']:+.1f} MB while parsing)")
+  finally:
+    os.remove(f.name)
+
+
+if __name__ == "__main__":
+  if sys.argv[1:2] == ["--child"]:
+    run(bool(int(sys.argv[2])), sys.argv[3])
+  else:
+    main()
@@ -0,0 +1,40 @@
+# Compares the single-pass years-of-experience extractor with running each
+# pattern's re.findall over the whole job in turn, as parse.py used to.
+#
+#   python -m benchmarks.bench_years_of_experience
+import json
+import re
+import timeit
+
+from benchmarks.corpus import descriptions
+from src.matchers import (NUMBER_WORDS, YEARS_OF_EXPERIENCE_PATTERNS,
+                          extract_years_of_experience)
+
+
+def findall_per_pattern(job_json_str: str) -> int | None:
+  for pattern in YEARS_OF_EXPERIENCE_PATTERNS:
+    for match in re.findall(pattern, job_json_str):
+      if match.lower() in NUMBER_WORDS:
+        return NUMBER_WORDS[match.lower()]
+      return int(match.split("-")[0].strip())
+
+
+def main():
+  print(f"{'description':>12} {'findall x7':>12} {'single pass':>12} {'speedup':>8}")
+  for size in (1000, 5000, 20000):
+    jobs = [json.dumps({"title": "Software Engineer", "content": text})
+            for text in descriptions(300, size)]
+    for job in jobs:
+      assert extract_years_of_experience(job) == findall_per_pattern(job)
+    before = min(timeit.repeat(
+        lambda: [findall_per_pattern(job) for job in jobs],
+        number=1, repeat=5)) / len(jobs)
+    after = min(timeit.repeat(
+        lambda: [extract_years_of_experience(job) for job in jobs],
+        number=1, repeat=5)) / len(jobs)
+    print(f"{size:>10} B {before * 1e6:>9.1f} us {after * 1e6:>9.1f} us "
+          f"{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+  main()
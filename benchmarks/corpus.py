@@ -0,0 +1,57 @@
+import random
+from typing import List
+
+WORDS = [
+    "we", "are", "looking", "for", "a", "team", "to", "build", "and", "ship",
+    "product", "customers", "with", "experience", "in", "python", "systems",
+    "the", "you", "will", "work", "on", "our", "platform", "design", "data",
+    "of", "strong", "skills", "collaborate", "across", "remote",
+    "office", "benefits", "salary", "equity", "health", "<p>", "</p>", "<li>",
+    "</li>", "<strong>", "</strong>", "&nbsp;", "role", "responsibilities",
+]
+
+ROLE_WORDS = [
+    "software", "backend", "frontend", "full stack", "platform", "data",
+    "machine learning", "infrastructure", "mobile", "ios", "android", "web",
+    "security", "site reliability", "devops", "qa", "test", "embedded",
+    "firmware", "cloud", "solutions", "support", "analytics", "growth",
+]
+ROLE_SUFFIXES = ["engineer", "developer", "scientist", "analyst", "architect",
+                 "engineering", "programmer", "specialist", "lead"]
+
+
+def role_terms(count: int, seed: int = 0) -> List[str]:
+  rng = random.Random(seed)
+  terms = set()
+  while len(terms) < count:
+    terms.add(f"{rng.choice(ROLE_WORDS)} {rng.choice(ROLE_SUFFIXES)}"
+              + ("" if len(terms) < 200 else f" {rng.randint(1, 10 ** 6)}"))
+  return sorted(terms)
+
+
+EXPERIENCE_PHRASES = [
+    "{n}+ years of experience", "at least {n} years", "minimum of {n} years",
+    "{n}-{m} years of experience", "{n} years", "three years of experience",
+    "{n} yrs exp", "over the years", "early-career",
+]
+
+
+def description(size: int, rng: random.Random) -> str:
+  words = []
+  length = 0
+  # About one in five postings never states a number of years.
+  phrases = rng.randint(0, 3) if rng.random() < 0.8 else 0
+  phrase_positions = set(rng.randrange(size // 8) for _ in range(phrases))
+  while length < size:
+    word = rng.choice(WORDS)
+    if len(words) in phrase_positions:
+      n = rng.randint(1, 10)
+      word = rng.choice(EXPERIENCE_PHRASES).format(n=n, m=n + 2)
+    words.append(word)
+    length += len(word) + 1
+  return " ".join(words)
+
+
+def descriptions(count: int, size: int, seed: int = 0) -> List[str]:
+  rng = random.Random(seed)
+  return [description(size, rng) for _ in range(count)]
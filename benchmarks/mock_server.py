@@ -0,0 +1,187 @@
+# A local stand-in for the job boards in api_definitions.example.json,
+# serving synthetic postings over HTTP so the whole pipeline can be timed
+# without touching the network:
+#
+#   GET  /get/<board>   {"jobs": [...]}, the common-job-board-api-1 shape
+#   POST /post/<board>  {"data": {"set": {"results": [...]}}, "total": n},
+#                       paged by "limit"/"offset" in the body, the company-1
+#                       shape
+#
+# Run it on its own to point a real run at it:
+#
+#   python -m benchmarks.mock_server [jobs] [description bytes] [latency ms]
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from benchmarks.corpus import ROLE_SUFFIXES, ROLE_WORDS, descriptions
+
+LOCATIONS = ["New York, NY", "Brooklyn, NY", "Remote", "Austin, TX",
+             "San Francisco, CA", "Boston, MA", "Albany, New York", "London"]
+# The example criteria look for "creator" and drop "product" titles, so mix
+# some of both in.
+TITLE_PREFIXES = ["", "", "", "Senior ", "Product ", "Content Creator / "]
+
+
+def make_postings(count: int, size: int, seed: int = 0) -> List[Dict]:
+  rng = random.Random(seed)
+  started = datetime(2024, 1, 1)
+  return [{
+      "title": (rng.choice(TITLE_PREFIXES) + rng.choice(ROLE_WORDS).title()
+                + " " + rng.choice(ROLE_SUFFIXES).title()),
+      "id": i,
+      "description": text,
+      "location": rng.choice(LOCATIONS),
+      "created": started + timedelta(minutes=i),
+  } for i, text in enumerate(descriptions(count, size, seed))]
+
+
+def get_board_job(posting: Dict, base_url: str) -> Dict:
+  return {
+      "id": posting["id"],
+      "title": posting["title"],
+      "absolute_url": f"{base_url}/jobs/{posting['id']}",
+      "content": posting["description"],
+      "location": {"name": posting["location"]},
+      "updated_at": posting["created"].isoformat(),
+  }
+
+
+def post_board_job(posting: Dict) -> Dict:
+  created = posting["created"].strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+  return {
+      "title": posting["title"],
+      "url_name": f"job-{posting['id']}",
+      "description": posting["description"],
+      "loc": {"places": [posting["location"]]},
+      "created": created,
+      "updated": created,
+  }
+
+
+class MockBoards:
+  # Every board under /get/ and /post/ serves the same `jobs` postings.
+  # `latency` is added to every request, in seconds.
+  def __init__(self, jobs: int = 1000, description_size: int = 3000,
+               latency: float = 0.0, seed: int = 0):
+    self.latency = latency
+    self.postings = make_postings(jobs, description_size, seed)
+    self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+    self.server.daemon_threads = True
+    self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    self.get_body = json.dumps({"jobs": [
+        get_board_job(posting, self.base_url) for posting in self.postings
+    ]}).encode("utf-8")
+    self.post_jobs = [post_board_job(posting) for posting in self.postings]
+    self.requests = 0
+    self.thread = None
+
+  def url(self, shape: str, board: str = "example") -> str:
+    return f"{self.base_url}/{shape}/{board}"
+
+  def page(self, limit: int, offset: int) -> bytes:
+    return json.dumps({
+        "data": {"set": {"results": self.post_jobs[offset:offset + limit]}},
+        "total": len(self.post_jobs),
+    }).encode("utf-8")
+
+  def _handler(self):
+    boards = self
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+
+      def log_message(self, format, *args):
+        pass
+
+      def send_json(self, body: bytes):
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+          body = gzip.compress(body, compresslevel=1)
+          self.send_response(200)
+          self.send_header("Content-Encoding", "gzip")
+        else:
+          self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def do_GET(self):
+        boards.requests += 1
+        time.sleep(boards.latency)
+        if not self.path.startswith("/get/"):
+          self.send_error(404)
+          return
+        self.send_json(boards.get_body)
+
+      def do_POST(self):
+        boards.requests += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(boards.latency)
+        if not self.path.startswith("/post/"):
+          self.send_error(404)
+          return
+        self.send_json(boards.page(int(body.get("limit", 30)),
+                                   int(body.get("offset", 0))))
+
+    return Handler
+
+  def start(self) -> "MockBoards":
+    self.thread = threading.Thread(target=self.server.serve_forever,
+                                   daemon=True)
+    self.thread.start()
+    return self
+
+  def stop(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def __enter__(self) -> "MockBoards":
+    return self.start()
+
+  def __exit__(self, *exc):
+    self.stop()
+
+
+def example_boards(boards: MockBoards, count: int = 1
+                   ) -> Tuple[Dict, List[Dict]]:
+  # The example adapters, and `count` boards of each pointing at the mock
+  with open("src/api_definitions.example.json", "r") as f:
+    api_definitions = json.load(f)
+  # The mock is local, so don't rate limit it: the limiters are shared by
+  # the whole process, and a stage that drained one would slow the next.
+  for definition in api_definitions.values():
+    definition["http"] = dict(definition.get("http", {}), rate_limit=0)
+  board_configs = []
+  for i in range(count):
+    board_configs.append({
+        "adapter": "common-job-board-api-1",
+        "board_uri": boards.url("get", f"board-{i}"),
+        "company_name": f"GET board {i}",
+    })
+    board_configs.append({
+        "adapter": "company-1",
+        "board_uri": boards.url("post", f"board-{i}"),
+        "company_name": f"POST board {i}",
+    })
+  return api_definitions, board_configs
+
+
+if __name__ == "__main__":
+  jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+  size = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+  latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+  with MockBoards(jobs, size, latency) as mock:
+    print(f"GET board:  {mock.url('get')}")
+    print(f"POST board: {mock.url('post')}")
+    try:
+      threading.Event().wait()
+    except KeyboardInterrupt:
+      pass
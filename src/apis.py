@@ -1,63 +1,285 @@
+import hashlib
 import json
-from typing import Dict, List
-
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+from urllib.parse import urlparse
 
+from src.cache import ResponseCache
 from src.parse import get_json_key
-from src.types import ApiDefinition
+from src.resilience import (DeadlineExceeded, ResilientRequester, guards,
+                            iter_body, request_timeout)
+from src.sessions import http_config, sessions
+from src.stream_json import iter_json_array
+from src.timings import timings
+from src.types import ApiDefinition, HttpDefinition
+
+if TYPE_CHECKING:
+  import requests
+
+
+# The host's keep-alive session, behind its rate limiter and retries
+def board_session(url: str, config: HttpDefinition,
+                  slots: threading.Semaphore = None) -> ResilientRequester:
+  # Every request for the board, pages included, shares one deadline
+  return ResilientRequester(sessions.get(url, config), url, config,
+                            slots=slots,
+                            deadline=guards.clock() + float(config["deadline"]))
 
 
 def get_paginated_response_json(api_definition: ApiDefinition, request_method: str, url: str,
-                                request_headers: Dict = None, request_body: Dict = None) -> List[Dict]:
+                                request_headers: Dict = None, request_body: Dict = None,
+                                cache: ResponseCache = None,
+                                digests: List[str] = None,
+                                slots: threading.Semaphore = None
+                                ) -> List[Dict] | None:
   response_jsons = {}
   pagination_config = api_definition["pagination"]
   limit_field_name = pagination_config["limit_field"]
   offset_field_name = pagination_config["offset_field"]
   remaining_field_name = pagination_config["remaining"]
   root_field_name = api_definition["response"]["root"]
+  prefetch_window = int(pagination_config.get("prefetch_window", 1))
 
+  # Boards sharing an adapter share its body dict, and they may be fetched at
+  # the same time, so page through a copy.
+  request_body = dict(request_body or {})
   request_body[limit_field_name] = pagination_config["limit_value"]
   request_body[offset_field_name] = pagination_config["offset_value"]
 
   # Create key for results
   parts = root_field_name.split(".")
+  hook = response_jsons
   for i, part in enumerate(parts):
     if i == len(parts) - 1:
-      response_jsons[part] = []
+      hook[part] = []
     else:
-      response_jsons[part] = {}
+      hook[part] = {}
+    hook = hook[part]
+
+  config = http_config(api_definition)
+  session = board_session(url, config, slots)
+
+  def fetch_page(offset: int) -> Dict:
+    page_body = dict(request_body)
+    page_body[offset_field_name] = offset
+    return get_response_json(
+        request_method, url, request_headers, page_body,
+        session=session, timeout=request_timeout(config),
+        cache=cache, digests=digests)
 
   total_results = 1
-  offset = pagination_config["offset_value"]
-  while int(offset) < int(total_results):
+  offset = int(pagination_config["offset_value"])
+  limit = int(pagination_config["limit_value"])
+  if prefetch_window > 1:
+    # The first page tells us the total, after which every remaining offset
+    # is known and the pages can be fetched side by side.
+    response_json = fetch_page(offset)
+    if response_json is None:
+      return None
+    hook.extend(get_json_key(response_json, root_field_name))
+    total_results = int(response_json[remaining_field_name])
+    offsets = range(offset + limit, total_results, limit)
+    # Each page records its digest into its own list so the board digest
+    # stays in offset order.
+    page_digests = [[] for _ in offsets]
+
+    def prefetch_page(i: int) -> Dict:
+      page_body = dict(request_body)
+      page_body[offset_field_name] = offsets[i]
+      return get_response_json(
+          request_method, url, request_headers, page_body,
+          session=session, timeout=request_timeout(config),
+          cache=cache, digests=page_digests[i])
+
+    with ThreadPoolExecutor(max_workers=prefetch_window) as executor:
+      # map() hands results back in offset order regardless of which page
+      # finishes first.
+      pages = list(executor.map(prefetch_page, range(len(offsets))))
+    # A board missing a page is treated as failed rather than half fetched
+    if any(response_json is None for response_json in pages):
+      return None
+    for response_json in pages:
+      hook.extend(get_json_key(response_json, root_field_name))
+    if digests is not None:
+      for page_digest in page_digests:
+        digests.extend(page_digest)
+    return response_jsons
+
+  while offset < int(total_results):
     # print(f"Offset: {offset}; Total results: {total_results}")
-    response_json = get_response_json(
-        request_method, url, request_headers, request_body)
-    jobs = get_json_key(response_json, root_field_name)
-    hook = get_json_key(response_jsons, root_field_name)
-    hook.extend(jobs)
+    response_json = fetch_page(offset)
+    if response_json is None:
+      return None
+    hook.extend(get_json_key(response_json, root_field_name))
 
     total_results = response_json[remaining_field_name]
-    offset = int(
-        request_body[offset_field_name]) + int(pagination_config["limit_value"])
-    request_body[offset_field_name] = offset
+    offset += limit
 
   return response_jsons
 
 
 def get_response_json(method: str, url: str,
-                      headers: Dict = None, body: Dict = None) -> List[Dict]:
+                      headers: Dict = None, body: Dict = None,
+                      session: "requests.Session | ResilientRequester" = None,
+                      timeout: float | Tuple[float, float] = None,
+                      cache: ResponseCache = None,
+                      digests: List[str] = None) -> List[Dict] | None:
+  host = urlparse(url).netloc
+  # Imported here rather than at the top, since it is slow to import and
+  # only needed once something is fetched.
+  import requests
   try:
     # print(method, url, headers, body)
-    response = requests.request(method, url, headers=headers, json=body)
-    response.raise_for_status()
+    requester = session if session is not None else requests
+    if cache is not None:
+      with timings.time("fetch_page_seconds", host=host):
+        response_json, digest = cache.request(
+            requester, method, url, headers, body, timeout)
+      if digests is not None:
+        digests.append(digest)
+      return response_json
+    with timings.time("fetch_page_seconds", host=host):
+      response = requester.request(method, url, headers=headers, json=body,
+                                   timeout=timeout)
+      response.raise_for_status()
+      content = response.content
+    timings.count("downloaded_bytes", len(content), host=host)
     return response.json()
   except Exception as e:
     print(f"Error fetching jobs from {url}: {str(e)}")
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StreamError(Exception):
+  # A streamed body that failed part way, so the board's jobs are incomplete
+  pass
+
+
+class StreamedJobs:
+  # The jobs of a streamed board, holding its host's request slot until the
+  # body has been read, or the jobs are closed or dropped unread, so the
+  # download counts against the per-host limit for as long as it lasts.
+  def __init__(self, jobs: Iterator[Dict], response: "requests.Response",
+               slot: threading.Semaphore):
+    self._jobs = jobs
+    self._response = response
+    self._slot = slot
+
+  def __iter__(self):
+    return self
+
+  def __next__(self) -> Dict:
+    try:
+      return next(self._jobs)
+    except BaseException:
+      self.close()
+      raise
+
+  def close(self):
+    slot, self._slot = self._slot, None
+    if slot is None:
+      return
+    self._jobs.close()
+    # The generator only closes the response once it has started
+    self._response.close()
+    slot.release()
+
+  def __del__(self):
+    self.close()
+
+
+# Sends the request straight away, like get_response_json, but returns an
+# iterator over the jobs at `root` that reads the body as the jobs are
+# consumed, so a board's response is never held in memory as a whole.
+# `deadline` is in seconds, and only counts the time spent waiting on the
+# server: the body may sit unread while earlier boards are parsed, and is
+# read in between parsing this one. `slot`, when given, is taken before the
+# request and held until the body is done with (see StreamedJobs), so it
+# must not also be held by `session` around each request.
+def stream_response_jobs(method: str, url: str, root: str,
+                         headers: Dict = None, body: Dict = None,
+                         session: "requests.Session | ResilientRequester" = None,
+                         timeout: float | Tuple[float, float] = None,
+                         deadline: float = None,
+                         slot: threading.Semaphore = None
+                         ) -> Iterator[Dict] | None:
+  host = urlparse(url).netloc
+  import requests
+  if slot is not None:
+    slot.acquire()
+  started = perf_counter()
+  try:
+    requester = session if session is not None else requests
+    # Up to the response headers; the body is read while parsing
+    with timings.time("fetch_page_seconds", host=host):
+      response = requester.request(method, url, headers=headers, json=body,
+                                   timeout=timeout, stream=True)
+      response.raise_for_status()
+  except Exception as e:
+    print(f"Error fetching jobs from {url}: {str(e)}")
+    if slot is not None:
+      slot.release()
+    return None
+  headers_waited = perf_counter() - started
+
+  # The body is read while the board is parsed, after fetch_board_seconds
+  # has been recorded, so the time spent waiting on it is recorded here.
+  def chunks() -> Iterator[bytes]:
+    body = iter_body(response, STREAM_CHUNK_SIZE)
+    waited = 0.0
+    try:
+      while True:
+        started = perf_counter()
+        chunk = next(body, None)
+        waited += perf_counter() - started
+        if chunk is None:
+          return
+        if deadline is not None and headers_waited + waited > deadline:
+          raise DeadlineExceeded(f"{url} took too long to send its jobs")
+        timings.count("downloaded_bytes", len(chunk), host=host)
+        yield chunk
+    finally:
+      timings.observe("fetch_body_seconds", waited, host=host)
+
+  # Errors part way through the body are raised to whoever is reading the
+  # jobs rather than ending the iterator, which would pass for a complete
+  # (shorter) board.
+  def jobs() -> Iterator[Dict]:
+    with response:
+      try:
+        yield from iter_json_array(chunks(), root)
+      except (requests.RequestException, ValueError, DeadlineExceeded) as e:
+        raise StreamError(f"Error reading jobs from {url}: {str(e)}") from e
+
+  if slot is None:
+    return jobs()
+  return StreamedJobs(jobs(), response, slot)
+
+
 def fetch_data_from_board(
         url: str, api_definition: ApiDefinition) -> List[Dict]:
+  return fetch_board(url, api_definition)[0]
+
+
+# Like fetch_data_from_board, but when a cache is given also returns a digest
+# of every page's body, which only changes when the board's response does.
+# Boards whose adapter sets "stream" in its response config (and doesn't
+# paginate) return an iterator over their jobs instead of the response, and
+# bypass the cache (and so the daemon's unchanged-board check). Such a board
+# is returned once its headers arrive, so its body is read afterwards, on
+# the parsing thread, outside fetch_boards' --concurrency limit.
+# `slots` is held around every request the board sends, prefetched pages
+# included, to cap the requests in flight to its host; a streamed board
+# holds it until its body has been read.
+def fetch_board(url: str, api_definition: ApiDefinition,
+                cache: ResponseCache = None,
+                slots: threading.Semaphore = None
+                ) -> Tuple[List[Dict], str | None]:
+  digests = [] if cache is not None else None
   request_config = api_definition["request"]
   request_method = request_config["type"]
   request_headers = request_config["headers"] if "headers" in request_config else None
@@ -65,8 +287,23 @@ def fetch_data_from_board(
 
   if "pagination" in api_definition:
     response_json = get_paginated_response_json(
-        api_definition, request_method, url, request_headers, request_body)
+        api_definition, request_method, url, request_headers, request_body,
+        cache=cache, digests=digests, slots=slots)
+  elif api_definition["response"].get("stream"):
+    config = http_config(api_definition)
+    return stream_response_jobs(
+        request_method, url, api_definition["response"]["root"],
+        request_headers, request_body, session=board_session(url, config),
+        timeout=request_timeout(config), deadline=float(config["deadline"]),
+        slot=slots), None
   else:
+    config = http_config(api_definition)
     response_json = get_response_json(
-        request_method, url, request_headers, request_body)
-  return response_json
+        request_method, url, request_headers, request_body,
+        session=board_session(url, config, slots),
+        timeout=request_timeout(config), cache=cache, digests=digests)
+
+  if not digests:
+    return response_json, None
+  return response_json, hashlib.sha256(
+      "".join(digests).encode("utf-8")).hexdigest()
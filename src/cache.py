@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+from src.timings import timings
+
+DEFAULT_CACHE_DIR = ".cache"
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(*parts) -> str:
+  return hashlib.sha256(json.dumps(
+      parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, content: bytes):
+  tmp_path = f"{path}.{threading.get_ident()}.tmp"
+  with open(tmp_path, "wb") as f:
+    f.write(content)
+  os.replace(tmp_path, path)
+
+
+class DiskCache:
+  # A directory of files that expire after `ttl` seconds and are evicted
+  # least-recently-used first once they add up to more than `max_bytes`.
+  def __init__(self, directory: str, ttl: float = DEFAULT_CACHE_TTL,
+               max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+    self.directory = directory
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    os.makedirs(directory, exist_ok=True)
+
+  def path(self, key: str, suffix: str) -> str:
+    return os.path.join(self.directory, key + suffix)
+
+  def is_expired(self, path: str) -> bool:
+    try:
+      return time.time() - os.path.getmtime(path) > self.ttl
+    except OSError:
+      return True
+
+  def touch(self, *paths: str):
+    for path in paths:
+      try:
+        os.utime(path)
+      except OSError:
+        pass
+
+  def remove(self, *paths: str):
+    for path in paths:
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+
+  def evict(self):
+    with self._lock:
+      entries = []
+      for name in os.listdir(self.directory):
+        path = os.path.join(self.directory, name)
+        try:
+          stat = os.stat(path)
+        except OSError:
+          continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+      now = time.time()
+      total = 0
+      kept = []
+      for mtime, size, path in entries:
+        if now - mtime > self.ttl:
+          self.remove(path)
+        else:
+          total += size
+          kept.append((mtime, size, path))
+
+      kept.sort()
+      while kept and total > self.max_bytes:
+        _, size, path = kept.pop(0)
+        self.remove(path)
+        total -= size
+
+
+class ResponseCache(DiskCache):
+  # Stores response bodies with their ETag/Last-Modified validators and turns
+  # repeat fetches into conditional requests, reusing the stored body on 304.
+  def __init__(self, directory: str = os.path.join(DEFAULT_CACHE_DIR, "http"),
+               **kwargs):
+    super().__init__(directory, **kwargs)
+
+  def request(self, requester, method: str, url: str, headers: Dict = None,
+              body: Dict = None, timeout: float = None) -> Tuple[Dict, str]:
+    key = cache_key(method.lower(), url, body)
+    meta_path = self.path(key, ".meta.json")
+    body_path = self.path(key, ".body")
+
+    meta = None
+    # Eviction works file by file, so only trust a complete pair.
+    if (os.path.exists(body_path) and os.path.exists(meta_path)
+            and not self.is_expired(meta_path)):
+      try:
+        with open(meta_path, "r") as f:
+          meta = json.load(f)
+      except (OSError, ValueError):
+        meta = None
+
+    request_headers = dict(headers or {})
+    if meta is not None:
+      if meta.get("etag"):
+        request_headers["If-None-Match"] = meta["etag"]
+      if meta.get("last_modified"):
+        request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = requester.request(method, url, headers=request_headers,
+                                 json=body, timeout=timeout)
+    if response.status_code == 304 and meta is not None:
+      with open(body_path, "rb") as f:
+        content = f.read()
+      self.touch(meta_path, body_path)
+      return json.loads(content), meta["digest"]
+
+    response.raise_for_status()
+    content = response.content
+    timings.count("downloaded_bytes", len(content),
+                  host=urlparse(url).netloc)
+    digest = hashlib.sha256(content).hexdigest()
+    _write_atomic(body_path, content)
+    _write_atomic(meta_path, json.dumps({
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "digest": digest,
+    }).encode("utf-8"))
+    return json.loads(content), digest
+
+
+class ParseCache(DiskCache):
+  # Keeps parse_jobs output for a board keyed by the digest of its response,
+  # so a board whose response did not change skips filtering entirely.
+  def __init__(self, directory: str = os.path.join(DEFAULT_CACHE_DIR, "parsed"),
+               **kwargs):
+    super().__init__(directory, **kwargs)
+
+  def key(self, company_name: str, board_digest: str,
+          api_definition: Dict, criteria: Dict, *options) -> str:
+    return cache_key(company_name, board_digest, api_definition, criteria,
+                     *options)
+
+  def get(self, key: str) -> Dict[str, List[Dict]] | None:
+    path = self.path(key, ".json")
+    if self.is_expired(path):
+      return None
+    try:
+      with open(path, "r") as f:
+        parsed = json.load(f)
+    except (OSError, ValueError):
+      return None
+    self.touch(path)
+    return parsed
+
+  def set(self, key: str, parsed: Dict[str, List[Dict]]):
+    _write_atomic(self.path(key, ".json"),
+                  json.dumps(parsed, default=str).encode("utf-8"))
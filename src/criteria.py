@@ -0,0 +1,76 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Tuple
+
+from src.gazetteer import get_gazetteer
+from src.matchers import TermMatcher
+
+
+@dataclass(frozen=True)
+class CompiledCriteria:
+  # criteria.json with everything the filters need compiled up front, so
+  # checking a job doesn't rebuild regexes or lists from the criteria.
+  source: Dict
+  # "(a|b|...)" over the lowercased location whitelist
+  location_pattern: re.Pattern | None
+  # The same locations as whole words, for searching the raw job
+  city_pattern: re.Pattern | None
+  # States from "location_states", as full names; any place in one of them
+  # passes the location filter
+  location_states: FrozenSet[str]
+  title_blacklist: FrozenSet[str]
+  role_matcher: TermMatcher
+  max_years_of_experience: int
+
+
+# The filters still accept plain criteria dicts; these caches keep that path
+# from recompiling on every job.
+@lru_cache(maxsize=16)
+def compile_locations(locations: Tuple[str, ...]
+                      ) -> Tuple[re.Pattern | None, re.Pattern | None]:
+  if not locations:
+    return None, None
+  alternation = "|".join(re.escape(location.lower())
+                         for location in locations)
+  return (re.compile(f"({alternation})"),
+          re.compile(r"\b(" + alternation + r")\b"))
+
+
+@lru_cache(maxsize=16)
+def compile_location_states(states: Tuple[str, ...]) -> FrozenSet[str]:
+  if not states:
+    return frozenset()
+  gazetteer = get_gazetteer()
+  normalized = set()
+  for state in states:
+    name = gazetteer.normalize_state(state)
+    if name is None:
+      print(f"Warning: unknown state in location_states: {state}")
+    else:
+      normalized.add(name)
+  return frozenset(normalized)
+
+
+@lru_cache(maxsize=16)
+def compile_role_terms(role_terms: Tuple[str, ...]) -> TermMatcher:
+  return TermMatcher(role_terms)
+
+
+def compile_criteria(criteria: Dict | CompiledCriteria) -> CompiledCriteria:
+  if isinstance(criteria, CompiledCriteria):
+    return criteria
+
+  location_pattern, city_pattern = compile_locations(
+      tuple(criteria.get("location_whitelist", [])))
+  return CompiledCriteria(
+      source=criteria,
+      location_pattern=location_pattern,
+      city_pattern=city_pattern,
+      location_states=compile_location_states(
+          tuple(criteria.get("location_states", []))),
+      title_blacklist=frozenset(
+          term.lower() for term in criteria.get("title_blacklist", [])),
+      role_matcher=compile_role_terms(tuple(criteria.get("role_terms", []))),
+      max_years_of_experience=criteria["max_years_of_experience"],
+  )
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, List, Tuple
+
+from src.cache import ResponseCache
+from src.criteria import CompiledCriteria
+from src.fetcher import (DEFAULT_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY,
+                         fetch_boards)
+from src.parse import discard_failed, parse_jobs
+from src.records import JobRecord
+from src.rss import DEFAULT_FEED_PATH, RssWriter
+from src.store import JobStore
+from src.types import ApiDefinition, BoardConfig
+
+if TYPE_CHECKING:
+  from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_INTERVAL = 60 * 60
+DEFAULT_JITTER = 0.1
+DEFAULT_MAX_BACKOFF = 12 * 60 * 60
+# How much longer a board waits for each poll in a row that found it
+# unchanged, and for each failure in a row
+UNCHANGED_BACKOFF = 1.5
+FAILURE_BACKOFF = 2
+
+
+@dataclass
+class BoardState:
+  board: BoardConfig
+  api_definition: ApiDefinition
+  # Seconds between polls; from the board's "refresh_interval", if any
+  interval: float
+  next_run: float = 0.0
+  failures: int = 0
+  unchanged: int = 0
+  # Digest of the last response, and a hash of the jobs it passed
+  digest: str | None = None
+  signature: str | None = None
+  passed: List[JobRecord] = field(default_factory=list)
+
+
+def passed_signature(jobs: List[JobRecord]) -> str:
+  # What the feed shows of a board's jobs, leaving out created_at, which
+  # falls back to the time of parsing for jobs without a date.
+  return hashlib.sha256(json.dumps(sorted(
+      [job.url or "", job.title or "", job.description or ""]
+      for job in jobs
+  ), default=str).encode("utf-8")).hexdigest()
+
+
+class Daemon:
+  # Keeps polling the boards from one process, so the configs, compiled
+  # criteria, HTTP sessions and parse pool are set up once.
+  #
+  # Each board is polled on its own interval. Boards that fail, or that
+  # keep coming back unchanged, are polled less often (up to max_backoff),
+  # and every delay is jittered so the boards drift apart rather than all
+  # being fetched at once. Unchanged responses (same cache digest) are not
+  # parsed again, and the feed is rewritten only when some board's passed
+  # jobs changed.
+  def __init__(self, boards: List[Tuple[BoardConfig, ApiDefinition]],
+               criteria: CompiledCriteria, cache: ResponseCache,
+               feed_path: str = DEFAULT_FEED_PATH,
+               interval: float = DEFAULT_INTERVAL,
+               jitter: float = DEFAULT_JITTER,
+               max_backoff: float = DEFAULT_MAX_BACKOFF,
+               concurrency: int = DEFAULT_CONCURRENCY,
+               per_host: int = DEFAULT_PER_HOST_CONCURRENCY,
+               store: JobStore = None, lean: bool = False,
+               executor: "ProcessPoolExecutor" = None, max_items: int = None,
+               clock: Callable[[], float] = time.monotonic,
+               rng: random.Random = None,
+               on_feed: Callable[[str], None] = None):
+    self.states = [
+        BoardState(board, api_definition,
+                   float(board.get("refresh_interval", interval)))
+        for board, api_definition in boards
+    ]
+    self.criteria = criteria
+    self.cache = cache
+    self.feed_path = feed_path
+    self.jitter = jitter
+    self.max_backoff = max_backoff
+    self.concurrency = concurrency
+    self.per_host = per_host
+    self.store = store
+    self.lean = lean
+    self.executor = executor
+    self.max_items = max_items
+    self.clock = clock
+    self.rng = rng or random.Random()
+    # Called with the feed's path each time it is rewritten
+    self.on_feed = on_feed
+    # Set when a board's passed jobs change, until the feed is written
+    self.feed_stale = False
+
+  def next_delay(self, state: BoardState) -> float:
+    if state.failures:
+      delay = state.interval * FAILURE_BACKOFF ** state.failures
+    else:
+      delay = state.interval * UNCHANGED_BACKOFF ** state.unchanged
+    delay = min(delay, max(self.max_backoff, state.interval))
+    return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+  def run_cycle(self) -> bool:
+    # Polls the boards that are due. Returns whether the feed was rewritten.
+    now = self.clock()
+    due = [state for state in self.states if state.next_run <= now]
+    if not due:
+      return False
+    by_board = {id(state.board): state for state in due}
+    succeeded = set()
+    for board, api_definition, data, digest in fetch_boards(
+            [(state.board, state.api_definition) for state in due],
+            concurrency=self.concurrency, per_host=self.per_host,
+            cache=self.cache):
+      state = by_board[id(board)]
+      if digest is not None and digest == state.digest:
+        print(f"{board['company_name']}: unchanged")
+        state.unchanged += 1
+        succeeded.add(id(board))
+        continue
+
+      print(f"----Board name: {board['company_name']}-----")
+      try:
+        jobs = parse_jobs(data, api_definition, board["company_name"],
+                          self.criteria, store=self.store, lean=self.lean,
+                          executor=self.executor, on_failed=discard_failed)
+      except Exception as e:
+        print(f"Error parsing jobs from {board['board_uri']}: {str(e)}")
+        continue
+      succeeded.add(id(board))
+      signature = passed_signature(jobs["passed"])
+      if signature != state.signature:
+        self.feed_stale = True
+        state.unchanged = 0
+        state.passed = jobs["passed"]
+        state.signature = signature
+      else:
+        state.unchanged += 1
+      state.digest = digest
+
+    for state in due:
+      if id(state.board) in succeeded:
+        state.failures = 0
+      else:
+        state.failures += 1
+      state.next_run = self.clock() + self.next_delay(state)
+
+    self.cache.evict()
+    if not self.feed_stale:
+      return False
+    self.write_feed()
+    self.feed_stale = False
+    return True
+
+  def write_feed(self):
+    jobs = [job for state in self.states for job in state.passed]
+    jobs.sort(key=lambda job: (job.created_at, job.url or ""),
+              reverse=True)
+    with RssWriter(self.feed_path, max_items=self.max_items) as feed:
+      feed.add_jobs(jobs)
+    print(f"Wrote {feed.count} jobs to {self.feed_path}")
+    if self.on_feed is not None:
+      self.on_feed(self.feed_path)
+
+  def seconds_until_due(self) -> float:
+    return max(0.0, min(state.next_run for state in self.states)
+               - self.clock())
+
+  def run(self, stop: threading.Event = None, max_cycles: int = None):
+    stop = stop or threading.Event()
+    cycles = 0
+    while not stop.is_set() and self.states:
+      try:
+        self.run_cycle()
+      except Exception as e:
+        # e.g. the feed couldn't be written; it stays stale and is tried
+        # again after the next poll.
+        print(f"Error in poll cycle: {str(e)}")
+      cycles += 1
+      if max_cycles is not None and cycles >= max_cycles:
+        break
+      stop.wait(self.seconds_until_due())
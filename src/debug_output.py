@@ -0,0 +1,74 @@
+import json
+import zlib
+from typing import Dict, Iterable
+
+from src.records import JobRecord
+
+DEFAULT_DEBUG_PATH = "debug.ndjson"
+RAW_FIELD = "json_str"
+
+
+class FailedJobWriter:
+  # Writes failed jobs to an NDJSON file, one line per job, as they are
+  # rejected (see parse_jobs' on_failed), so they never pile up in memory.
+  #
+  # raw_chars: None keeps each job's raw JSON (json_str) whole, 0 drops it,
+  #   and anything else truncates it to that many characters.
+  # sample: fraction of failed jobs to write. Picked by a hash of the job's
+  #   URL, so the same jobs are sampled on every run.
+  # max_jobs: stop writing after this many.
+  def __init__(self, path: str = DEFAULT_DEBUG_PATH, raw_chars: int = None,
+               sample: float = 1.0, max_jobs: int = None):
+    self.path = path
+    self.raw_chars = raw_chars
+    self.sample = sample
+    self.max_jobs = max_jobs
+    self.seen = 0
+    self.written = 0
+    self.file = open(path, "w", encoding="utf-8")
+
+  def __enter__(self) -> "FailedJobWriter":
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def sampled(self, job: Dict | JobRecord) -> bool:
+    if self.sample >= 1:
+      return True
+    if isinstance(job, JobRecord):
+      key = job.url or job.title
+    else:
+      key = job.get("url") or job.get("title")
+    key = str(key or "").encode("utf-8")
+    return zlib.crc32(key) / 2**32 < self.sample
+
+  # `fields` are added to the job's line, e.g. the criteria profile it
+  # failed.
+  def write(self, job: Dict | JobRecord, **fields):
+    self.seen += 1
+    if self.max_jobs is not None and self.written >= self.max_jobs:
+      return
+    if not self.sampled(job):
+      return
+    # Records are converted here, for the few jobs that are written
+    job = job.to_dict() if isinstance(job, JobRecord) else dict(job)
+    job.update(fields)
+    if self.raw_chars is not None and RAW_FIELD in job:
+      if self.raw_chars == 0:
+        del job[RAW_FIELD]
+      elif len(job[RAW_FIELD]) > self.raw_chars:
+        job[RAW_FIELD] = job[RAW_FIELD][:self.raw_chars] + "..."
+    self.file.write(json.dumps(job, default=str) + "\n")
+    self.written += 1
+
+  def write_jobs(self, jobs: Iterable[Dict | JobRecord], **fields):
+    for job in jobs:
+      self.write(job, **fields)
+    self.flush()
+
+  def flush(self):
+    self.file.flush()
+
+  def close(self):
+    self.file.close()
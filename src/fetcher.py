@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import urlparse
+
+from src.apis import fetch_board
+from src.cache import ResponseCache
+from src.resilience import guards
+from src.sessions import http_config
+from src.timings import timings
+from src.types import ApiDefinition, BoardConfig
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST_CONCURRENCY = 2
+
+
+class HostLimiter:
+  # Hands out semaphores per host so that no single job board gets more
+  # than `per_host` requests from us at a time: one held by each board
+  # being fetched, and one held around each request, since a board that
+  # prefetches pages sends several at once. They are separate so a board
+  # holding a slot never waits on itself.
+  def __init__(self, per_host: int):
+    self.per_host = per_host
+    self._lock = threading.Lock()
+    self._semaphores: Dict[str, threading.Semaphore] = {}
+    self._request_semaphores: Dict[str, threading.Semaphore] = {}
+
+  def _get(self, semaphores: Dict[str, threading.Semaphore],
+           url: str) -> threading.Semaphore:
+    host = urlparse(url).netloc.lower()
+    with self._lock:
+      if host not in semaphores:
+        semaphores[host] = threading.Semaphore(self.per_host)
+      return semaphores[host]
+
+  def for_url(self, url: str) -> threading.Semaphore:
+    return self._get(self._semaphores, url)
+
+  def requests_for_url(self, url: str) -> threading.Semaphore:
+    return self._get(self._request_semaphores, url)
+
+
+def _fetch_board(board: BoardConfig, api_definition: ApiDefinition,
+                 limiter: HostLimiter, cache: ResponseCache = None
+                 ) -> Tuple[Dict | None, str | None]:
+  name = board.get("company_name", board["board_uri"])
+  # A board that keeps failing is left alone for a while
+  breaker = guards.breaker(board["board_uri"], http_config(api_definition))
+  if not breaker.allow():
+    print(f"Skipping {name}: failed {breaker.threshold} times in a row, "
+          f"trying again in {breaker.retry_in():.0f}s")
+    timings.count("boards_skipped_circuit_open", board=name)
+    return None, None
+  data, digest = None, None
+  with limiter.for_url(board["board_uri"]):
+    try:
+      with timings.time("fetch_board_seconds", board=name):
+        data, digest = fetch_board(
+            board["board_uri"], api_definition, cache=cache,
+            slots=limiter.requests_for_url(board["board_uri"]))
+    except Exception as e:
+      print(f"Error fetching jobs from {board['board_uri']}: {str(e)}")
+  if data is None:
+    breaker.record_failure()
+  else:
+    breaker.record_success()
+  return data, digest
+
+
+# Fetches every board on a thread pool and yields
+# (board, api_definition, data, digest) in the order the boards finish, so
+# parsing can start on the fast boards while the slow ones are still
+# downloading. Boards that fail are skipped, as are boards whose circuit
+# is open after failing breaker_threshold fetches in a row (across runs
+# when main saves the breakers, see src/resilience.py). The digest is None
+# unless a response cache is used.
+def fetch_boards(boards: List[Tuple[BoardConfig, ApiDefinition]],
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host: int = DEFAULT_PER_HOST_CONCURRENCY,
+                 cache: ResponseCache = None
+                 ) -> Iterator[Tuple[BoardConfig, ApiDefinition, Dict, str | None]]:
+  limiter = HostLimiter(per_host)
+  with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+    futures = {
+        executor.submit(_fetch_board, board, api_definition, limiter, cache):
+        (board, api_definition)
+        for board, api_definition in boards
+    }
+    for future in as_completed(futures):
+      board, api_definition = futures[future]
+      data, digest = future.result()
+      if data is None:
+        continue
+      yield board, api_definition, data, digest
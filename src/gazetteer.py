@@ -0,0 +1,171 @@
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Tuple
+
+FIXED_DATA_PATH = os.path.join(os.path.dirname(__file__), "fixed_data.py")
+DEFAULT_INDEX_PATH = os.path.join(".cache", "gazetteer.pickle")
+
+_TOKEN = re.compile(r"[^\W_]+(?:['.-][^\W_]+)*\.?")
+_KINDS = {"c": "city", "o": "county", "s": "state"}
+_KIND_CODES = {kind: code for code, kind in _KINDS.items()}
+
+
+class Place(NamedTuple):
+  kind: str  # "city", "county" or "state"
+  name: str
+  # The state's name for states, and for cities and counties followed by
+  # their state ("Austin, TX"). None when the text doesn't say.
+  state: str | None
+
+
+def _read_fixed_data(path: str) -> Dict[str, List[str]]:
+  # fixed_data.py is a 300 KB module of set([...]) literals. Reading the
+  # lists straight from its syntax tree keeps their order (state_ids lines up
+  # with states) and avoids importing it.
+  import ast
+  with open(path, "r") as f:
+    tree = ast.parse(f.read())
+  data = {}
+  for node in tree.body:
+    if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+      data[node.targets[0].id] = ast.literal_eval(node.value.args[0])
+  return data
+
+
+def _source_signature(path: str) -> Tuple[int, int]:
+  stat = os.stat(path)
+  return stat.st_mtime_ns, stat.st_size
+
+
+class Gazetteer:
+  def __init__(self, phrases: Dict[str, str], state_ids: Dict[str, str],
+               source: Tuple[int, int] = None):
+    # "new york" -> "sNew York\noNew York\ncNew York": one kind code and
+    # name per line. Plain strings unpickle about twice as fast as tuples.
+    self.phrases = phrases
+    # "NY" -> "New York"
+    self.state_ids = state_ids
+    self.source = source
+    self.max_words = max((phrase.count(" ") + 1 for phrase in phrases),
+                         default=1)
+
+  @classmethod
+  def build(cls, path: str = FIXED_DATA_PATH) -> "Gazetteer":
+    data = _read_fixed_data(path)
+    phrases: Dict[str, List[Tuple[str, str]]] = {}
+    for kind, names in (("state", data["states"]),
+                        ("county", data["counties"]),
+                        ("city", data["cities"])):
+      for name in names:
+        key = " ".join(_TOKEN.findall(name.lower()))
+        if key and (kind, name) not in phrases.setdefault(key, []):
+          phrases[key].append((kind, name))
+    state_ids = dict(zip(data["state_ids"], data["states"]))
+    return cls({key: "\n".join(_KIND_CODES[kind] + name for kind, name in places)
+                for key, places in phrases.items()},
+               state_ids, _source_signature(path))
+
+  def lookup(self, phrase: str) -> List[Tuple[str, str]]:
+    places = self.phrases.get(phrase)
+    if places is None:
+      return []
+    return [(_KINDS[place[0]], place[1:]) for place in places.split("\n")]
+
+  # Resolves a flattened location string to the places it names, in one
+  # left-to-right pass over its words, preferring the longest name at each
+  # word. State abbreviations only count in upper case, so "in" or "or"
+  # aren't read as Indiana or Oregon.
+  def resolve(self, text: str) -> List[Place]:
+    tokens = _TOKEN.findall(text)
+    lowered = [token.lower() for token in tokens]
+    found: List[List[Tuple[str, str]]] = []
+    i = 0
+    while i < len(tokens):
+      for width in range(min(self.max_words, len(tokens) - i), 0, -1):
+        places = self.lookup(" ".join(lowered[i:i + width]))
+        if places:
+          found.append(places)
+          i += width
+          break
+      else:
+        state = self.state_ids.get(tokens[i])
+        if state is not None:
+          found.append([("state", state)])
+        i += 1
+
+    places = []
+    for j, group in enumerate(found):
+      # "Austin, TX": a city or county followed by a state is in that state,
+      # and "Washington, DC" is then not the state of Washington.
+      following = [name for kind, name in found[j + 1]
+                   if kind == "state"] if j + 1 < len(found) else []
+      if following and any(kind != "state" for kind, _ in group):
+        group = [(kind, name) for kind, name in group if kind != "state"]
+      for kind, name in group:
+        if kind == "state":
+          places.append(Place(kind, name, name))
+        else:
+          places.append(Place(kind, name, following[0] if following else None))
+    return places
+
+  def states_in(self, text: str) -> set:
+    return {place.state for place in self.resolve(text) if place.state}
+
+  def normalize_state(self, state: str) -> str | None:
+    if state in self.state_ids:
+      return self.state_ids[state]
+    for kind, name in self.lookup(" ".join(_TOKEN.findall(state.lower()))):
+      if kind == "state":
+        return name
+    return None
+
+
+def load_gazetteer(index_path: str = DEFAULT_INDEX_PATH,
+                   source_path: str = FIXED_DATA_PATH) -> Gazetteer:
+  # Loads the pickled index, rebuilding it when fixed_data.py has changed.
+  import pickle
+  signature = _source_signature(source_path)
+  try:
+    with open(index_path, "rb") as f:
+      gazetteer = pickle.load(f)
+    if gazetteer.source == signature:
+      return gazetteer
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+    pass
+
+  gazetteer = Gazetteer.build(source_path)
+  try:
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+      pickle.dump(gazetteer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, index_path)
+  except OSError as e:
+    print(f"Could not save gazetteer index to {index_path}: {str(e)}")
+  return gazetteer
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def use_gazetteer(gazetteer: Gazetteer):
+  # Installs an index loaded some other way, e.g. with the config snapshot
+  global _gazetteer
+  with _gazetteer_lock:
+    _gazetteer = gazetteer
+
+
+def loaded_gazetteer() -> Gazetteer | None:
+  return _gazetteer
+
+
+def get_gazetteer() -> Gazetteer:
+  # Nothing is read until the first location lookup that needs it.
+  global _gazetteer
+  if _gazetteer is None:
+    with _gazetteer_lock:
+      if _gazetteer is None:
+        _gazetteer = load_gazetteer()
+  return _gazetteer
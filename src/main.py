@@ -1,32 +1,321 @@
+import argparse
+import contextlib
 import json
+import os
+import resource
+import signal
+import threading
 from datetime import datetime
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
-from src.apis import fetch_data_from_board
-from src.parse import parse_jobs
-from src.rss import convert_to_rss
+from src.cache import (DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES,
+                       DEFAULT_CACHE_TTL, ParseCache, ResponseCache)
+from src.criteria import CompiledCriteria, compile_criteria
+from src.daemon import (DEFAULT_INTERVAL, DEFAULT_JITTER, DEFAULT_MAX_BACKOFF,
+                        Daemon)
+from src.debug_output import DEFAULT_DEBUG_PATH, FailedJobWriter
+from src.fetcher import (DEFAULT_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY,
+                         fetch_boards)
+from src.parse import (create_parse_pool, discard_failed, parse_jobs,
+                       parse_jobs_for_profiles)
+from src.parse_stats import ParseJobsStats
+from src.plans import AdapterPlan, compile_adapters
+from src.records import JobRecord, verdicts_from_dicts, verdicts_to_dicts
+from src.resilience import BREAKER_STATE_FILE, guards
+from src.rss import DEFAULT_FEED_PATH, RssWriter
+from src.server import DEFAULT_PORT, FeedServer
+from src.snapshot import DEFAULT_SNAPSHOT_PATH, load_snapshot, save_snapshot
+from src.store import DEFAULT_STORE_PATH, JobStore
+from src.timings import timings
 from src.types import ApiDefinition, BoardConfig
 
+if TYPE_CHECKING:
+  from concurrent.futures import ProcessPoolExecutor
 
+
+# For a single board; main() compiles each adapter once and hydrates its
+# plan for every board using it.
 def hydrate_api_definition(api_definition: ApiDefinition,
                            api_vars: Dict) -> ApiDefinition:
-  hydrated_definition = json.loads(json.dumps(api_definition))
+  return AdapterPlan(api_definition).hydrate(api_vars)
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      description="Fetch job boards, filter them and write an RSS feed.")
+  parser.add_argument(
+      "--snapshot", nargs="?", const=DEFAULT_SNAPSHOT_PATH, default=None,
+      help="Load the boards, criteria and gazetteer from a snapshot of the "
+      "config files, rebuilt whenever one of them changes")
+  parser.add_argument(
+      "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+      help="Maximum number of boards fetched at the same time")
+  parser.add_argument(
+      "--per-host", type=int, default=DEFAULT_PER_HOST_CONCURRENCY,
+      help="Maximum number of concurrent requests to a single host, "
+      "including streamed bodies still being read")
+  parser.add_argument(
+      "--cache", action="store_true",
+      help="Revalidate board responses against an on-disk cache and reuse "
+      "the parsed jobs of boards that did not change")
+  parser.add_argument(
+      "--cache-dir", default=DEFAULT_CACHE_DIR,
+      help="Where the caches are kept, and which boards' circuits are open "
+      "(used with or without --cache)")
+  parser.add_argument(
+      "--cache-ttl", type=float, default=DEFAULT_CACHE_TTL,
+      help="Seconds before a cached response is dropped")
+  parser.add_argument(
+      "--cache-max-bytes", type=int, default=DEFAULT_CACHE_MAX_BYTES,
+      help="Size the cache is trimmed to, least recently used first")
+  parser.add_argument(
+      "--store", nargs="?", const=DEFAULT_STORE_PATH, default=None,
+      help="SQLite job store; postings unchanged since the last run keep "
+      "their previous verdict and first-seen date")
+  parser.add_argument(
+      "--lean", action="store_true",
+      help="Don't keep a JSON copy of every job (json_str) on parsed and "
+      "failed jobs; build it only while a job is being filtered")
+  parser.add_argument(
+      "--workers", type=int, default=0,
+      help="Parse jobs on a pool of this many processes (default: parse in "
+      "this process). Experimental: not yet shown to be faster on several "
+      "cores, and slower on one, where it is ignored")
+  parser.add_argument(
+      "--incremental", action="store_true",
+      help="Keep the items of the existing feed that weren't seen in this "
+      "run, after the new ones")
+  parser.add_argument(
+      "--max-items", type=int, default=None,
+      help="Maximum number of items in the feed, newest run first")
+  parser.add_argument(
+      "--debug", nargs="?", const=DEFAULT_DEBUG_PATH, default=None,
+      help="Write the jobs that failed the filters, with the reasons, to "
+      "this NDJSON file (parsed jobs aren't reused from --cache meanwhile)")
+  parser.add_argument(
+      "--debug-raw-chars", type=int, default=None,
+      help="Truncate each failed job's raw JSON to this many characters "
+      "(0 leaves it out)")
+  parser.add_argument(
+      "--debug-sample", type=float, default=1.0,
+      help="Fraction of failed jobs to write")
+  parser.add_argument(
+      "--debug-max", type=int, default=None,
+      help="Maximum number of failed jobs to write")
+  parser.add_argument(
+      "--timings", action="store_true",
+      help="Time every filter on every job, and print fetch and filter "
+      "timings at the end")
+  parser.add_argument(
+      "--timings-json", default=None,
+      help="Write fetch and filter timings to this file as JSON")
+  parser.add_argument(
+      "--timings-prom", default=None,
+      help="Write fetch and filter timings to this file in the Prometheus "
+      "text format")
+  parser.add_argument(
+      "--daemon", action="store_true",
+      help="Keep running, polling each board on its own interval and "
+      "rewriting the feed when a board's jobs change")
+  parser.add_argument(
+      "--interval", type=float, default=DEFAULT_INTERVAL,
+      help="Seconds between polls of a board, unless the board sets "
+      "refresh_interval (daemon mode)")
+  parser.add_argument(
+      "--jitter", type=float, default=DEFAULT_JITTER,
+      help="Randomize each delay by up to this fraction (daemon mode)")
+  parser.add_argument(
+      "--max-backoff", type=float, default=DEFAULT_MAX_BACKOFF,
+      help="Longest delay for boards that fail or don't change (daemon "
+      "mode)")
+  parser.add_argument(
+      "--serve", nargs="?", type=int, const=DEFAULT_PORT, default=None,
+      help="Also serve the feed over HTTP on this port, switching to each "
+      "new version as it is written (daemon mode)")
+  parser.add_argument(
+      "--profile", action="append", default=None, metavar="[NAME=]PATH",
+      help="A criteria file to filter by instead of src/criteria.json. "
+      "Repeat it to filter every board against several profiles in one "
+      "run, writing jobs.NAME.rss for each (NAME defaults to the file's "
+      "name)")
+  return parser.parse_args(argv)
+
+
+def load_profiles(specs: List[str]) -> Dict[str, Dict] | None:
+  profiles = {}
+  for spec in specs:
+    name, _, path = spec.rpartition("=")
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    try:
+      with open(path, "r") as f:
+        profiles[name] = json.load(f)
+    except FileNotFoundError:
+      print(f"Error: profile {path} not found.")
+      return None
+  return profiles
+
+
+def profile_feed_path(name: str) -> str:
+  base, extension = os.path.splitext(DEFAULT_FEED_PATH)
+  return f"{base}.{name}{extension}"
+
+
+def peak_rss_mb() -> float:
+  # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_daemon(args: argparse.Namespace,
+               boards: List[Tuple[BoardConfig, ApiDefinition]],
+               criteria: CompiledCriteria, response_cache: ResponseCache,
+               store: JobStore, parse_pool: "ProcessPoolExecutor"):
+  # Unchanged boards are detected by their response digest, so the daemon
+  # always revalidates against the response cache.
+  if response_cache is None:
+    response_cache = ResponseCache(
+        os.path.join(args.cache_dir, "http"), ttl=args.cache_ttl,
+        max_bytes=args.cache_max_bytes)
+  daemon = Daemon(
+      boards, criteria, response_cache, feed_path=DEFAULT_FEED_PATH,
+      interval=args.interval, jitter=args.jitter,
+      max_backoff=args.max_backoff, concurrency=args.concurrency,
+      per_host=args.per_host, store=store, lean=args.lean,
+      executor=parse_pool, max_items=args.max_items)
+  server = None
+  if args.serve is not None:
+    server = FeedServer(port=args.serve)
+    if os.path.exists(DEFAULT_FEED_PATH):
+      server.load(DEFAULT_FEED_PATH)
+    daemon.on_feed = server.load
+    server.start()
+    print(f"Serving {DEFAULT_FEED_PATH} on http://127.0.0.1:{server.port}/")
+  stop = threading.Event()
+  signal.signal(signal.SIGTERM, lambda *_: stop.set())
+  try:
+    daemon.run(stop)
+  except KeyboardInterrupt:
+    pass
+  finally:
+    if server is not None:
+      server.stop()
+    if store is not None:
+      store.close()
+    if parse_pool is not None:
+      parse_pool.shutdown()
+    guards.save(os.path.join(args.cache_dir, BREAKER_STATE_FILE))
+
+
+def run_once(args: argparse.Namespace,
+             boards: List[Tuple[BoardConfig, ApiDefinition]],
+             criteria: CompiledCriteria, response_cache: ResponseCache,
+             parse_cache: ParseCache, store: JobStore,
+             parse_pool: "ProcessPoolExecutor",
+             debug_output: FailedJobWriter = None):
+  # Items are written to the feed as each board is parsed, and it replaces
+  # jobs.rss only once every board is done. Boards finish in any order, so
+  # readers should go by each item's pubDate.
+  #
+  # Failed jobs are written to the debug file as they are rejected, or
+  # dropped straight away without one. So the parse cache only holds passed
+  # jobs, and isn't reused with --debug, which would leave the unchanged
+  # boards' failed jobs out of the file.
+  on_failed = discard_failed
+  if debug_output is not None:
+    on_failed = debug_output.write
+    parse_cache = None
+  with RssWriter(DEFAULT_FEED_PATH, max_items=args.max_items,
+                 incremental=args.incremental) as feed:
+    for api, api_def, data, digest in fetch_boards(
+            boards, concurrency=args.concurrency, per_host=args.per_host,
+            cache=response_cache):
+      print(f"----Board name: {api['company_name']}-----")
+      parse_key = None
+      jobs = None
+      if parse_cache is not None and digest is not None:
+        parse_key = parse_cache.key(
+            api["company_name"], digest, api_def, criteria.source, args.lean)
+        jobs = parse_cache.get(parse_key)
+        if jobs is not None:
+          jobs = verdicts_from_dicts(jobs)
+          print(f"Unchanged since last run, reusing {len(jobs['passed'])} "
+                "passed jobs")
+      if jobs is None:
+        # A streamed board can still fail here, part way through its body
+        try:
+          jobs = parse_jobs(data, api_def, api["company_name"], criteria,
+                            store=store, lean=args.lean, executor=parse_pool,
+                            on_failed=on_failed)
+        except Exception as e:
+          print(f"Error parsing jobs from {api['board_uri']}: {str(e)}")
+          continue
+        if parse_key is not None:
+          parse_cache.set(parse_key, verdicts_to_dicts(jobs))
+      # Newest first within a board, so the feed is stable across runs for
+      # a board that didn't change.
+      feed.add_jobs(sorted(
+          jobs["passed"],
+          key=lambda job: (job.created_at, job.url or ""),
+          reverse=True))
+      if debug_output is not None:
+        debug_output.flush()
+  print(f"Total jobs sent to RSS: {feed.count}")
+
 
-  if "vars" not in hydrated_definition:
-    return hydrated_definition
+# Fetches every board once and filters it against all the profiles, with
+# a feed and stats per profile. The job store, parse cache and parse pool
+# each hold one set of criteria, so they aren't used here.
+def run_profiles(args: argparse.Namespace,
+                 boards: List[Tuple[BoardConfig, ApiDefinition]],
+                 profiles: Dict[str, Dict], response_cache: ResponseCache,
+                 debug_output: FailedJobWriter = None):
+  stats = {name: ParseJobsStats() for name in profiles}
 
-  vars_to_replace = hydrated_definition["vars"]
-  definition_str = json.dumps(hydrated_definition)
+  # As in run_once, failed jobs are written or dropped as they are rejected
+  def on_failed(name: str, job: JobRecord):
+    if debug_output is not None:
+      debug_output.write(job, profile=name)
 
-  for var_name, var_placeholder in vars_to_replace.items():
-    if var_name in api_vars:
-      definition_str = definition_str.replace(
-          var_placeholder, api_vars[var_name])
+  with contextlib.ExitStack() as stack:
+    feeds = {
+        name: stack.enter_context(RssWriter(
+            profile_feed_path(name), max_items=args.max_items,
+            incremental=args.incremental))
+        for name in profiles
+    }
+    for api, api_def, data, _ in fetch_boards(
+            boards, concurrency=args.concurrency, per_host=args.per_host,
+            cache=response_cache):
+      print(f"----Board name: {api['company_name']}-----")
+      try:
+        results = parse_jobs_for_profiles(data, api_def, api["company_name"],
+                                          profiles, lean=args.lean,
+                                          on_failed=on_failed)
+      except Exception as e:
+        print(f"Error parsing jobs from {api['board_uri']}: {str(e)}")
+        continue
+      for name, result in results.items():
+        stats[name].merge(result["stats"])
+        print(f"{name}: {result['stats'].passed_all_filters} of "
+              f"{result['stats'].total} passed")
+        feeds[name].add_jobs(sorted(
+            result["passed"],
+            key=lambda job: (job.created_at, job.url or ""),
+            reverse=True))
+      if debug_output is not None:
+        debug_output.flush()
 
-  return json.loads(definition_str)
+  for name in profiles:
+    print(f"----Profile: {name}-----")
+    stats[name].print_stats()
+    print(f"Total jobs sent to {profile_feed_path(name)}: "
+          f"{feeds[name].count}")
 
 
-def main():
+# Returns the hydrated boards, the criteria and the profiles (None for a
+# single set of criteria), or None when a config file is missing
+def load_config(args: argparse.Namespace
+                ) -> Tuple[List[Tuple[BoardConfig, ApiDefinition]], Dict | None,
+                           Dict[str, Dict] | None] | None:
   try:
     with open("src/api_definitions.json", "r") as f:
       api_definitions: Dict[str, ApiDefinition] = json.load(f)
@@ -34,7 +323,7 @@ def main():
     print(
         "Error: api_definitions.json not found. Please ensure this file exists in the current directory."
     )
-    return
+    return None
 
   try:
     with open("src/boards.json", "r") as f:
@@ -43,41 +332,113 @@ def main():
     print(
         "Error: boards.json not found. Please ensure this file exists in the current directory."
     )
-    return
+    return None
 
-  try:
-    with open("src/criteria.json", "r") as f:
-      criteria: Dict = json.load(f)
-  except FileNotFoundError:
-    print(
-        "Error: boards.json not found. Please ensure this file exists in the current directory."
-    )
+  criteria = None
+  profiles = None
+  if args.profile:
+    profiles = load_profiles(args.profile)
+    if profiles is None:
+      return None
+    if len(profiles) == 1:
+      [criteria] = profiles.values()
+      profiles = None
+    elif args.daemon or args.store or args.workers:
+      print("Error: --daemon, --store and --workers take a single profile.")
+      return None
+  else:
+    try:
+      with open("src/criteria.json", "r") as f:
+        criteria: Dict = json.load(f)
+    except FileNotFoundError:
+      print(
+          "Error: boards.json not found. Please ensure this file exists in the current directory."
+      )
+      return None
+
+  adapters = compile_adapters(api_definitions)
+  boards = [(api, adapters[api["adapter"]].hydrate(api.get("api_vars")))
+            for api in apis]
+  return boards, criteria, profiles
+
+
+def main(argv: List[str] = None):
+  args = parse_args(argv)
+  # The snapshot is only of the default config files
+  use_snapshot = args.snapshot and not args.profile
+  snapshot = load_snapshot(args.snapshot) if use_snapshot else None
+  if snapshot is not None:
+    boards, criteria, profiles = snapshot.boards, snapshot.criteria, None
+  else:
+    config = load_config(args)
+    if config is None:
+      return
+    boards, criteria, profiles = config
+    if use_snapshot:
+      criteria = compile_criteria(criteria)
+      save_snapshot(boards, criteria, args.snapshot)
+
+  response_cache = None
+  parse_cache = None
+  if args.cache:
+    cache_options = {"ttl": args.cache_ttl, "max_bytes": args.cache_max_bytes}
+    response_cache = ResponseCache(
+        os.path.join(args.cache_dir, "http"), **cache_options)
+    parse_cache = ParseCache(
+        os.path.join(args.cache_dir, "parsed"), **cache_options)
+
+  timings.detailed = bool(
+      args.timings or args.timings_json or args.timings_prom)
+  # Without this a one-shot run would never open a board's circuit
+  breaker_path = os.path.join(args.cache_dir, BREAKER_STATE_FILE)
+  guards.load(breaker_path)
+  store = JobStore(args.store) if args.store else None
+  parse_pool = None
+  if profiles is None:
+    compiled_criteria = compile_criteria(criteria)
+    # On one CPU the pool only adds the cost of sending jobs to it
+    if args.workers > 0 and (os.cpu_count() or 1) < 2:
+      print("Ignoring --workers: parsing in this process on a single CPU.")
+    elif args.workers > 0:
+      parse_pool = create_parse_pool(args.workers, compiled_criteria)
+  if args.daemon:
+    run_daemon(args, boards, compiled_criteria, response_cache, store,
+               parse_pool)
     return
 
-  # Fetch jobs from all APIs
-  all_jobs = []
-  failed_jobs = []
-  for api in apis:
-    print(f"----Board name: {api['company_name']}-----")
-    adapter = api_definitions[api["adapter"]]
-    api_def = None
-    if 'api_vars' in api:
-      api_def = hydrate_api_definition(adapter, api['api_vars'])
-    else:
-      api_def = adapter
-    data = fetch_data_from_board(api["board_uri"], api_def)
-    jobs = parse_jobs(data, api_def, api["company_name"], criteria)
-    all_jobs.extend(jobs["passed"])
-    failed_jobs.extend(jobs["failed"])
-  print(f"Total jobs sent to RSS: {len(all_jobs)}")
-  rss_feed = convert_to_rss(all_jobs)
-
-  if True:
-    with open("debug.json", "w") as f:
-      json.dump(failed_jobs, f, indent=2, default=str)
-  # Write RSS feed to file
-  with open("jobs.rss", "w") as f:
-    f.write(rss_feed)
+  debug_output = None
+  if args.debug:
+    debug_output = FailedJobWriter(
+        args.debug, raw_chars=args.debug_raw_chars, sample=args.debug_sample,
+        max_jobs=args.debug_max)
+
+  if profiles is not None:
+    run_profiles(args, boards, profiles, response_cache, debug_output)
+  else:
+    run_once(args, boards, compiled_criteria, response_cache, parse_cache,
+             store, parse_pool, debug_output)
+
+  guards.save(breaker_path)
+  if args.cache:
+    response_cache.evict()
+    parse_cache.evict()
+  if store is not None:
+    store.close()
+  if parse_pool is not None:
+    parse_pool.shutdown()
+  if debug_output is not None:
+    debug_output.close()
+    print(f"Wrote {debug_output.written} of {debug_output.seen} failed jobs "
+          f"to {args.debug}")
+  if timings.detailed:
+    timings.print_table()
+  if args.timings_json:
+    with open(args.timings_json, "w") as f:
+      f.write(timings.to_json())
+  if args.timings_prom:
+    with open(args.timings_prom, "w") as f:
+      f.write(timings.to_prometheus())
+  print(f"Peak RSS{' (lean)' if args.lean else ''}: {peak_rss_mb():.1f} MB")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+import re
+from typing import Dict, Iterable, List
+
+_END = ""
+
+
+def _trie_pattern(node: Dict) -> str:
+  # Turns the trie into a regex with shared prefixes factored out, e.g.
+  # ["engineer", "engineering", "eng manager"] -> "eng(?:ineer(?:ing)?| manager)"
+  alternatives = [re.escape(char) + _trie_pattern(child)
+                  for char, child in sorted(node.items()) if char != _END]
+  if not alternatives:
+    return ""
+  pattern = alternatives[0] if len(alternatives) == 1 \
+      else "(?:" + "|".join(alternatives) + ")"
+  if _END in node:
+    return "(?:" + pattern + ")?"
+  return pattern
+
+
+class TermMatcher:
+  # Finds which of many terms occur anywhere in a (lowercased) text, with the
+  # same result as checking `term.lower() in text` for every term.
+  #
+  # With a handful of terms a `in` check per term is as fast as it gets.
+  # Past SCAN_THRESHOLD terms they go into a trie, and the trie into a single
+  # regex, so one regex pass over the text only stops where some term
+  # starts. From each position in a match we walk the trie to pick up every
+  # term starting there (e.g. both "engineer" and "engineering", or
+  # "engineer" inside "software engineer").
+  SCAN_THRESHOLD = 100
+
+  def __init__(self, terms: Iterable[str]):
+    self.terms_by_key: Dict[str, List[str]] = {}
+    for term in terms:
+      self.terms_by_key.setdefault(term.lower(), []).append(term)
+
+    # "" is in every string
+    self.always = self.terms_by_key.get("", [])
+    self.keys = [key for key in self.terms_by_key if key]
+    self.trie: Dict = {}
+    self.pattern = None
+    if len(self.keys) < self.SCAN_THRESHOLD:
+      return
+
+    for key in self.keys:
+      node = self.trie
+      for char in key:
+        node = node.setdefault(char, {})
+      node[_END] = key
+    self.pattern = re.compile(_trie_pattern(self.trie))
+
+  def find_keys(self, text: str) -> List[str]:
+    if self.pattern is None:
+      return [key for key in self.keys if key in text]
+
+    found = {}
+    remaining = len(self.keys)
+    for match in self.pattern.finditer(text):
+      for start in range(match.start(), match.end()):
+        node = self.trie
+        for i in range(start, len(text)):
+          node = node.get(text[i])
+          if node is None:
+            break
+          key = node.get(_END)
+          if key is not None and key not in found:
+            found[key] = True
+            remaining -= 1
+      if remaining == 0:
+        break
+    return list(found)
+
+  def find(self, text: str) -> List[str]:
+    found = set(self.always)
+    for key in self.find_keys(text):
+      found.update(self.terms_by_key[key])
+    return list(found)
+
+
+# Order matters: when several patterns occur in a job, the first pattern in
+# this list wins, and within a pattern the first occurrence in the text.
+YEARS_OF_EXPERIENCE_PATTERNS = [
+    # Handles "10+ years experience" - this pattern needs to be first
+    r"(\d+)\+\s*(?:years|yrs)",
+    # Handles ">5 years" or "≥5 years"
+    r"[>≥](\d+)\+?\s*(?:years|yrs)",
+    # Handles "minimum of 5 years"
+    r"minimum\s*(?:of\s*)?(\d+)(?:\s*-\s*\d+)?\+?\s*(?:years|yrs)",
+    # Handles "at least 5 years"
+    r"at\s*least\s*(\d+)(?:\s*-\s*\d+)?\+?\s*(?:years?|yrs?)",
+    # Handles "5-10 years experience"
+    r"(\d+)(?:\s*-\s*\d+)?\s*(?:years|yrs)(?:\s*of)?\s*(?:experience|exp)",
+    # Handles "5 years" or "5-10 years"
+    r"(\d+)(?:\s*-\s*\d+)?\s*(?:years|yrs)",
+    # Handles written numbers like "three years"
+    r"(one|two|three|four|five|six|seven|eight|nine)\s*(?:years?|yrs?)(?:\s*of)?\s*(?:experience|exp)?",
+]
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9
+}
+
+# Pattern i is wrapped in group 2i + 1 and its number is group 2i + 2.
+_YEARS_PATTERN = re.compile(
+    "|".join(f"({pattern})" for pattern in YEARS_OF_EXPERIENCE_PATTERNS))
+# Every pattern contains "year" or "yr", so those are the only places in a
+# job worth looking at.
+_YEARS_ANCHOR = re.compile(r"y(?:ears?|rs?)")
+# Everything a pattern can have in front of its "years", read backwards
+# (over a reversed copy of the text) from the anchor.
+_YEARS_PREFIX_REVERSED = re.compile(
+    r"(?:[\d\s+\->≥]|"
+    + "|".join(word[::-1] for word in
+               ["minimum", "of", "at", "least", *NUMBER_WORDS]) + ")*")
+
+
+def extract_years_of_experience(text: str) -> int | None:
+  # Single pass over the text: find each "year"/"yr", step back over what
+  # could be the start of a pattern, and try all patterns at once at each of
+  # those few positions. Keeps the highest priority hit and stops early on
+  # the first-priority pattern.
+  best_priority = None
+  best_years = None
+  reversed_text = None
+  scanned_to = 0
+  for anchor in _YEARS_ANCHOR.finditer(text):
+    end = anchor.start()
+    if reversed_text is None:
+      reversed_text = text[::-1]
+    reversed_start = len(text) - end
+    prefix = _YEARS_PREFIX_REVERSED.match(reversed_text, reversed_start)
+    start = max(end - (prefix.end() - reversed_start), scanned_to)
+    for position in range(start, end):
+      match = _YEARS_PATTERN.match(text, position)
+      if match is None:
+        continue
+      priority = (match.lastindex - 1) // 2
+      if best_priority is None or priority < best_priority:
+        best_priority = priority
+        number = match.group(match.lastindex + 1)
+        best_years = NUMBER_WORDS[number] if number in NUMBER_WORDS \
+            else int(number)
+        if priority == 0:
+          return best_years
+    scanned_to = end
+  return best_years
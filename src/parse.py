@@ -1,32 +1,66 @@
 import json
 import re
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List
+from itertools import islice
+from time import perf_counter
+from typing import (TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List,
+                    Tuple)
 
 # from fixed_data import cities, counties, state_ids, states
+from src.criteria import (CompiledCriteria, compile_criteria,
+                          compile_location_states, compile_locations,
+                          compile_role_terms)
+from src.gazetteer import get_gazetteer
+from src.matchers import extract_years_of_experience
 from src.parse_stats import ParseJobsStats
+from src.plans import JobFormat, compile_job_format
+from src.records import FilterFailure, JobRecord
+from src.store import JobStore
+from src.timings import Stopwatch, Timings, timings
 from src.types import ApiDefinition
 
+if TYPE_CHECKING:
+  from concurrent.futures import ProcessPoolExecutor
+
+
+# Nesting and leaves past these are left out of a flattened location, so an
+# odd payload can't blow the stack or the filters' time.
+FLATTEN_MAX_DEPTH = 64
+FLATTEN_MAX_LEAVES = 1000
 
 # Takes in json, like: {"location": [{"state": "Alaska"}, {"state": "Alabama"}]}
-# and returns: ["Alaska", "Alabama"]
-def flatten_json_to_list(obj) -> str:
-  result = []
-  # Warning: Recursive. (TODO) Reimplemnt without recursion
-
-  def _flatten(current_obj, current_path=""):
-    if isinstance(current_obj, dict):
-      for key, value in current_obj.items():
-        _flatten(value, f"{current_path}.{key}" if current_path else key)
-    elif isinstance(current_obj, list):
-      for i, item in enumerate(current_obj):
-        _flatten(item, f"{current_path}[{i}]")
+# and yields: "Alaska", "Alabama", depth first, in document order. Walks the
+# json with a stack of iterators rather than recursing.
+def iter_json_leaves(obj, max_depth: int = FLATTEN_MAX_DEPTH,
+                     max_leaves: int = FLATTEN_MAX_LEAVES) -> Iterator[str]:
+  if not isinstance(obj, (dict, list)):
+    yield str(obj).replace(',', '').strip()
+    return
+  stack = [iter(obj.values() if isinstance(obj, dict) else obj)]
+  leaves = 0
+  while stack:
+    for value in stack[-1]:
+      if isinstance(value, dict):
+        if len(stack) < max_depth:
+          stack.append(iter(value.values()))
+          break
+      elif isinstance(value, list):
+        if len(stack) < max_depth:
+          stack.append(iter(value))
+          break
+      else:
+        if leaves >= max_leaves:
+          return
+        leaves += 1
+        yield str(value).replace(',', '').strip()
     else:
-      result.append(str(current_obj).replace(',', '').strip())
+      stack.pop()
 
-  _flatten(obj)
-  return " ".join(result)
+
+def flatten_json_to_list(obj) -> str:
+  return " ".join(iter_json_leaves(obj))
 
 
 # Question: Does this only work for json?
@@ -41,58 +75,51 @@ def get_json_key(obj: any, path: str) -> any:
 
 
 def find_years_of_experience_in_job(job_json_str: str) -> int | None:
-  experience_patterns = [
-      # Handles "10+ years experience" - this pattern needs to be first
-      r"(\d+)\+\s*(?:years|yrs)",
-      # Handles ">5 years" or "≥5 years"
-      r"[>≥](\d+)\+?\s*(?:years|yrs)",
-      # Handles "minimum of 5 years"
-      r"minimum\s*(?:of\s*)?(\d+)(?:\s*-\s*\d+)?\+?\s*(?:years|yrs)",
-      # Handles "at least 5 years"
-      r"at\s*least\s*(\d+)(?:\s*-\s*\d+)?\+?\s*(?:years?|yrs?)",
-      # Handles "5-10 years experience"
-      r"(\d+)(?:\s*-\s*\d+)?\s*(?:years|yrs)(?:\s*of)?\s*(?:experience|exp)",
-      # Handles "5 years" or "5-10 years"
-      r"(\d+)(?:\s*-\s*\d+)?\s*(?:years|yrs)",
-      # Handles written numbers like "three years"
-      r"(one|two|three|four|five|six|seven|eight|nine)\s*(?:years?|yrs?)(?:\s*of)?\s*(?:experience|exp)?",
-  ]
-  number_map = {
-      'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-      'six': 6, 'seven': 7, 'eight': 8, 'nine': 9
-  }
-
-  for pattern in experience_patterns:
-    matches = re.findall(pattern, job_json_str)
-    for match in matches:
-      try:
-
-        if isinstance(match, str) and match.lower() in number_map:
-          return number_map[match.lower()]
-        years = int(match.split("-")[0].strip())
-        return years
-      except ValueError:
-        continue
-
-
-def location_match(locations: str, criteria: Dict) -> bool:
-  if not locations or not criteria["location_whitelist"]:
+  return extract_years_of_experience(job_json_str)
+
+
+# `locations` is a flattened location, or its leaves (from iter_json_leaves).
+# Leaves are searched one at a time, stopping at the first that matches;
+# the joined text is only searched, for matches spanning leaves and for
+# states, when none does.
+def location_match(locations: str | List[str],
+                   criteria: Dict | CompiledCriteria) -> bool:
+  if isinstance(criteria, CompiledCriteria):
+    location_pattern = criteria.location_pattern
+    location_states = criteria.location_states
+  else:
+    location_pattern, _ = compile_locations(
+        tuple(criteria["location_whitelist"]))
+    location_states = compile_location_states(
+        tuple(criteria.get("location_states", [])))
+  search_joined = location_pattern is not None
+  if not isinstance(locations, str):
+    if location_pattern is not None:
+      for leaf in locations:
+        if location_pattern.search(leaf.lower()):
+          return True
+    # A single leaf is the joined text, and was just searched
+    search_joined = search_joined and len(locations) > 1
+    locations = " ".join(locations)
+  if not locations:
     return False
-  criteria_locations = [cased.lower()
-                        for cased in criteria["location_whitelist"]]
   # locations_str = " ".join(locations).lower()
-  return bool(re.search(
-      f"({'|'.join(re.escape(loc) for loc in criteria_locations)})", locations.lower()))
+  if search_joined and location_pattern.search(locations.lower()):
+    return True
+  if location_states:
+    return not location_states.isdisjoint(get_gazetteer().states_in(locations))
+  return False
 
 
-def role_match(title: str, description: str, criteria: Dict) -> List[str]:
+def role_match(title: str, description: str,
+               criteria: Dict | CompiledCriteria) -> List[str]:
   # print("role match", title, description, criteria["role_terms"])
-  found_roles = set([])
   title_and_description = title.lower() + " " + description.lower()
-  # TODO: This runs slow
-  found_roles.update(
-      role for role in criteria["role_terms"] if role.lower() in title_and_description)
-  return list(found_roles)
+  if isinstance(criteria, CompiledCriteria):
+    matcher = criteria.role_matcher
+  else:
+    matcher = compile_role_terms(tuple(criteria["role_terms"]))
+  return matcher.find(title_and_description)
 
 
 # def parse_location(location: str | List[Dict]) -> str:
@@ -103,128 +130,428 @@ def role_match(title: str, description: str, criteria: Dict) -> List[str]:
 #     return location_string.rstrip(", ")
 #   return location
 
-def find_cities_in_json_str(job_json_str: str, criteria: Dict) -> str:
-  cities_pattern = r"\b(" + "|".join(re.escape(city.lower())
-                                     for city in criteria["location_whitelist"]) + r")\b"
-  compiled_pattern = re.compile(cities_pattern)
+def find_cities_in_json_str(job_json_str: str,
+                            criteria: Dict | CompiledCriteria) -> str:
+  if isinstance(criteria, CompiledCriteria):
+    city_pattern = criteria.city_pattern
+  else:
+    _, city_pattern = compile_locations(tuple(criteria["location_whitelist"]))
+  return _find_cities(job_json_str.lower(), city_pattern)
 
-  matches = compiled_pattern.findall(job_json_str.lower())
+
+def _find_cities(job_json_lower: str, city_pattern: re.Pattern | None) -> str:
+  if city_pattern is None:
+    return ""
+
+  matches = city_pattern.findall(job_json_lower)
 
   return " ".join(set(matches))
 
 
-def parse_jobs(data: List[Dict], api_definition: ApiDefinition,
-               company_name: str, criteria: Dict) -> List[Dict]:
+class JobFeatures:
+  # What the filters read from a job, worked out once however many criteria
+  # profiles it is checked against: the job_format fields with the location
+  # flattened, the lowercased title and description, and (only when first
+  # needed) the job as text, lowercased, and its years of experience.
+  __slots__ = ("job", "fields", "leaves", "text", "_json_str",
+               "_json_lower", "_years")
+
+  def __init__(self, job: Dict, job_format: Dict | JobFormat,
+               clock: Stopwatch = None):
+    self.job = job
+    self.fields = compile_job_format(job_format).extract(job)
+    if clock is not None:
+      clock.lap("extract")
+    # Optional ("?") fields missing from the job are None
+    location = self.fields["location"]
+    self.leaves = [] if location is None else list(iter_json_leaves(location))
+    self.fields["location"] = " ".join(self.leaves)
+    if clock is not None:
+      clock.lap("flatten")
+    self.text = ((self.fields.get("title") or "").lower() + " "
+                 + (self.fields.get("description") or "").lower())
+    self._json_str = None
+    self._json_lower = None
+    self._years = False
+
+  def json_str(self) -> str:
+    if self._json_str is None:
+      self._json_str = json.dumps(self.job)
+    return self._json_str
+
+  def json_lower(self) -> str:
+    if self._json_lower is None:
+      self._json_lower = self.json_str().lower()
+    return self._json_lower
+
+  def years_of_experience(self) -> int | None:
+    if self._years is False:
+      self._years = find_years_of_experience_in_job(self.json_str())
+    return self._years
+
+
+def parse_job(job: Dict, job_format: Dict | JobFormat, company_name: str,
+              criteria: CompiledCriteria, stats: ParseJobsStats,
+              first_seen: str = None,
+              lean: bool = False) -> Tuple[JobRecord, bool]:
+  clock = timings.stopwatch("filter_seconds", "filter")
+  features = JobFeatures(job, job_format, clock)
+  return filter_job(features, company_name, criteria, stats,
+                    first_seen=first_seen, lean=lean, clock=clock)
+
+
+def filter_job(features: JobFeatures, company_name: str,
+               criteria: CompiledCriteria, stats: ParseJobsStats,
+               first_seen: str = None, lean: bool = False,
+               clock: Stopwatch = None) -> Tuple[JobRecord, bool]:
+  clock = clock or timings.stopwatch("filter_seconds", "filter")
+  #
+  # Filters jobs by:
+  #   (1) using rule-based filters (ie. does location match our criteria filters?),
+  #   (2) (TODO) Asking an LLM if it should be included
+  # (TODO) Then, formats jobs by: (TODO) Using an LLM to output structured data
+  #
+  # Every filter that fails sets its FilterFailure flag; a job with none
+  # set passed.
+  nice_job = JobRecord.from_fields(features.fields)
+
+  # The whole job as text, for the searches that fall back to it. In lean
+  # mode it is only built when first needed and is not kept on nice_job, so
+  # it is freed as soon as this job is done.
+  if not lean:
+    nice_job.json_str = features.json_str()
+
+  # Apply City Rules
+  #
+  location_matched = location_match(features.leaves, criteria)
+  clock.lap("location")
+  if location_matched:
+    stats.location_success_count += 1
+    # Won't have to do slow search in job post since we have a match here
+  else:
+    stats.city_fallback_count += 1
+    nice_job.location = _find_cities(features.json_lower(),
+                                     criteria.city_pattern)
+    location_matched = location_match(nice_job.location, criteria)
+    clock.lap("city_fallback")
+    if location_matched:
+      stats.location_success_count += 1
+    else:
+      nice_job.failures |= FilterFailure.LOCATION
+
+  nice_job.company = company_name
+
+  if nice_job.created_at:
+    try:
+      nice_job.created_at = datetime.strptime(
+          nice_job.created_at, "%Y-%m-%dT%H:%M:%S.%fZ"
+      ).isoformat()
+      # print("made iso date!")
+    except ValueError:
+      nice_job.created_at = first_seen or datetime.now().isoformat()
+  else:
+    # TODO: Don't just set to now!
+    nice_job.created_at = first_seen or datetime.now().isoformat()
+
+  # _____REMOVE LINE_____
+
+  # Role check
+  clock.lap("created_at")
+  title = nice_job.title or ""
+  nice_job.role = criteria.role_matcher.find(features.text)
+  if len(nice_job.role) > 0:
+    stats.role_success_count += 1
+  else:
+    stats.role_failure_count += 1
+    nice_job.failures |= FilterFailure.ROLE
+  clock.lap("role")
+
+  # Custom filters
+  # job_dump = json.dumps(nice_job)
+  # TODO: Why does this not seem to work?
+
+  for word in title.split(" "):
+    if word.lower() in criteria.title_blacklist and word.strip():
+      # print(f"Excluding {title} because of word in custom filter: {word}")
+      stats.custom_filter_failure_count += 1
+      nice_job.failures |= FilterFailure.TITLE_BLACKLIST
+  clock.lap("blacklist")
+
+  # Years of experience check
+  nice_job.years_of_experience = features.years_of_experience()
+  if not nice_job.years_of_experience or not isinstance(
+          nice_job.years_of_experience, int):
+    stats.unspecified_years_of_experience_failure_count += 1
+    nice_job.failures |= FilterFailure.UNKNOWN_YEARS
+  elif nice_job.years_of_experience > criteria.max_years_of_experience:
+    stats.not_enough_years_of_experience_failure_count += 1
+    nice_job.failures |= FilterFailure.TOO_MANY_YEARS
+  else:
+    stats.years_of_experience_success_count += 1
+  clock.lap("years")
+  clock.stop()
+
+  return nice_job, nice_job.passed
+
+
+# Set in each worker process of a parse pool, so criteria are compiled once
+# per worker rather than pickled with every batch.
+_worker_criteria: CompiledCriteria = None
+
+DEFAULT_PARSE_BATCH_SIZE = 250
+DEFAULT_MAX_PENDING_BATCHES = 8
+
+
+def _init_parse_worker(criteria: Dict, detailed_timings: bool = False):
+  global _worker_criteria
+  _worker_criteria = compile_criteria(criteria)
+  timings.detailed = detailed_timings
+
+
+def _parse_batch(items: List[Tuple[Dict, str | None]], job_format: JobFormat,
+                 company_name: str, lean: bool
+                 ) -> Tuple[List[Tuple[JobRecord, bool, Dict[str, int]]],
+                            Timings]:
+  results = []
+  for job, first_seen in items:
+    job_stats = ParseJobsStats()
+    nice_job, passed = parse_job(job, job_format, company_name,
+                                 _worker_criteria, job_stats,
+                                 first_seen=first_seen, lean=lean)
+    results.append((nice_job, passed, job_stats.counts()))
+  # The worker's filter timings go back with the batch
+  return results, timings.take()
+
+
+# Opt in only (main's --workers): the pool has yet to be measured beating
+# parsing in the calling thread on a multi-core machine, see
+# benchmarks/bench_parse_workers.py.
+def create_parse_pool(workers: int,
+                      criteria: Dict | CompiledCriteria
+                      ) -> "ProcessPoolExecutor":
+  # multiprocessing is only imported by runs that use a pool
+  import multiprocessing
+  from concurrent.futures import ProcessPoolExecutor
+
+  criteria = compile_criteria(criteria)
+  # Boards are being fetched on threads while we parse, and forking a
+  # process with other threads running can deadlock it, so spawn instead.
+  return ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_parse_worker,
+                             initargs=(criteria.source, timings.detailed))
+
+
+# Runs parse_job over (job, first_seen) `items`, on the pool in batches when
+# one is given, and yields (nice_job, passed, stat counts) in the same order.
+# Items are read lazily, at most `max_pending` batches ahead of the results,
+# so a streamed board is never held in memory all at once.
+def parse_many(items: Iterable[Tuple[Dict, str | None]],
+               job_format: JobFormat,
+               company_name: str, criteria: CompiledCriteria,
+               lean: bool = False, executor: "ProcessPoolExecutor" = None,
+               batch_size: int = DEFAULT_PARSE_BATCH_SIZE,
+               max_pending: int = DEFAULT_MAX_PENDING_BATCHES
+               ) -> Iterator[Tuple[JobRecord, bool, Dict[str, int]]]:
+  if executor is None:
+    for job, first_seen in items:
+      job_stats = ParseJobsStats()
+      nice_job, passed = parse_job(job, job_format, company_name, criteria,
+                                   job_stats, first_seen=first_seen, lean=lean)
+      yield nice_job, passed, job_stats.counts()
+    return
+
+  items = iter(items)
+  futures = deque()
+  while True:
+    batch = list(islice(items, batch_size))
+    if batch:
+      futures.append(executor.submit(_parse_batch, batch, job_format,
+                                     company_name, lean))
+    if futures and (not batch or len(futures) >= max_pending):
+      results, batch_timings = futures.popleft().result()
+      timings.merge(batch_timings)
+      yield from results
+    elif not batch:
+      return
+
+
+# An on_failed (see parse_jobs) for callers with no use for failed jobs
+def discard_failed(*args):
+  pass
+
+
+def _count_jobs(jobs: Iterator[Dict], stats: ParseJobsStats) -> Iterator[Dict]:
+  for job in jobs:
+    stats.total += 1
+    yield job
+
+
+# `data` is a board's response, or an iterator over its jobs when the board
+# is streamed (see stream_response_jobs). When `on_failed` is given, each
+# job that fails the filters is handed to it as soon as it is rejected
+# rather than collected in "failed", so a board's failed jobs (and their
+# json_str) are never all held at once.
+def parse_jobs(data: Dict | Iterator[Dict], api_definition: ApiDefinition,
+               company_name: str, criteria: Dict | CompiledCriteria,
+               store: JobStore = None, lean: bool = False,
+               executor: "ProcessPoolExecutor" = None,
+               on_failed: Callable[[JobRecord], None] = None) -> List[Dict]:
+  started = perf_counter()
+  criteria = compile_criteria(criteria)
   stats = ParseJobsStats()
   response_config = api_definition["response"]
   root = response_config["root"]
-  job_format = response_config["job_format"]
+  job_format = compile_job_format(response_config["job_format"])
   parsed_jobs = []
   excluded_jobs = []
-  all_jobs = get_json_key(data, root)
-  stats.total = len(all_jobs)
-
-  for job in all_jobs:
-    filter_failures = []
-    #
-    # Filters jobs by:
-    #   (1) using rule-based filters (ie. does location match our criteria filters?),
-    #   (2) (TODO) Asking an LLM if it should be included
-    # (TODO) Then, formats jobs by: (TODO) Using an LLM to output structured data
-    #
-    matching_criteria = {
-        "location": False,
-        "years_of_experience": False,
-        "role": False,
-        "no_title_blacklist_words": True,
-
-
-    }
-    nice_job = {k: get_json_key(job, v)
-                for k, v in job_format.items()}
-
-    nice_job["json_str"] = json.dumps(job)
-
-    # Apply City Rules
-    #
-    nice_job["location"] = flatten_json_to_list(nice_job["location"])
-    matching_criteria["location"] = location_match(
-        nice_job["location"], criteria)
-    if matching_criteria["location"]:
-      stats.location_success_count += 1
-      # Won't have to do slow search in job post since we have a match here
-    else:
-      nice_job["location"] = find_cities_in_json_str(
-          nice_job["json_str"], criteria)
-      matching_criteria["location"] = location_match(
-          nice_job["location"], criteria)
-      if matching_criteria["location"]:
-        stats.location_success_count += 1
+  reject = on_failed if on_failed is not None else excluded_jobs.append
+  if isinstance(data, Iterator):
+    all_jobs = _count_jobs(data, stats)
+  else:
+    all_jobs = get_json_key(data, root)
+    stats.total = len(all_jobs)
+
+  if store is not None:
+    parse_jobs_with_store(all_jobs, job_format, company_name, criteria,
+                          stats, store, parsed_jobs, reject, lean=lean,
+                          executor=executor)
+  elif executor is not None:
+    for nice_job, passed, job_stats in parse_many(
+            ((job, None) for job in all_jobs), job_format, company_name,
+            criteria, lean=lean, executor=executor):
+      stats.merge(ParseJobsStats(**job_stats))
+      if passed:
+        parsed_jobs.append(nice_job)
       else:
-        filter_failures.append("zero location matches anywhere in job")
-
-    nice_job["company"] = company_name
-
-    if nice_job.get("created_at"):
-      try:
-        nice_job["created_at"] = datetime.strptime(
-            nice_job["created_at"], "%Y-%m-%dT%H:%M:%S.%fZ"
-        ).isoformat()
-        # print("made iso date!")
-      except ValueError:
-        nice_job["created_at"] = datetime.now().isoformat()
-    else:
-      # TODO: Don't just set to now!
-      nice_job["created_at"] = datetime.now().isoformat()
-
-    # _____REMOVE LINE_____
-
-    # Role check
-    title = nice_job.get("title", "")
-    description = nice_job.get("description", "")
-    nice_job["role"] = role_match(title, description, criteria)
-    if len(nice_job["role"]) > 0:
-      stats.role_success_count += 1
-      matching_criteria["role"] = True
-    else:
-      stats.role_failure_count += 1
-      filter_failures.append("No matching title found anywhere in job")
-
-    # Custom filters
-    # job_dump = json.dumps(nice_job)
-    # TODO: Why does this not seem to work?
-
-    for word in title.split(" "):
-      if word.lower() in [
-              term.lower()
-              for term in criteria["title_blacklist"]] and word.strip():
-        # print(f"Excluding {title} because of word in custom filter: {word}")
-        stats.custom_filter_failure_count += 1
-        matching_criteria["no_title_blacklist_words"] = False
-        filter_failures.append("A blacklisted word was found in the title")
-
-    # Years of experience check
-    nice_job["years_of_experience"] = find_years_of_experience_in_job(
-        nice_job["json_str"])
-    if not nice_job["years_of_experience"] or not isinstance(
-            nice_job["years_of_experience"], int):
-      stats.unspecified_years_of_experience_failure_count += 1
-      filter_failures.append(
-          "Number of years of experience required not known/not found")
-    elif nice_job["years_of_experience"] > criteria["max_years_of_experience"]:
-      stats.not_enough_years_of_experience_failure_count += 1
-      filter_failures.append("Years of experience is higher than my critera")
-    else:
-      stats.years_of_experience_success_count += 1
-      matching_criteria["years_of_experience"] = True
-
-    if all(matching_criteria.values()):
-      parsed_jobs.append(nice_job)
-    else:
-      nice_job["failed_reason"] = " ".join(filter_failures)
-      excluded_jobs.append(nice_job)
+        reject(nice_job)
+  else:
+    for job in all_jobs:
+      nice_job, passed = parse_job(
+          job, job_format, company_name, criteria, stats, lean=lean)
+      if passed:
+        parsed_jobs.append(nice_job)
+      else:
+        reject(nice_job)
 
   stats.passed_all_filters = len(parsed_jobs)
+  timings.observe("parse_board_seconds", perf_counter() - started,
+                  board=company_name)
   stats.print_stats()
 
   return {"passed": parsed_jobs, "failed": excluded_jobs}
+
+
+# Checks a board's jobs against several criteria profiles in one pass. Each
+# job's features (see JobFeatures) are worked out once and shared by every
+# profile, so a profile only adds its own matching. Returns, by profile
+# name, the passed and failed jobs and the profile's stats for the board.
+# Like parse_jobs, failed jobs go to `on_failed` (with the profile's name)
+# instead of "failed" when it is given.
+def parse_jobs_for_profiles(data: Dict | Iterator[Dict],
+                            api_definition: ApiDefinition, company_name: str,
+                            profiles: Dict[str, Dict | CompiledCriteria],
+                            lean: bool = False,
+                            on_failed: Callable[[str, JobRecord], None] = None
+                            ) -> Dict[str, Dict]:
+  started = perf_counter()
+  profiles = {name: compile_criteria(criteria)
+              for name, criteria in profiles.items()}
+  response_config = api_definition["response"]
+  job_format = compile_job_format(response_config["job_format"])
+  results = {name: {"passed": [], "failed": [], "stats": ParseJobsStats()}
+             for name in profiles}
+  if isinstance(data, Iterator):
+    all_jobs = data
+  else:
+    all_jobs = get_json_key(data, response_config["root"])
+
+  for job in all_jobs:
+    features = JobFeatures(job, job_format)
+    for name, criteria in profiles.items():
+      result = results[name]
+      result["stats"].total += 1
+      nice_job, passed = filter_job(features, company_name, criteria,
+                                    result["stats"], lean=lean)
+      if passed:
+        result["passed"].append(nice_job)
+      elif on_failed is not None:
+        on_failed(name, nice_job)
+      else:
+        result["failed"].append(nice_job)
+
+  for result in results.values():
+    result["stats"].passed_all_filters = len(result["passed"])
+  timings.observe("parse_board_seconds", perf_counter() - started,
+                  board=company_name)
+  return results
+
+
+# Only runs the filters on postings that are new or changed since the last
+# run; everything else keeps the verdict (and stats) recorded in the store.
+def parse_jobs_with_store(all_jobs: Iterable[Dict], job_format: JobFormat,
+                          company_name: str, criteria: CompiledCriteria,
+                          stats: ParseJobsStats, store: JobStore,
+                          parsed_jobs: List[JobRecord],
+                          reject: Callable[[JobRecord], None],
+                          lean: bool = False,
+                          executor: "ProcessPoolExecutor" = None):
+  verdict_key = store.verdict_key(dict(job_format.source), criteria.source)
+  url_field = job_format.field("url")
+  seen = set()
+  # Passed jobs in board order, with a None for each job handed to
+  # parse_many, filled in below if it passes. Failed jobs go to `reject`
+  # as soon as their verdict is known.
+  results: List[JobRecord | None] = []
+  # (index in results, url, content_hash, first_seen) of the jobs handed to
+  # parse_many that haven't come back yet
+  pending = deque()
+
+  def new_jobs() -> Iterator[Tuple[Dict, str]]:
+    for job in all_jobs:
+      content_hash = store.content_hash(job)
+      url = None
+      if url_field is not None:
+        try:
+          url = url_field.get(job)
+        except ValueError:
+          url = None
+        url = str(url) if url is not None else None
+      url = url or content_hash
+      if (url, content_hash) in seen:
+        stats.duplicate_count += 1
+        stats.total -= 1
+        continue
+      seen.add((url, content_hash))
+
+      stored = store.lookup(company_name, url)
+      if (stored is not None and stored.content_hash == content_hash
+              and stored.verdict_key == verdict_key):
+        stats.reused_count += 1
+        stats.merge(ParseJobsStats(**stored.stats))
+        if stored.passed:
+          results.append(stored.job)
+        else:
+          reject(stored.job)
+        store.mark_seen(company_name, url)
+      else:
+        first_seen = (stored.first_seen if stored is not None
+                      else datetime.now().isoformat())
+        pending.append((len(results), url, content_hash, first_seen))
+        results.append(None)
+        yield job, first_seen
+
+  for nice_job, passed, job_stats in parse_many(
+          new_jobs(), job_format, company_name, criteria, lean=lean,
+          executor=executor):
+    i, url, content_hash, first_seen = pending.popleft()
+    stats.merge(ParseJobsStats(**job_stats))
+    store.save(company_name, url, content_hash, verdict_key,
+               nice_job, passed, job_stats, first_seen)
+    if passed:
+      results[i] = nice_job
+    else:
+      reject(nice_job)
+
+  parsed_jobs.extend(job for job in results if job is not None)
+  store.commit()
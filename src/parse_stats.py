@@ -1,10 +1,11 @@
 
-from dataclasses import dataclass
-
-from tabulate import tabulate
+from dataclasses import dataclass, fields
+from typing import Dict
 
 
 def ratio(numerator: int, denominator: int) -> float:
+  if not int(denominator):
+    return 0.0
   return round(float(int(numerator) / int(denominator)), 4)
 
 
@@ -22,6 +23,21 @@ class ParseJobsStats:
   unspecified_years_of_experience_failure_count: int = 0
   not_enough_years_of_experience_failure_count: int = 0
   custom_filter_failure_count: int = 0
+  # Jobs whose location field didn't match, so the whole job was searched
+  # for cities (find_cities_in_json_str)
+  city_fallback_count: int = 0
+  # Job store
+  reused_count: int = 0
+  duplicate_count: int = 0
+
+  def merge(self, other: "ParseJobsStats"):
+    for field in fields(self):
+      setattr(self, field.name,
+              getattr(self, field.name) + getattr(other, field.name))
+
+  def counts(self) -> Dict[str, int]:
+    return {field.name: getattr(self, field.name) for field in fields(self)
+            if getattr(self, field.name)}
 
   def print_stats(self):
     data = [
@@ -50,5 +66,18 @@ class ParseJobsStats:
 
         ["Passed all filters", self.passed_all_filters,
          f"{ratio(self.passed_all_filters, self.total)}"],
+        ["--", "", ""],
+        ["Searched whole job for cities", self.city_fallback_count,
+         f"{ratio(self.city_fallback_count, self.total)}"],
     ]
+    if self.reused_count or self.duplicate_count:
+      data.extend([
+          ["--", "", ""],
+          ["Job store", "", ""],
+          ["Unchanged, verdict reused", self.reused_count,
+           f"{ratio(self.reused_count, self.total)}"],
+          ["Duplicates skipped", self.duplicate_count, ""],
+      ])
+    # Only imported when printing, as it is slow to import
+    from tabulate import tabulate
     print(tabulate(data, tablefmt="simple"))
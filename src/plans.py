@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+from src.types import ApiDefinition
+
+# A job_format path ending in this may be missing from a job, in which case
+# the field is None (e.g. "created_at": "created?"). Any other missing path
+# is an error.
+OPTIONAL_SUFFIX = "?"
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+  name: str
+  keys: Tuple[str, ...]
+  optional: bool
+
+  def get(self, job: Dict) -> any:
+    obj = job
+    for key in self.keys:
+      if isinstance(obj, dict):
+        obj = obj.get(key, _MISSING)
+        if obj is not _MISSING:
+          continue
+      if self.optional:
+        return None
+      raise ValueError(f"Key not found: {key}")
+    return obj
+
+
+@dataclass(frozen=True)
+class JobFormat:
+  # A response's job_format with every path split up front, so pulling the
+  # fields out of a job doesn't re-split the paths.
+  source: Tuple[Tuple[str, str], ...]
+  fields: Tuple[FieldPlan, ...]
+
+  def field(self, name: str) -> FieldPlan | None:
+    for field in self.fields:
+      if field.name == name:
+        return field
+    return None
+
+  def extract(self, job: Dict) -> Dict:
+    return {field.name: field.get(job) for field in self.fields}
+
+
+@lru_cache(maxsize=64)
+def _compile_job_format(source: Tuple[Tuple[str, str], ...]) -> JobFormat:
+  fields = []
+  for name, path in source:
+    optional = path.endswith(OPTIONAL_SUFFIX)
+    if optional:
+      path = path[:-len(OPTIONAL_SUFFIX)]
+    fields.append(FieldPlan(name, tuple(path.split(".")), optional))
+  return JobFormat(source, tuple(fields))
+
+
+# Takes a job_format dict (or an already compiled one). Boards sharing an
+# adapter share its compiled format.
+def compile_job_format(job_format: Dict | JobFormat) -> JobFormat:
+  if isinstance(job_format, JobFormat):
+    return job_format
+  return _compile_job_format(tuple(job_format.items()))
+
+
+Replacements = List[Tuple[str, str]]
+
+
+def _compile_template(value: any, placeholders: List[str]
+                      ) -> Callable[[Replacements], any] | None:
+  # Returns a function that rebuilds `value` with the placeholders replaced,
+  # or None when nothing in `value` contains one, in which case it is shared
+  # as is between boards.
+  if isinstance(value, str):
+    if not any(placeholder in value for placeholder in placeholders):
+      return None
+
+    def fill_string(replacements: Replacements) -> str:
+      result = value
+      for placeholder, replacement in replacements:
+        result = result.replace(placeholder, replacement)
+      return result
+    return fill_string
+
+  if isinstance(value, dict):
+    items = [(key, _compile_template(key, placeholders), item,
+              _compile_template(item, placeholders))
+             for key, item in value.items()]
+    if not any(fill_key or fill_item for _, fill_key, _, fill_item in items):
+      return None
+
+    def fill_dict(replacements: Replacements) -> Dict:
+      return {
+          (fill_key(replacements) if fill_key else key):
+          (fill_item(replacements) if fill_item else item)
+          for key, fill_key, item, fill_item in items
+      }
+    return fill_dict
+
+  if isinstance(value, list):
+    items = [(item, _compile_template(item, placeholders)) for item in value]
+    if not any(fill_item for _, fill_item in items):
+      return None
+
+    def fill_list(replacements: Replacements) -> List:
+      return [fill_item(replacements) if fill_item else item
+              for item, fill_item in items]
+    return fill_list
+
+  return None
+
+
+class AdapterPlan:
+  # An adapter from api_definitions.json, prepared once when the file is
+  # loaded: its "vars" placeholders are located up front, so hydrating it
+  # for a board only copies the parts that contain one, and its job_format
+  # is compiled.
+  def __init__(self, definition: ApiDefinition):
+    self.definition = definition
+    self.placeholders: Dict[str, str] = definition.get("vars", {})
+    self._fill = _compile_template(definition,
+                                   list(self.placeholders.values()))
+    self.job_format = compile_job_format(
+        definition["response"]["job_format"])
+
+  def hydrate(self, api_vars: Dict[str, str] = None) -> ApiDefinition:
+    # Parts of the definition without placeholders are shared between the
+    # boards using the adapter, so the result must not be modified.
+    replacements = [(placeholder, api_vars[name])
+                    for name, placeholder in self.placeholders.items()
+                    if api_vars and name in api_vars]
+    if self._fill is None or not replacements:
+      return self.definition
+    return self._fill(replacements)
+
+
+def compile_adapters(api_definitions: Dict[str, ApiDefinition]
+                     ) -> Dict[str, AdapterPlan]:
+  return {name: AdapterPlan(definition)
+          for name, definition in api_definitions.items()}
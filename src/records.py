@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from enum import IntFlag
+from typing import Dict, List
+
+
+class FilterFailure(IntFlag):
+  LOCATION = 1
+  ROLE = 2
+  TITLE_BLACKLIST = 4
+  UNKNOWN_YEARS = 8
+  TOO_MANY_YEARS = 16
+
+
+# In the order the filters run, which is the order they appear in
+# failed_reason
+FAILURE_REASONS = {
+    FilterFailure.LOCATION: "zero location matches anywhere in job",
+    FilterFailure.ROLE: "No matching title found anywhere in job",
+    FilterFailure.TITLE_BLACKLIST: "A blacklisted word was found in the title",
+    FilterFailure.UNKNOWN_YEARS:
+        "Number of years of experience required not known/not found",
+    FilterFailure.TOO_MANY_YEARS:
+        "Years of experience is higher than my critera",
+}
+
+NO_FAILURES = FilterFailure(0)
+
+# job_format fields with a slot of their own; any others go in `extra`
+_FIELDS = ("title", "url", "description", "location", "created_at",
+           "updated_at")
+
+
+def failed_reason(failures: FilterFailure) -> str:
+  return " ".join(reason for flag, reason in FAILURE_REASONS.items()
+                  if flag in failures)
+
+
+# Only for jobs saved before their failures were saved as a number, since
+# rewording a reason would lose its bit
+def parse_failed_reason(reason: str) -> FilterFailure:
+  failures = NO_FAILURES
+  for flag, text in FAILURE_REASONS.items():
+    if text in reason:
+      failures |= flag
+  return failures
+
+
+@dataclass(slots=True)
+class JobRecord:
+  # A parsed job, as it goes from the filters to the feed. Slots rather than
+  # a dict per job, and the failed filters as one FilterFailure bitmask, with
+  # to_dict() giving the old dict (failed_reason included) to the places
+  # that write jobs out as JSON.
+  title: str | None = None
+  url: str | None = None
+  description: str | None = None
+  location: str = ""
+  created_at: str | None = None
+  updated_at: str | None = None
+  company: str = ""
+  role: List[str] = field(default_factory=list)
+  years_of_experience: int | None = None
+  failures: FilterFailure = NO_FAILURES
+  # The whole job as JSON; not kept in lean mode
+  json_str: str | None = None
+  # Any other job_format fields, by name
+  extra: Dict | None = None
+
+  @classmethod
+  def from_fields(cls, fields: Dict) -> "JobRecord":
+    # From JobFormat.extract(), where every field may be missing
+    record = cls(**{name: fields[name] for name in _FIELDS if name in fields})
+    extra = {name: value for name, value in fields.items()
+             if name not in _FIELDS}
+    if extra:
+      record.extra = extra
+    return record
+
+  @property
+  def passed(self) -> bool:
+    return not self.failures
+
+  @property
+  def failed_reason(self) -> str:
+    return failed_reason(self.failures)
+
+  def to_dict(self) -> Dict:
+    job = {name: getattr(self, name) for name in _FIELDS
+           if name != "updated_at" or self.updated_at is not None}
+    if self.extra:
+      job.update(self.extra)
+    if self.json_str is not None:
+      job["json_str"] = self.json_str
+    job["company"] = self.company
+    job["role"] = self.role
+    job["years_of_experience"] = self.years_of_experience
+    if self.failures:
+      job["failed_reason"] = self.failed_reason
+    return job
+
+  @classmethod
+  def from_dict(cls, job: Dict,
+                failures: FilterFailure | None = None) -> "JobRecord":
+    # `failures` as saved next to the dict; to_dict() only has the text
+    job = dict(job)
+    reason = job.pop("failed_reason", "")
+    saved = job.pop("failures", None)
+    if failures is None and saved is not None:
+      failures = FilterFailure(saved)
+    if failures is None:
+      failures = parse_failed_reason(reason)
+    record = cls.from_fields({
+        name: value for name, value in job.items()
+        if name not in ("company", "role", "years_of_experience",
+                        "json_str")})
+    record.company = job.get("company", "")
+    record.role = job.get("role", [])
+    record.years_of_experience = job.get("years_of_experience")
+    record.json_str = job.get("json_str")
+    record.failures = failures
+    return record
+
+
+# parse_jobs output ({"passed": [...], "failed": [...]}) to and from plain
+# dicts, for the parse cache. The failures go in as a number, like the job
+# store's.
+def verdicts_to_dicts(parsed: Dict[str, List[JobRecord]]
+                      ) -> Dict[str, List[Dict]]:
+  return {verdict: [dict(job.to_dict(), failures=int(job.failures))
+                    for job in jobs]
+          for verdict, jobs in parsed.items()}
+
+
+def verdicts_from_dicts(parsed: Dict[str, List[Dict]]
+                        ) -> Dict[str, List[JobRecord]]:
+  return {verdict: [JobRecord.from_dict(job) for job in jobs]
+          for verdict, jobs in parsed.items()}
@@ -0,0 +1,412 @@
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, Tuple
+from urllib.parse import urlparse
+
+from src.timings import timings
+from src.types import HttpDefinition
+
+# Responses worth asking for again; anything else is returned to the caller
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Never slow a host below this fraction of its configured rate
+MIN_RATE_FRACTION = 1 / 16
+# Fraction of the configured rate won back by each successful request
+RATE_RECOVERY = 0.1
+BODY_CHUNK_SIZE = 64 * 1024
+# Under --cache-dir
+BREAKER_STATE_FILE = "breakers.json"
+
+
+class DeadlineExceeded(Exception):
+  pass
+
+
+def parse_retry_after(value: str | None, now: float = None) -> float | None:
+  # Retry-After is either a number of seconds or an HTTP date
+  if not value:
+    return None
+  value = value.strip()
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+  from email.utils import parsedate_to_datetime
+  try:
+    retry_at = parsedate_to_datetime(value).timestamp()
+  except (TypeError, ValueError):
+    return None
+  return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+def backoff_delay(attempt: int, backoff: float, max_backoff: float,
+                  retry_after: float | None = None,
+                  rng: random.Random = None) -> float | None:
+  # "Full jitter": anywhere up to the exponential delay for this attempt, so
+  # the boards that failed together don't all retry together. Returns None
+  # when the server asks us to wait longer than max_backoff, in which case
+  # the request is given up on rather than holding up the run.
+  if retry_after is not None and retry_after > max_backoff:
+    return None
+  delay = (rng or random).uniform(0, min(max_backoff, backoff * 2 ** attempt))
+  if retry_after is not None:
+    delay = max(delay, retry_after)
+  return delay
+
+
+class TokenBucket:
+  # Allows `rate` requests a second on average, in bursts of up to `burst`.
+  # The rate halves on every 429 (down to MIN_RATE_FRACTION of the configured
+  # one) and creeps back up with each success; a Retry-After pauses the
+  # whole host. A rate of 0 means no limit, though pauses still apply.
+  def __init__(self, rate: float, burst: float,
+               clock: Callable[[], float] = time.monotonic,
+               sleep: Callable[[float], None] = time.sleep):
+    self.max_rate = float(rate)
+    self.rate = float(rate)
+    self.burst = max(1.0, float(burst))
+    self.tokens = self.burst
+    self.clock = clock
+    self.sleep = sleep
+    self.updated = clock()
+    self.paused_until = 0.0
+    self._lock = threading.Lock()
+
+  def acquire(self) -> float:
+    # Blocks until a request may be sent. Returns the time waited.
+    with self._lock:
+      now = self.clock()
+      wait = max(0.0, self.paused_until - now)
+      if self.rate > 0:
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Taking the token before sleeping reserves it, so concurrent
+        # callers queue up one after another instead of all waking at once.
+        self.tokens -= 1
+        if self.tokens < 0:
+          wait = max(wait, -self.tokens / self.rate)
+    if wait > 0:
+      self.sleep(wait)
+    return wait
+
+  def slow_down(self):
+    with self._lock:
+      self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+
+  def speed_up(self):
+    with self._lock:
+      self.rate = min(self.max_rate,
+                      self.rate + self.max_rate * RATE_RECOVERY)
+
+  def pause(self, seconds: float):
+    with self._lock:
+      self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class CircuitBreaker:
+  # Opens after `threshold` failures in a row, after which requests fail
+  # straight away for `cooldown` seconds. Then one more try is let through:
+  # a success closes the circuit, a failure opens it again.
+  def __init__(self, threshold: int, cooldown: float,
+               clock: Callable[[], float] = time.monotonic):
+    self.threshold = max(1, int(threshold))
+    self.cooldown = float(cooldown)
+    self.clock = clock
+    self.failures = 0
+    self.opened_at: float | None = None
+    self._lock = threading.Lock()
+
+  def allow(self) -> bool:
+    with self._lock:
+      if self.opened_at is None:
+        return True
+      if self.clock() - self.opened_at < self.cooldown:
+        return False
+      # Half open: the next failure re-opens it
+      self.opened_at = None
+      self.failures = self.threshold - 1
+      return True
+
+  def retry_in(self) -> float:
+    with self._lock:
+      if self.opened_at is None:
+        return 0.0
+      return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+  def record_success(self):
+    with self._lock:
+      self.failures = 0
+      self.opened_at = None
+
+  def record_failure(self):
+    with self._lock:
+      self.failures += 1
+      if self.failures >= self.threshold and self.opened_at is None:
+        self.opened_at = self.clock()
+
+  def state(self) -> Dict:
+    # Survives the process: how long the circuit stays open is saved, not
+    # when it opened, since clock() is only comparable within a process
+    with self._lock:
+      retry_in = (0.0 if self.opened_at is None else
+                  max(0.0, self.opened_at + self.cooldown - self.clock()))
+      return {"failures": self.failures,
+              "open": self.opened_at is not None, "retry_in": retry_in}
+
+  def restore(self, state: Dict, elapsed: float):
+    # `elapsed` is how long ago the state was saved
+    with self._lock:
+      self.failures = int(state["failures"])
+      if state["open"]:
+        retry_in = max(0.0, float(state["retry_in"]) - elapsed)
+        self.opened_at = self.clock() - self.cooldown + retry_in
+
+
+class FetchGuards:
+  # One rate limiter per host, shared by every board on it, and one circuit
+  # breaker per board, both for the life of the process like the session
+  # pool. A one-shot run fetches each board once, so the breakers only
+  # count failures across runs when their state is saved and loaded again
+  # (see main).
+  def __init__(self, clock: Callable[[], float] = time.monotonic,
+               sleep: Callable[[float], None] = time.sleep):
+    self.clock = clock
+    self.sleep = sleep
+    self._lock = threading.Lock()
+    self._limiters: Dict[Tuple, TokenBucket] = {}
+    self._breakers: Dict[Tuple, CircuitBreaker] = {}
+    # Loaded breaker states, by board, waiting for their breaker
+    self._saved: Dict[str, Dict] = {}
+    self._saved_at = 0.0
+
+  def limiter(self, url: str, config: HttpDefinition) -> TokenBucket:
+    key = (urlparse(url).netloc.lower(), float(config["rate_limit"]),
+           float(config["rate_burst"]))
+    with self._lock:
+      limiter = self._limiters.get(key)
+      if limiter is None:
+        limiter = self._limiters[key] = TokenBucket(
+            key[1], key[2], clock=self.clock, sleep=self.sleep)
+      return limiter
+
+  def breaker(self, board_uri: str,
+              config: HttpDefinition) -> CircuitBreaker:
+    key = (board_uri, int(config["breaker_threshold"]),
+           float(config["breaker_cooldown"]))
+    with self._lock:
+      breaker = self._breakers.get(key)
+      if breaker is None:
+        breaker = self._breakers[key] = CircuitBreaker(
+            key[1], key[2], clock=self.clock)
+        state = self._saved.pop(board_uri, None)
+        if state is not None:
+          breaker.restore(state, max(0.0, time.time() - self._saved_at))
+      return breaker
+
+  def load(self, path: str):
+    # A missing or unreadable file just means starting afresh
+    try:
+      with open(path, "r") as f:
+        saved = json.load(f)
+      boards, saved_at = saved["boards"], float(saved["saved_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+      return
+    with self._lock:
+      self._saved = boards
+      self._saved_at = saved_at
+
+  def save(self, path: str):
+    # Only boards that have failed lately; the rest start afresh anyway
+    with self._lock:
+      breakers = [(key[0], breaker) for key, breaker in self._breakers.items()]
+    boards = {}
+    for board_uri, breaker in breakers:
+      state = breaker.state()
+      if state["failures"]:
+        boards[board_uri] = state
+    try:
+      os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+      with open(path, "w") as f:
+        json.dump({"saved_at": time.time(), "boards": boards}, f)
+    except OSError as e:
+      print(f"Error saving circuit breaker state to {path}: {str(e)}")
+
+  def clear(self):
+    with self._lock:
+      self._limiters.clear()
+      self._breakers.clear()
+      self._saved = {}
+
+
+guards = FetchGuards()
+
+
+def request_timeout(config: HttpDefinition) -> Tuple[float, float]:
+  # requests' (connect, read) timeout; the read timeout bounds each wait
+  # for data, not the whole download, which is what config["deadline"] is
+  # for (see ResilientRequester)
+  return float(config["connect_timeout"]), float(config["timeout"])
+
+
+def iter_body(response, chunk_size: int = BODY_CHUNK_SIZE) -> Iterator[bytes]:
+  # Yields a response sent with stream=True as its body arrives.
+  # iter_content waits until it has a whole chunk_size, so a server
+  # trickling bytes in under the read timeout could hold it (and the board)
+  # forever; read1 returns whatever a single read gets, so the caller can
+  # check its deadline between reads.
+  import requests
+  import urllib3
+
+  read1 = getattr(getattr(response, "raw", None), "read1", None)
+  if read1 is None:
+    # urllib3 before 2.3, and stand-ins for responses
+    yield from response.iter_content(chunk_size)
+    return
+  while True:
+    try:
+      chunk = read1(chunk_size, decode_content=True)
+    except urllib3.exceptions.HTTPError as e:
+      # As iter_content would raise it
+      raise requests.ConnectionError(e) from e
+    if not chunk:
+      return
+    yield chunk
+
+
+def read_body(response, deadline: float,
+              clock: Callable[[], float] = time.monotonic) -> bytes:
+  # Reads a response sent with stream=True the way response.content would,
+  # but gives up at `deadline`. Each read is also bounded by the read
+  # timeout, which ResilientRequester cuts to the time left.
+  chunks = []
+  for chunk in iter_body(response):
+    chunks.append(chunk)
+    if clock() > deadline:
+      response.close()
+      raise DeadlineExceeded(
+          f"{response.url} took too long to send its response")
+  return b"".join(chunks)
+
+
+class ReadResponse:
+  # A response whose body read_body has already read, standing in for it
+  # wherever the body is only reached through content and json()
+  def __init__(self, response, content: bytes):
+    self.response = response
+    self.content = content
+
+  def __getattr__(self, name: str):
+    return getattr(self.response, name)
+
+  def json(self):
+    return json.loads(self.content)
+
+
+class ResilientRequester:
+  # Stands in for a requests.Session (only request() is used): each request
+  # waits for the host's rate limiter, and connection errors, timeouts and
+  # RETRY_STATUSES responses are retried up to config["retries"] times with
+  # jittered exponential backoff, honoring Retry-After.
+  #
+  # The final response is returned whatever its status, so callers still
+  # raise_for_status() (and the response cache still sees its 304s).
+  #
+  # `deadline` (a clock() time) bounds every request sent through this
+  # requester, retries, backoff and body included: timeouts are cut to the
+  # time left, bodies are read in chunks against it (see read_body) and no
+  # retry starts that would end after it. Past it, DeadlineExceeded is
+  # raised. Callers that stream the body check it themselves.
+  #
+  # `slots`, when given, is held while each attempt is sent and read, so it
+  # caps the requests in flight to the host however many pages are
+  # prefetched.
+  def __init__(self, requester, url: str, config: HttpDefinition,
+               fetch_guards: FetchGuards = None, rng: random.Random = None,
+               slots: threading.Semaphore = None, deadline: float = None):
+    fetch_guards = fetch_guards or guards
+    self.requester = requester
+    self.slots = slots if slots is not None else contextlib.nullcontext()
+    self.host = urlparse(url).netloc
+    self.config = config
+    self.limiter = fetch_guards.limiter(url, config)
+    self.clock = fetch_guards.clock
+    self.sleep = fetch_guards.sleep
+    self.rng = rng
+    self.deadline = deadline
+
+  def time_left(self, url: str) -> float | None:
+    if self.deadline is None:
+      return None
+    left = self.deadline - self.clock()
+    if left <= 0:
+      raise DeadlineExceeded(f"{url} took too long to respond")
+    return left
+
+  def _timeout(self, url: str, timeout: float | Tuple[float, float] | None
+               ) -> float | Tuple[float, float] | None:
+    left = self.time_left(url)
+    if left is None:
+      return timeout
+    if timeout is None:
+      return left
+    if isinstance(timeout, tuple):
+      return tuple(min(part, left) for part in timeout)
+    return min(timeout, left)
+
+  def request(self, method: str, url: str, **kwargs):
+    # Imported here for the same reason as in SessionPool.get
+    import requests
+
+    # Bodies are read here, against the deadline, unless the caller streams
+    read_here = self.deadline is not None and not kwargs.get("stream")
+    if read_here:
+      kwargs["stream"] = True
+    retries = int(self.config["retries"])
+    for attempt in range(retries + 1):
+      waited = self.limiter.acquire()
+      if waited:
+        timings.observe("rate_limit_wait_seconds", waited, host=self.host)
+      kwargs["timeout"] = self._timeout(url, kwargs.get("timeout"))
+      error = None
+      retry_after = None
+      try:
+        with self.slots:
+          response = self.requester.request(method, url, **kwargs)
+          if read_here and response.status_code not in RETRY_STATUSES:
+            response = ReadResponse(
+                response, read_body(response, self.deadline, self.clock))
+      except (requests.ConnectionError, requests.Timeout,
+              requests.exceptions.ChunkedEncodingError) as e:
+        error = e
+      else:
+        if response.status_code not in RETRY_STATUSES:
+          self.limiter.speed_up()
+          return response
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code == 429:
+          self.limiter.slow_down()
+          if retry_after is not None:
+            self.limiter.pause(min(retry_after,
+                                   float(self.config["max_backoff"])))
+      if attempt == retries:
+        break
+      delay = backoff_delay(attempt, float(self.config["backoff"]),
+                            float(self.config["max_backoff"]), retry_after,
+                            self.rng)
+      if delay is None:
+        break
+      left = self.time_left(url)
+      if left is not None and delay >= left:
+        break
+      if error is None:
+        response.close()
+      timings.count("retries", host=self.host)
+      self.sleep(delay)
+
+    if error is not None:
+      raise error
+    return response
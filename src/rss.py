@@ -1,27 +1,168 @@
+import os
 from datetime import datetime
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, Iterable, List
 
-import feedgenerator
+from src.records import JobRecord
 
+if TYPE_CHECKING:
+    import feedgenerator
 
-def convert_to_rss(jobs: List[Dict]) -> str:
-    """
-    Converts job listings to RSS feed format
-    """
-    feed = feedgenerator.Rss201rev2Feed(
+DEFAULT_FEED_PATH = "jobs.rss"
+
+
+def _new_feed() -> "feedgenerator.Rss201rev2Feed":
+    # feedgenerator is imported when the first feed is made rather than with
+    # this module, which everything imports for DEFAULT_FEED_PATH.
+    import feedgenerator
+
+    return feedgenerator.Rss201rev2Feed(
         title="Job Listings",
         link="http://example.com",
         description="Job listings from multiple sources",
         language="en"
     )
-    
-    for job in jobs:
-        feed.add_item(
-            title=job.get('title', 'No Title') + " - " + job.get('created_at', '') + " - " + job.get('updated_at', ''),
-            link=job.get('url', ''),
-            description=job.get('description', 'No Description'),
-            author_name=job.get('company', 'Unknown Company'),
-            pubdate=datetime.fromisoformat(job.get('created_at'))
+
+
+def _item_fields(job: Dict | JobRecord) -> Dict:
+    if isinstance(job, JobRecord):
+        return dict(
+            title=(job.title if job.title is not None else 'No Title') + " - " + (job.created_at or '') + " - " + (job.updated_at or ''),
+            link=job.url if job.url is not None else '',
+            description=job.description if job.description is not None else 'No Description',
+            author_name=job.company,
+            pubdate=datetime.fromisoformat(job.created_at)
         )
-    
+    return dict(
+        title=job.get('title', 'No Title') + " - " + job.get('created_at', '') + " - " + job.get('updated_at', ''),
+        link=job.get('url', ''),
+        description=job.get('description', 'No Description'),
+        author_name=job.get('company', 'Unknown Company'),
+        pubdate=datetime.fromisoformat(job.get('created_at'))
+    )
+
+
+def convert_to_rss(jobs: List[Dict | JobRecord]) -> str:
+    """
+    Converts job listings to RSS feed format
+    """
+    feed = _new_feed()
+
+    for job in jobs:
+        feed.add_item(**_item_fields(job))
+
     return feed.writeString('utf-8')
+
+
+def read_rss_items(path: str) -> Iterable[Dict]:
+    """
+    Reads back the items of a feed written by convert_to_rss or RssWriter,
+    one at a time, as add_item arguments
+    """
+    # Only needed for incremental feeds
+    from email.utils import parsedate_to_datetime
+    from xml.etree.ElementTree import iterparse
+
+    for _, element in iterparse(path):
+        if element.tag != "item":
+            continue
+        fields = {"title": "", "link": "", "description": None,
+                  "author_name": None, "pubdate": None}
+        for child in element:
+            text = child.text or ""
+            if child.tag in ("title", "link", "description"):
+                fields[child.tag] = text
+            elif child.tag.endswith("}creator"):
+                fields["author_name"] = text
+            elif child.tag == "pubDate":
+                fields["pubdate"] = parsedate_to_datetime(text)
+        element.clear()
+        yield fields
+
+
+class RssWriter:
+    """
+    Writes the feed to `path` item by item as jobs come in, instead of
+    building the whole document in memory
+
+    Items go to `<path>.partial`, flushed by flush() so it can be watched
+    during long runs, and close() renames it over `path` in one step. If
+    the run fails the partial file is dropped and `path` is left alone.
+
+    With `incremental`, close() carries over the items of the existing feed
+    whose links weren't written in this run. `max_items` caps the number of
+    items in the feed, new ones first.
+    """
+
+    def __init__(self, path: str = DEFAULT_FEED_PATH, max_items: int = None,
+                 incremental: bool = False):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.max_items = max_items
+        self.incremental = incremental
+        self.count = 0
+        self.links = set()
+        from feedgenerator.django.utils.xmlutils import SimplerXMLGenerator
+
+        self.feed = _new_feed()
+        self.file = open(self.partial_path, "w", encoding="utf-8")
+        self.handler = SimplerXMLGenerator(self.file, "utf-8",
+                                           short_empty_elements=True)
+        # As in RssFeed.write, minus the items. With no items yet,
+        # lastBuildDate is the time the run started.
+        self.handler.startDocument()
+        self.feed.add_stylesheets(self.handler)
+        self.handler.startElement("rss", self.feed.rss_attributes())
+        self.handler.startElement("channel", self.feed.root_attributes())
+        self.feed.add_root_elements(self.handler)
+
+    def __enter__(self) -> "RssWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def full(self) -> bool:
+        return self.max_items is not None and self.count >= self.max_items
+
+    def _write_item(self, fields: Dict) -> bool:
+        if self.full():
+            return False
+        self.feed.add_item(**fields)
+        item = self.feed.items.pop()
+        self.handler.startElement("item", self.feed.item_attributes(item))
+        self.feed.add_item_elements(self.handler, item)
+        self.handler.endElement("item")
+        self.links.add(item["link"])
+        self.count += 1
+        return True
+
+    def add(self, job: Dict | JobRecord) -> bool:
+        return self._write_item(_item_fields(job))
+
+    def add_jobs(self, jobs: Iterable[Dict | JobRecord]):
+        for job in jobs:
+            if not self.add(job):
+                break
+        self.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.incremental and os.path.exists(self.path):
+            for fields in read_rss_items(self.path):
+                if self.full():
+                    break
+                if fields["link"] not in self.links:
+                    self._write_item(fields)
+        self.feed.endChannelElement(self.handler)
+        self.handler.endElement("rss")
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.partial_path)
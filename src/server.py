@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List
+
+from src.rss import DEFAULT_FEED_PATH
+
+DEFAULT_PORT = 8080
+DEFAULT_WATCH_INTERVAL = 5.0
+CONTENT_TYPE = "application/rss+xml; charset=utf-8"
+
+
+@dataclass(frozen=True)
+class FeedVersion:
+  body: bytes
+  gzipped: bytes
+  etag: str
+  # Whole seconds, as HTTP dates have no finer resolution
+  last_modified: int
+
+  @classmethod
+  def build(cls, body: bytes, last_modified: float = None) -> "FeedVersion":
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return cls(body=body, gzipped=gzip.compress(body, compresslevel=9),
+               etag=f'"{digest}"',
+               last_modified=int(last_modified if last_modified is not None
+                                 else time.time()))
+
+
+def _etags(header: str) -> List[str]:
+  return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+class FeedServer:
+  # Serves the feed from memory, as is and gzipped, with ETag and
+  # Last-Modified so polling readers mostly get a 304. publish() builds the
+  # next version off to the side and swaps it in with one assignment, so a
+  # request sees either the old feed or the new one, never a mix.
+  def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    # Imported here so that importing this module (e.g. for DEFAULT_PORT)
+    # stays cheap
+    from http.server import ThreadingHTTPServer
+
+    self.version: FeedVersion | None = None
+    self.source: tuple | None = None
+    self.routes = {"/", "/" + DEFAULT_FEED_PATH}
+    self.server = ThreadingHTTPServer((host, port), self._handler())
+    self.server.daemon_threads = True
+    self.port = self.server.server_address[1]
+    self.thread = None
+
+  def publish(self, body: bytes | str, last_modified: float = None):
+    if isinstance(body, str):
+      body = body.encode("utf-8")
+    version = self.version
+    if version is not None and version.body == body:
+      return
+    self.version = FeedVersion.build(body, last_modified)
+
+  def load(self, path: str) -> bool:
+    # (Re)reads the feed file if it changed since the last load. Returns
+    # whether a new version was published.
+    try:
+      stat = os.stat(path)
+      source = (stat.st_mtime_ns, stat.st_size)
+      if source == self.source:
+        return False
+      with open(path, "rb") as f:
+        body = f.read()
+    except OSError as e:
+      print(f"Could not read feed from {path}: {str(e)}")
+      return False
+    self.source = source
+    self.publish(body, stat.st_mtime)
+    return True
+
+  def watch(self, path: str, interval: float = DEFAULT_WATCH_INTERVAL,
+            stop: threading.Event = None) -> threading.Thread:
+    # Picks up feeds written by other processes (e.g. main run from cron).
+    # RssWriter renames the new feed into place, so a load never sees a
+    # half-written file.
+    stop = stop or threading.Event()
+    self.routes.add("/" + os.path.basename(path))
+
+    def poll():
+      while not stop.wait(interval):
+        self.load(path)
+
+    self.load(path)
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    return thread
+
+  def _handler(self):
+    from email.utils import formatdate, parsedate_to_datetime
+    from http.server import BaseHTTPRequestHandler
+
+    feeds = self
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+
+      def log_message(self, format, *args):
+        pass
+
+      def not_modified(self, version: FeedVersion) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+          tags = _etags(if_none_match)
+          return "*" in tags or version.etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+          try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+          except (TypeError, ValueError):
+            return False
+          return version.last_modified <= since
+        return False
+
+      def do_GET(self):
+        self.respond(send_body=True)
+
+      def do_HEAD(self):
+        self.respond(send_body=False)
+
+      def respond(self, send_body: bool):
+        if self.path.split("?")[0] not in feeds.routes:
+          self.send_error(404)
+          return
+        # One read of the shared reference; the rest of the request uses
+        # this version even if a new one is published meanwhile.
+        version = feeds.version
+        if version is None:
+          self.send_error(503, "No feed yet")
+          return
+
+        status = 304 if self.not_modified(version) else 200
+        self.send_response(status)
+        # Both encodings share the ETag: it names the feed version.
+        self.send_header("ETag", version.etag)
+        self.send_header("Last-Modified",
+                         formatdate(version.last_modified, usegmt=True))
+        self.send_header("Vary", "Accept-Encoding")
+        if status == 304:
+          self.end_headers()
+          return
+        body = version.body
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+          body = version.gzipped
+          self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+          self.wfile.write(body)
+
+    return Handler
+
+  def start(self) -> "FeedServer":
+    self.thread = threading.Thread(target=self.server.serve_forever,
+                                   daemon=True)
+    self.thread.start()
+    return self
+
+  def serve_forever(self):
+    self.server.serve_forever()
+
+  def stop(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+def main(argv: List[str] = None):
+  parser = argparse.ArgumentParser(
+      description="Serve the RSS feed with conditional GET and gzip.")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+  parser.add_argument("--feed", default=DEFAULT_FEED_PATH)
+  parser.add_argument(
+      "--watch-interval", type=float, default=DEFAULT_WATCH_INTERVAL,
+      help="Seconds between checks of the feed file for a new version")
+  args = parser.parse_args(argv)
+
+  server = FeedServer(args.host, args.port)
+  server.watch(args.feed, args.watch_interval)
+  print(f"Serving {args.feed} on http://{args.host}:{server.port}/")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == "__main__":
+  main()
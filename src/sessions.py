@@ -0,0 +1,86 @@
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Tuple
+from urllib.parse import urlparse
+
+from src.types import HttpDefinition
+
+if TYPE_CHECKING:
+  import requests
+
+DEFAULT_HTTP_CONFIG: HttpDefinition = {
+    "pool_size": 10,
+    "timeout": 30,
+    "connect_timeout": 10,
+    "accept_encoding": ["gzip", "deflate", "br"],
+    # See src/resilience.py
+    "retries": 2,
+    "backoff": 0.5,
+    "max_backoff": 30,
+    "rate_limit": 10,
+    "rate_burst": 10,
+    "breaker_threshold": 5,
+    "breaker_cooldown": 300,
+    "deadline": 120,
+}
+
+
+@lru_cache(maxsize=None)
+def brotli_available() -> bool:
+  # requests only decodes "br" bodies when one of these is installed, so
+  # don't advertise it otherwise. Checked on first use, as importing them
+  # is slow.
+  for module in ("brotli", "brotlicffi"):
+    try:
+      __import__(module)
+      return True
+    except ImportError:
+      continue
+  return False
+
+
+def http_config(api_definition: Dict) -> HttpDefinition:
+  config = dict(DEFAULT_HTTP_CONFIG)
+  config.update(api_definition.get("http", {}))
+  return config
+
+
+class SessionPool:
+  # Keeps one keep-alive requests.Session per host (and pool settings), so
+  # every page of a paginated board and every board on the same host reuse
+  # the same TCP/TLS connections.
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._sessions: Dict[Tuple, "requests.Session"] = {}
+
+  def get(self, url: str, config: HttpDefinition) -> "requests.Session":
+    # requests takes a good part of startup to import, and runs that don't
+    # fetch (or fetch nothing) never need it.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    encodings = [encoding for encoding in config["accept_encoding"]
+                 if encoding != "br" or brotli_available()]
+    key = (urlparse(url).netloc.lower(), int(config["pool_size"]),
+           tuple(encodings))
+    with self._lock:
+      session = self._sessions.get(key)
+      if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=int(config["pool_size"]))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if encodings:
+          session.headers["Accept-Encoding"] = ", ".join(encodings)
+        self._sessions[key] = session
+      return session
+
+  def close(self):
+    with self._lock:
+      for session in self._sessions.values():
+        session.close()
+      self._sessions.clear()
+
+
+sessions = SessionPool()
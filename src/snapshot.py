@@ -0,0 +1,78 @@
+import os
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from src.criteria import CompiledCriteria
+from src.gazetteer import (FIXED_DATA_PATH, Gazetteer, _source_signature,
+                           loaded_gazetteer, use_gazetteer)
+from src.types import ApiDefinition, BoardConfig
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(".cache", "config.pickle")
+CONFIG_PATHS = ("src/api_definitions.json", "src/boards.json",
+                "src/criteria.json")
+# Bump when what goes into a snapshot changes shape
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class ConfigSnapshot:
+  # Everything main() builds from the config files before fetching: the
+  # boards with their hydrated adapters, the compiled criteria and, when the
+  # criteria needed it, the gazetteer. Pickled into one file, so a run with
+  # unchanged configs starts with a single read.
+  signature: Tuple
+  boards: List[Tuple[BoardConfig, ApiDefinition]]
+  criteria: CompiledCriteria
+  gazetteer: Gazetteer | None
+
+
+def config_signature(paths: Tuple[str, ...] = CONFIG_PATHS) -> Tuple | None:
+  # Changes when any config file (or fixed_data.py) is edited. None when a
+  # config is missing, which main() reports.
+  try:
+    return (SNAPSHOT_VERSION,
+            tuple(_source_signature(path) for path in paths),
+            _source_signature(FIXED_DATA_PATH))
+  except OSError:
+    return None
+
+
+def load_snapshot(path: str = DEFAULT_SNAPSHOT_PATH,
+                  paths: Tuple[str, ...] = CONFIG_PATHS
+                  ) -> ConfigSnapshot | None:
+  # Returns None when there is no snapshot or it is out of date
+  import pickle
+  signature = config_signature(paths)
+  if signature is None:
+    return None
+  try:
+    with open(path, "rb") as f:
+      snapshot = pickle.load(f)
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+          ImportError, TypeError):
+    return None
+  if not isinstance(snapshot, ConfigSnapshot) or \
+          snapshot.signature != signature:
+    return None
+  if snapshot.gazetteer is not None:
+    use_gazetteer(snapshot.gazetteer)
+  return snapshot
+
+
+def save_snapshot(boards: List[Tuple[BoardConfig, ApiDefinition]],
+                  criteria: CompiledCriteria,
+                  path: str = DEFAULT_SNAPSHOT_PATH,
+                  paths: Tuple[str, ...] = CONFIG_PATHS):
+  import pickle
+  signature = config_signature(paths)
+  if signature is None:
+    return
+  snapshot = ConfigSnapshot(signature, boards, criteria, loaded_gazetteer())
+  try:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+      pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+  except OSError as e:
+    print(f"Could not save config snapshot to {path}: {str(e)}")
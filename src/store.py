@@ -0,0 +1,104 @@
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict
+
+from src.records import FilterFailure, JobRecord
+
+DEFAULT_STORE_PATH = "jobs.sqlite3"
+
+
+@dataclass
+class StoredJob:
+  content_hash: str
+  verdict_key: str
+  first_seen: str
+  passed: bool
+  job: JobRecord
+  stats: Dict[str, int]
+
+
+class JobStore:
+  # Remembers every posting we have parsed, keyed by company and URL, with a
+  # hash of its raw content and the verdict it got. Postings whose content
+  # and criteria are unchanged since the last run reuse that verdict.
+  def __init__(self, path: str = DEFAULT_STORE_PATH):
+    self.connection = sqlite3.connect(path)
+    self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+          company TEXT NOT NULL,
+          url TEXT NOT NULL,
+          content_hash TEXT NOT NULL,
+          verdict_key TEXT NOT NULL,
+          first_seen TEXT NOT NULL,
+          last_seen TEXT NOT NULL,
+          passed INTEGER NOT NULL,
+          job TEXT NOT NULL,
+          stats TEXT NOT NULL,
+          failures INTEGER,
+          PRIMARY KEY (company, url)
+        )""")
+    # Stores made before the failures had a column of their own; their rows
+    # fall back to the failed_reason text until they are saved again
+    columns = [row[1] for row in
+               self.connection.execute("PRAGMA table_info(jobs)")]
+    if "failures" not in columns:
+      self.connection.execute("ALTER TABLE jobs ADD COLUMN failures INTEGER")
+    self.connection.commit()
+
+  @staticmethod
+  def content_hash(job: Dict) -> str:
+    return hashlib.sha256(json.dumps(
+        job, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+  # Changes whenever something that decides a verdict does, so editing
+  # criteria.json or an adapter's job_format re-filters every posting.
+  @staticmethod
+  def verdict_key(job_format: Dict, criteria: Dict) -> str:
+    return hashlib.sha256(json.dumps(
+        [job_format, criteria], sort_keys=True, default=str
+    ).encode("utf-8")).hexdigest()
+
+  def lookup(self, company: str, url: str) -> StoredJob | None:
+    row = self.connection.execute(
+        "SELECT content_hash, verdict_key, first_seen, passed, job, stats, "
+        "failures FROM jobs WHERE company = ? AND url = ?",
+        (company, url)).fetchone()
+    if row is None:
+      return None
+    content_hash, verdict_key, first_seen, passed, job, stats, failures = row
+    if failures is not None:
+      failures = FilterFailure(failures)
+    return StoredJob(content_hash, verdict_key, first_seen, bool(passed),
+                     JobRecord.from_dict(json.loads(job), failures),
+                     json.loads(stats))
+
+  def save(self, company: str, url: str, content_hash: str, verdict_key: str,
+           job: JobRecord, passed: bool, stats: Dict[str, int], first_seen: str):
+    now = datetime.now().isoformat()
+    self.connection.execute(
+        "INSERT INTO jobs (company, url, content_hash, verdict_key, "
+        "first_seen, last_seen, passed, job, stats, failures) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (company, url) DO UPDATE SET "
+        "content_hash = excluded.content_hash, "
+        "verdict_key = excluded.verdict_key, "
+        "last_seen = excluded.last_seen, passed = excluded.passed, "
+        "job = excluded.job, stats = excluded.stats, "
+        "failures = excluded.failures",
+        (company, url, content_hash, verdict_key, first_seen, now, int(passed),
+         json.dumps(job.to_dict(), default=str), json.dumps(stats),
+         int(job.failures)))
+
+  def mark_seen(self, company: str, url: str):
+    self.connection.execute(
+        "UPDATE jobs SET last_seen = ? WHERE company = ? AND url = ?",
+        (datetime.now().isoformat(), company, url))
+
+  def commit(self):
+    self.connection.commit()
+
+  def close(self):
+    self.connection.close()
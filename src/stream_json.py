@@ -0,0 +1,110 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class _Reader:
+  # A window over a JSON document arriving in chunks. Only the part from the
+  # value currently being read onwards is kept in memory.
+  def __init__(self, chunks: Iterable[bytes | str]):
+    self.chunks = iter(chunks)
+    self.decoder = codecs.getincrementaldecoder("utf-8")()
+    self.buffer = ""
+    self.pos = 0
+    self.eof = False
+
+  def fill(self, size: int = 1) -> bool:
+    # Reads chunks until at least `size` more characters are buffered.
+    # Returns False once the document has run out.
+    parts = [self.buffer]
+    read = 0
+    while read < size and not self.eof:
+      try:
+        chunk = next(self.chunks)
+      except StopIteration:
+        self.eof = True
+        chunk = self.decoder.decode(b"", final=True)
+      if isinstance(chunk, bytes):
+        chunk = self.decoder.decode(chunk)
+      parts.append(chunk)
+      read += len(chunk)
+    self.buffer = "".join(parts)
+    return read > 0
+
+  def discard_read(self):
+    self.buffer = self.buffer[self.pos:]
+    self.pos = 0
+
+  def peek(self) -> str:
+    while True:
+      self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+      if self.pos < len(self.buffer):
+        return self.buffer[self.pos]
+      self.discard_read()
+      if not self.fill():
+        raise ValueError("Unexpected end of JSON")
+
+  def expect(self, char: str):
+    if self.peek() != char:
+      raise ValueError(
+          f"Expected {char!r} at {self.buffer[self.pos:self.pos + 20]!r}")
+    self.pos += 1
+
+  def read_value(self) -> Any:
+    # Decodes the value at self.pos with json's own (C) scanner. A value cut
+    # off at the end of the buffer fails to decode, or for a number may
+    # decode short ("-25" of "-2500.0"), so both mean read more and try
+    # again. Doubling what's buffered each time keeps values spanning many
+    # chunks linear.
+    self.peek()
+    while True:
+      try:
+        value, end = _DECODER.raw_decode(self.buffer, self.pos)
+        if self.eof or (end < len(self.buffer)
+                        and self.buffer[end] not in _NUMBER_CHARS):
+          self.pos = end
+          return value
+      except json.JSONDecodeError:
+        if self.eof:
+          raise
+      self.fill(len(self.buffer) - self.pos)
+
+
+def iter_json_array(chunks: Iterable[bytes | str], path: str) -> Iterator[Any]:
+  # Yields the items of the array at dotted `path` (as in get_json_key) of a
+  # JSON document given as chunks of bytes or text, one item at a time. Only
+  # the item being decoded is held in memory, not the whole document.
+  reader = _Reader(chunks)
+  for part in path.split(".") if path else []:
+    reader.expect("{")
+    while True:
+      if reader.peek() == "}":
+        raise ValueError(f"Key not found: {part}")
+      key = reader.read_value()
+      reader.expect(":")
+      if key == part:
+        break
+      reader.read_value()
+      reader.discard_read()
+      if reader.peek() == ",":
+        reader.pos += 1
+
+  if reader.peek() != "[":
+    raise ValueError(f"Expected a list at {path}")
+  reader.pos += 1
+  if reader.peek() == "]":
+    return
+  while True:
+    reader.discard_read()
+    yield reader.read_value()
+    char = reader.peek()
+    reader.pos += 1
+    if char == "]":
+      return
+    if char != ",":
+      raise ValueError(f"Expected ',' or ']' in list at {path}")
@@ -0,0 +1,251 @@
+import json
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Tuple
+
+# Upper bounds in seconds, from 10µs (a filter on a small job) to a minute
+# (a slow board with many pages). Anything slower lands in the last, +Inf,
+# bucket.
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+           0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape_label(value: str) -> str:
+  return str(value).replace("\\", "\\\\").replace('"', '\\"').replace(
+      "\n", "\\n")
+
+
+class Histogram:
+  __slots__ = ("counts", "count", "sum", "max")
+
+  def __init__(self):
+    self.counts = [0] * (len(BUCKETS) + 1)
+    self.count = 0
+    self.sum = 0.0
+    self.max = 0.0
+
+  def observe(self, seconds: float):
+    self.counts[bisect_left(BUCKETS, seconds)] += 1
+    self.count += 1
+    self.sum += seconds
+    if seconds > self.max:
+      self.max = seconds
+
+  def merge(self, other: "Histogram"):
+    for i, count in enumerate(other.counts):
+      self.counts[i] += count
+    self.count += other.count
+    self.sum += other.sum
+    self.max = max(self.max, other.max)
+
+  # The upper bound of the bucket holding the q-th observation, so it may
+  # overstate by up to one bucket width.
+  def quantile(self, q: float) -> float:
+    rank = q * self.count
+    seen = 0
+    for bound, count in zip(BUCKETS, self.counts):
+      seen += count
+      if seen >= rank:
+        return min(bound, self.max)
+    return self.max
+
+  def cumulative(self) -> List[int]:
+    total = 0
+    result = []
+    for count in self.counts:
+      total += count
+      result.append(total)
+    return result
+
+
+class Stopwatch:
+  # Times consecutive steps: each lap() ends a step, named `value`, that
+  # started at the previous lap (or when the stopwatch was made). Laps are
+  # recorded under `label`=`value` in one go by stop(), as they can run
+  # several times per job.
+  def __init__(self, timings: "Timings", name: str, label: str):
+    self.timings = timings
+    self.name = name
+    self.label = label
+    self.laps = [(None, perf_counter())]
+
+  def lap(self, value: str):
+    self.laps.append((value, perf_counter()))
+
+  def stop(self):
+    self.timings.observe_steps(self.name, self.label, self.laps)
+    self.laps = [(None, perf_counter())]
+
+
+class _NoStopwatch:
+  def lap(self, value: str):
+    pass
+
+  def stop(self):
+    pass
+
+
+_NO_STOPWATCH = _NoStopwatch()
+
+
+class Timings:
+  # Where the time goes in a run: latency histograms and counters, keyed by
+  # name and labels the way Prometheus does (e.g. fetch_page_seconds with
+  # host="boards.example.com"). Companion to ParseJobsStats, which counts
+  # filter outcomes per board.
+  #
+  # Stopwatches (per-filter timings) cost a few µs per job, so they only
+  # record when `detailed` is set; everything else is always recorded.
+  def __init__(self, detailed: bool = False):
+    self.detailed = detailed
+    self.lock = threading.Lock()
+    self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+    self.counters: Dict[Tuple[str, Labels], float] = {}
+    # (name, label, value) -> histogram, for Stopwatch laps, which run
+    # several times per job
+    self.steps: Dict[Tuple[str, str, str], Histogram] = {}
+
+  def __getstate__(self):
+    return self.detailed, self.histograms, self.counters
+
+  def __setstate__(self, state):
+    self.lock = threading.Lock()
+    self.detailed, self.histograms, self.counters = state
+    self.steps = {}
+
+  def observe(self, name: str, seconds: float, **labels: str):
+    key = (name, tuple(sorted(labels.items())))
+    with self.lock:
+      histogram = self.histograms.get(key)
+      if histogram is None:
+        histogram = self.histograms[key] = Histogram()
+      histogram.observe(seconds)
+
+  def observe_steps(self, name: str, label: str,
+                    laps: List[Tuple[str | None, float]]):
+    with self.lock:
+      for (_, started), (value, ended) in zip(laps, laps[1:]):
+        histogram = self.steps.get((name, label, value))
+        if histogram is None:
+          key = (name, ((label, value),))
+          histogram = self.histograms.get(key)
+          if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+          self.steps[(name, label, value)] = histogram
+        histogram.observe(ended - started)
+
+  def count(self, name: str, value: float = 1, **labels: str):
+    key = (name, tuple(sorted(labels.items())))
+    with self.lock:
+      self.counters[key] = self.counters.get(key, 0) + value
+
+  @contextmanager
+  def time(self, name: str, **labels: str) -> Iterator[None]:
+    started = perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(name, perf_counter() - started, **labels)
+
+  def stopwatch(self, name: str, label: str) -> Stopwatch:
+    if not self.detailed:
+      return _NO_STOPWATCH
+    return Stopwatch(self, name, label)
+
+  def merge(self, other: "Timings"):
+    with self.lock:
+      for key, histogram in other.histograms.items():
+        if key not in self.histograms:
+          self.histograms[key] = Histogram()
+        self.histograms[key].merge(histogram)
+      for key, value in other.counters.items():
+        self.counters[key] = self.counters.get(key, 0) + value
+
+  # Hands back everything recorded so far and starts over, e.g. to send a
+  # parse worker's timings back with its batch.
+  def take(self) -> "Timings":
+    taken = Timings()
+    with self.lock:
+      taken.histograms, self.histograms = self.histograms, {}
+      taken.counters, self.counters = self.counters, {}
+      self.steps = {}
+    return taken
+
+  def to_dict(self) -> Dict:
+    with self.lock:
+      return {
+          "histograms": [
+              {"name": name, "labels": dict(labels), "count": h.count,
+               "sum": h.sum, "max": h.max,
+               "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+               "buckets": dict(zip([*map(str, BUCKETS), "+Inf"],
+                                   h.cumulative()))}
+              for (name, labels), h in sorted(self.histograms.items())
+          ],
+          "counters": [
+              {"name": name, "labels": dict(labels), "value": value}
+              for (name, labels), value in sorted(self.counters.items())
+          ],
+      }
+
+  def to_json(self) -> str:
+    return json.dumps(self.to_dict(), indent=2)
+
+  def to_prometheus(self, prefix: str = "jobs_") -> str:
+    def label_str(labels: Labels, *extra: Tuple[str, str]) -> str:
+      pairs = [*labels, *extra]
+      if not pairs:
+        return ""
+      return "{" + ",".join(f'{key}="{_escape_label(value)}"'
+                            for key, value in pairs) + "}"
+
+    lines = []
+    with self.lock:
+      histograms = sorted(self.histograms.items())
+      counters = sorted(self.counters.items())
+    typed = set()
+    for (name, labels), h in histograms:
+      metric = prefix + name
+      if metric not in typed:
+        lines.append(f"# TYPE {metric} histogram")
+        typed.add(metric)
+      for bound, count in zip([*map(str, BUCKETS), "+Inf"], h.cumulative()):
+        lines.append(f"{metric}_bucket{label_str(labels, ('le', bound))} "
+                     f"{count}")
+      lines.append(f"{metric}_sum{label_str(labels)} {h.sum}")
+      lines.append(f"{metric}_count{label_str(labels)} {h.count}")
+    for (name, labels), value in counters:
+      metric = prefix + name + "_total"
+      if metric not in typed:
+        lines.append(f"# TYPE {metric} counter")
+        typed.add(metric)
+      lines.append(f"{metric}{label_str(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+  def print_table(self):
+    from tabulate import tabulate
+
+    def label_text(labels: Labels) -> str:
+      return " ".join(f"{key}={value}" for key, value in labels)
+
+    with self.lock:
+      histograms = sorted(self.histograms.items())
+      counters = sorted(self.counters.items())
+    data = [[name, label_text(labels), h.count, f"{h.sum:.4f}",
+             f"{h.sum / h.count * 1000:.3f}" if h.count else "",
+             f"{h.quantile(0.95) * 1000:.3f}", f"{h.max * 1000:.3f}"]
+            for (name, labels), h in histograms]
+    data.extend([name, label_text(labels), value, "", "", "", ""]
+                for (name, labels), value in counters)
+    print(tabulate(data, headers=["Timing", "Labels", "Count", "Total s",
+                                  "Mean ms", "p95 ms", "Max ms"],
+                   tablefmt="simple"))
+
+
+# Shared by the whole run, like the session pool.
+timings = Timings()
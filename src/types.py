@@ -1,9 +1,12 @@
-from typing import Dict, TypedDict
+from typing import Dict, List, TypedDict
 
 
 class BoardConfig(TypedDict):
   adapter: str
   board_uri: str
+  company_name: str
+  # Seconds between polls in daemon mode; overrides --interval
+  refresh_interval: float
   api_vars: Dict[str, str]
 
 
@@ -25,10 +28,40 @@ class RequestDefinition(TypedDict):
 class ResponseDefinition(TypedDict):
   root: str
   job_format: JobFormatDefinition
+  # Read the job list from the body as it downloads instead of loading the
+  # whole response (boards without pagination only). For very large boards:
+  # the body is read outside the fetch concurrency limits, and is neither
+  # cached nor digested, see fetch_board. The board's http "deadline" only
+  # counts the time spent waiting on the server, not on parsing.
+  stream: bool
+
+
+class HttpDefinition(TypedDict, total=False):
+  pool_size: int
+  # Seconds to wait for the server to send data, and to connect
+  timeout: float
+  connect_timeout: float
+  accept_encoding: List[str]
+  # Retries on connection errors, timeouts, 429 and 5xx, with jittered
+  # exponential backoff starting at `backoff` seconds, up to `max_backoff`
+  retries: int
+  backoff: float
+  max_backoff: float
+  # Requests a second to the host (0 for no limit), in bursts of up to
+  # rate_burst
+  rate_limit: float
+  rate_burst: float
+  # Failed fetches in a row, counted across runs, before the board is
+  # skipped for breaker_cooldown seconds
+  breaker_threshold: int
+  breaker_cooldown: float
+  # Seconds a board's whole fetch (pages, retries and body) may take
+  deadline: float
 
 
 class ApiDefinition(TypedDict):
   vars: Dict[str, str]
+  http: HttpDefinition
   pagination: Dict[str, str]
   request: RequestDefinition
   response: ResponseDefinition
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from src import apis
+from src.cache import ParseCache, ResponseCache
+from src.fetcher import fetch_boards
+from src.sessions import DEFAULT_HTTP_CONFIG, SessionPool, http_config
+
+
+class TestSessions:
+  def test_sessions_are_shared_per_host(self):
+    pool = SessionPool()
+    first = pool.get("https://jobs.example.com/a?page=1", DEFAULT_HTTP_CONFIG)
+    second = pool.get("https://jobs.example.com/b", DEFAULT_HTTP_CONFIG)
+    other = pool.get("https://other.example.com/a", DEFAULT_HTTP_CONFIG)
+    assert first is second
+    assert first is not other
+    pool.close()
+
+  def test_http_config_overrides_defaults(self):
+    config = http_config({"http": {"timeout": 5}})
+    assert config["timeout"] == 5
+    assert config["pool_size"] == DEFAULT_HTTP_CONFIG["pool_size"]
+
+
+class TestPagination:
+  def make_definition(self, prefetch_window):
+    return {
+        "pagination": {
+            "limit_field": "limit", "limit_value": 2,
+            "offset_field": "offset", "offset_value": 0,
+            "remaining": "total", "prefetch_window": prefetch_window,
+        },
+        "request": {"type": "post", "body": {"content": {}}},
+        "response": {"root": "data.results", "job_format": {}},
+    }
+
+  def fake_board(self, total, delays):
+    def get_response_json(method, url, headers=None, body=None, **kwargs):
+      offset = body["offset"]
+      time.sleep(delays.get(offset, 0))
+      jobs = list(range(offset, min(offset + body["limit"], total)))
+      return {"data": {"results": jobs}, "total": total}
+    return get_response_json
+
+  @pytest.mark.parametrize("prefetch_window", [1, 3])
+  def test_pages_are_merged_in_order(self, monkeypatch, prefetch_window):
+    # The first prefetched page finishes last.
+    monkeypatch.setattr(apis, "get_response_json",
+                        self.fake_board(7, {2: 0.05}))
+    definition = self.make_definition(prefetch_window)
+    data = apis.fetch_data_from_board("https://jobs.example.com", definition)
+    assert data == {"data": {"results": [0, 1, 2, 3, 4, 5, 6]}}
+
+  def test_prefetch_respects_per_host_limit(self, monkeypatch):
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    class Session:
+      def request(self, method, url, json=None, **kwargs):
+        with lock:
+          running[0] += 1
+          peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+          running[0] -= 1
+        jobs = list(range(json["offset"], min(json["offset"] + 2, 20)))
+        return JsonResponse({"data": {"results": jobs}, "total": 20})
+
+    class Pool:
+      def get(self, url, config):
+        return Session()
+
+    monkeypatch.setattr(apis, "sessions", Pool())
+    definition = dict(self.make_definition(4), http={"rate_limit": 0})
+    boards = [({"board_uri": f"https://jobs.example.com/{i}"}, definition)
+              for i in range(3)]
+    results = list(fetch_boards(boards, concurrency=3, per_host=2))
+
+    assert len(results) == 3
+    assert peak[0] == 2
+
+  @pytest.mark.parametrize("prefetch_window", [1, 3])
+  def test_failed_page_fails_the_board(self, monkeypatch, prefetch_window):
+    fetch_page = self.fake_board(7, {})
+
+    def get_response_json(method, url, headers=None, body=None, **kwargs):
+      # get_response_json prints the error and returns None
+      if body["offset"] == 4:
+        return None
+      return fetch_page(method, url, headers, body, **kwargs)
+
+    monkeypatch.setattr(apis, "get_response_json", get_response_json)
+    definition = self.make_definition(prefetch_window)
+    assert apis.fetch_data_from_board(
+        "https://jobs.example.com", definition) is None
+
+
+class FakeResponse:
+  def __init__(self, status_code, content=b"", headers=None):
+    self.status_code = status_code
+    self.content = content
+    self.headers = headers or {}
+
+  def raise_for_status(self):
+    if self.status_code >= 400:
+      raise Exception(f"HTTP {self.status_code}")
+
+  def iter_content(self, chunk_size):
+    yield self.content
+
+
+class JsonResponse(FakeResponse):
+  def __init__(self, data):
+    super().__init__(200, json.dumps(data).encode("utf-8"))
+
+  def json(self):
+    return json.loads(self.content)
+
+
+class TestResponseCache:
+  def test_revalidates_and_reuses_body_on_304(self, tmp_path):
+    sent_headers = []
+    responses = [
+        FakeResponse(200, b'{"jobs": [1]}', {"ETag": '"v1"'}),
+        FakeResponse(304),
+    ]
+
+    class Requester:
+      def request(self, method, url, headers=None, json=None, timeout=None):
+        sent_headers.append(headers)
+        return responses.pop(0)
+
+    cache = ResponseCache(str(tmp_path))
+    first, first_digest = cache.request(Requester(), "get", "https://a.example")
+    second, second_digest = cache.request(Requester(), "get", "https://a.example")
+
+    assert first == second == {"jobs": [1]}
+    assert first_digest == second_digest
+    assert "If-None-Match" not in sent_headers[0]
+    assert sent_headers[1]["If-None-Match"] == '"v1"'
+
+  def test_evicts_down_to_max_bytes(self, tmp_path):
+    cache = ParseCache(str(tmp_path), max_bytes=160)
+    for i in range(5):
+      cache.set(str(i), {"passed": ["x" * 50], "failed": []})
+      os.utime(cache.path(str(i), ".json"), (1000 + i, time.time() - 10 + i))
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["3.json", "4.json"]
+
+
+class StreamedResponse(FakeResponse):
+  def iter_content(self, chunk_size):
+    for i in range(0, len(self.content), 5):
+      yield self.content[i:i + 5]
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    self.closed = True
+
+
+class TestStreaming:
+  def test_streams_jobs_from_the_response_body(self):
+    response = StreamedResponse(200, b'{"jobs": [{"id": 1}, {"id": 2}]}')
+
+    class Session:
+      def request(self, method, url, **kwargs):
+        assert kwargs["stream"] is True
+        return response
+
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session())
+    assert list(jobs) == [{"id": 1}, {"id": 2}]
+    assert response.closed
+
+  def test_truncated_body_fails_the_board(self):
+    class TruncatedResponse(StreamedResponse):
+      def iter_content(self, chunk_size):
+        yield b'{"jobs": [{"id": 1}, '
+        raise requests.ConnectionError("connection reset")
+
+    class Session:
+      def request(self, method, url, **kwargs):
+        return TruncatedResponse(200)
+
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session())
+    assert next(jobs) == {"id": 1}
+    with pytest.raises(apis.StreamError, match="connection reset"):
+      next(jobs)
+
+  def test_deadline_ignores_time_spent_parsing(self, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(apis, "perf_counter", lambda: now[0])
+
+    class SlowResponse(StreamedResponse):
+      def iter_content(self, chunk_size):
+        for chunk in super().iter_content(chunk_size):
+          now[0] += 1
+          yield chunk
+
+    class Session:
+      def request(self, method, url, **kwargs):
+        now[0] += 1
+        return SlowResponse(200, b'{"jobs": [{"id": 1}, {"id": 2}]}')
+
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session(), deadline=9)
+    # Seven chunks and the headers, a second each, with a long wait in
+    # between for the board's turn to be parsed and while parsing it
+    now[0] += 100
+    assert next(jobs) == {"id": 1}
+    now[0] += 100
+    assert list(jobs) == [{"id": 2}]
+
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session(), deadline=5)
+    with pytest.raises(apis.StreamError, match="took too long"):
+      list(jobs)
+
+  def test_slot_held_until_body_is_read(self):
+    slot = threading.Semaphore(1)
+
+    class Session:
+      def request(self, method, url, **kwargs):
+        return StreamedResponse(200, b'{"jobs": [{"id": 1}, {"id": 2}]}')
+
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session(), slot=slot)
+    assert not slot.acquire(blocking=False)
+    assert next(jobs) == {"id": 1}
+    assert not slot.acquire(blocking=False)
+    assert list(jobs) == [{"id": 2}]
+    assert slot.acquire(blocking=False)
+    slot.release()
+
+    # Or until the jobs are dropped unread
+    jobs = apis.stream_response_jobs("get", "https://jobs.example.com", "jobs",
+                                     session=Session(), slot=slot)
+    assert not slot.acquire(blocking=False)
+    del jobs
+    assert slot.acquire(blocking=False)
@@ -0,0 +1,42 @@
+import pytest
+
+from src.criteria import compile_criteria
+from src.parse import find_cities_in_json_str, location_match, role_match
+
+criteria = {
+    "location_whitelist": ["New York", "Remote (US)"],
+    "role_terms": ["Engineer", "developer"],
+    "title_blacklist": ["Senior", "staff"],
+    "max_years_of_experience": 3,
+}
+
+
+class TestCompiledCriteria:
+  def test_compiles_once(self):
+    compiled = compile_criteria(criteria)
+    assert compile_criteria(compiled) is compiled
+    assert compiled.title_blacklist == {"senior", "staff"}
+    assert compiled.max_years_of_experience == 3
+
+  @pytest.mark.parametrize("locations", [
+      "New York NY", "remote (us)", "Boston MA", "", "Newark"])
+  def test_location_match_same_as_dict(self, locations):
+    compiled = compile_criteria(criteria)
+    assert location_match(locations, compiled) == \
+        location_match(locations, criteria)
+
+  def test_find_cities_same_as_dict(self):
+    compiled = compile_criteria(criteria)
+    job = '{"description": "Offices in New York and Remote (US)"}'
+    assert set(find_cities_in_json_str(job, compiled).split(" ")) == \
+        set(find_cities_in_json_str(job, criteria).split(" "))
+
+  def test_role_match_same_as_dict(self):
+    compiled = compile_criteria(criteria)
+    assert sorted(role_match("Software Engineer", "web developer", compiled)) \
+        == sorted(role_match("Software Engineer", "web developer", criteria))
+
+  def test_empty_whitelist_matches_nothing(self):
+    compiled = compile_criteria(dict(criteria, location_whitelist=[]))
+    assert not location_match("New York", compiled)
+    assert find_cities_in_json_str("New York", compiled) == ""
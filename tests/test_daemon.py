@@ -0,0 +1,98 @@
+import random
+
+from src import daemon as daemon_module
+from src.daemon import Daemon
+from src.rss import read_rss_items
+
+criteria = {
+    "location_whitelist": ["new york"],
+    "role_terms": ["engineer"],
+    "title_blacklist": [],
+    "max_years_of_experience": 3,
+}
+api_definition = {"response": {"root": "jobs", "job_format": {
+    "title": "title", "url": "url", "description": "content",
+    "location": "location"}}}
+
+
+def job(i):
+  return {"title": "Software Engineer", "url": f"https://example.com/{i}",
+          "content": "2 years of experience", "location": "New York"}
+
+
+class FakeCache:
+  def evict(self):
+    pass
+
+
+class FakeBoards:
+  # Stands in for fetch_boards: serves each board's current jobs with a
+  # digest that changes with them, or fails boards listed in `failing`.
+  def __init__(self):
+    self.jobs = {}
+    self.failing = set()
+    self.fetches = []
+
+  def __call__(self, boards, **kwargs):
+    for board, api_definition in boards:
+      self.fetches.append(board["company_name"])
+      if board["company_name"] in self.failing:
+        continue
+      jobs = self.jobs[board["company_name"]]
+      yield board, api_definition, {"jobs": jobs}, str(len(jobs))
+
+
+def make_daemon(monkeypatch, tmp_path, boards):
+  fake = FakeBoards()
+  monkeypatch.setattr(daemon_module, "fetch_boards", fake)
+  now = [0.0]
+  daemon = Daemon(
+      [({"company_name": name, "board_uri": f"https://{name}.example",
+         **extra}, api_definition) for name, extra in boards],
+      criteria, FakeCache(), feed_path=str(tmp_path / "jobs.rss"),
+      interval=100, jitter=0, max_backoff=1000, clock=lambda: now[0],
+      rng=random.Random(0))
+  return daemon, fake, now
+
+
+class TestDaemon:
+  def test_polls_each_board_on_its_interval(self, monkeypatch, tmp_path):
+    daemon, fake, now = make_daemon(
+        monkeypatch, tmp_path, [("a", {}), ("b", {"refresh_interval": 30})])
+    fake.jobs = {"a": [job(1)], "b": [job(2)]}
+    assert daemon.run_cycle()
+    assert sorted(fake.fetches) == ["a", "b"]
+
+    fake.fetches.clear()
+    now[0] = 31
+    daemon.run_cycle()
+    assert fake.fetches == ["b"]
+
+  def test_feed_is_rewritten_only_on_change(self, monkeypatch, tmp_path):
+    daemon, fake, now = make_daemon(monkeypatch, tmp_path, [("a", {})])
+    written = []
+    daemon.on_feed = written.append
+    fake.jobs = {"a": [job(1)]}
+    assert daemon.run_cycle()
+    now[0] = 200
+    assert not daemon.run_cycle()
+    assert written == [daemon.feed_path]
+    # Unchanged twice, so the next poll waits 100 * 1.5 ** 1
+    assert daemon.states[0].next_run == 200 + 150
+
+    fake.jobs = {"a": [job(1), job(2)]}
+    now[0] = 400
+    assert daemon.run_cycle()
+    links = [item["link"] for item in read_rss_items(daemon.feed_path)]
+    assert sorted(links) == ["https://example.com/1", "https://example.com/2"]
+    assert daemon.states[0].next_run == 400 + 100
+
+  def test_failing_board_backs_off(self, monkeypatch, tmp_path):
+    daemon, fake, now = make_daemon(monkeypatch, tmp_path, [("a", {})])
+    fake.failing = {"a"}
+    delays = []
+    for _ in range(5):
+      daemon.run_cycle()
+      delays.append(daemon.states[0].next_run - now[0])
+      now[0] = daemon.states[0].next_run
+    assert delays == [200, 400, 800, 1000, 1000]
@@ -0,0 +1,47 @@
+import json
+
+from src.debug_output import FailedJobWriter
+
+
+def failed_jobs(count):
+  return [{"title": "Designer", "url": f"https://example.com/{i}",
+           "json_str": "x" * 100, "failed_reason": "No matching title"}
+          for i in range(count)]
+
+
+def read_lines(path):
+  with open(path, encoding="utf-8") as f:
+    return [json.loads(line) for line in f]
+
+
+class TestFailedJobWriter:
+  def test_writes_one_line_per_job(self, tmp_path):
+    path = str(tmp_path / "debug.ndjson")
+    with FailedJobWriter(path) as writer:
+      writer.write_jobs(failed_jobs(3))
+    assert read_lines(path) == failed_jobs(3)
+
+  def test_truncates_or_drops_raw_json(self, tmp_path):
+    path = str(tmp_path / "debug.ndjson")
+    with FailedJobWriter(path, raw_chars=10) as writer:
+      writer.write_jobs(failed_jobs(1))
+    assert read_lines(path)[0]["json_str"] == "x" * 10 + "..."
+
+    with FailedJobWriter(path, raw_chars=0) as writer:
+      writer.write_jobs(failed_jobs(1))
+    assert "json_str" not in read_lines(path)[0]
+
+  def test_sample_is_stable_and_cap_is_applied(self, tmp_path):
+    path = str(tmp_path / "debug.ndjson")
+    with FailedJobWriter(path, sample=0.5) as writer:
+      writer.write_jobs(failed_jobs(200))
+    first = [job["url"] for job in read_lines(path)]
+    with FailedJobWriter(path, sample=0.5) as writer:
+      writer.write_jobs(failed_jobs(200))
+    assert [job["url"] for job in read_lines(path)] == first
+    assert 60 < len(first) < 140
+
+    with FailedJobWriter(path, max_jobs=5) as writer:
+      writer.write_jobs(failed_jobs(20))
+    assert len(read_lines(path)) == 5
+    assert writer.seen == 20
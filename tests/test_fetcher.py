@@ -0,0 +1,73 @@
+import threading
+import time
+
+from src import fetcher
+from src.resilience import guards
+from src.timings import timings
+
+
+class TestFetchBoards:
+  def test_per_host_limit(self, monkeypatch):
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+
+    def fake_fetch(url, api_definition, cache=None, slots=None):
+      host = url.split("/")[2]
+      with lock:
+        running[host] = running.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), running[host])
+      time.sleep(0.02)
+      with lock:
+        running[host] -= 1
+      return {"jobs": [url]}, None
+
+    monkeypatch.setattr(fetcher, "fetch_board", fake_fetch)
+    boards = [({"company_name": str(i), "board_uri": f"https://{host}/{i}"}, {})
+              for i in range(6) for host in ("a.example", "b.example")]
+    results = list(fetcher.fetch_boards(boards, concurrency=8, per_host=2))
+
+    assert len(results) == len(boards)
+    assert peak == {"a.example": 2, "b.example": 2}
+
+  def test_failed_boards_are_skipped(self, monkeypatch):
+    def fake_fetch(url, api_definition, cache=None, slots=None):
+      if url.endswith("bad"):
+        raise TypeError("'NoneType' object is not subscriptable")
+      return {"jobs": []}, None
+
+    monkeypatch.setattr(fetcher, "fetch_board", fake_fetch)
+    boards = [({"board_uri": "https://a.example/bad"}, {}),
+              ({"board_uri": "https://a.example/good"}, {})]
+    results = list(fetcher.fetch_boards(boards))
+
+    assert [board["board_uri"] for board, _, _, _ in results] == [
+        "https://a.example/good"]
+
+  def test_failing_board_is_skipped_once_its_circuit_opens(
+          self, monkeypatch):
+    fetched = []
+
+    def fake_fetch(url, api_definition, cache=None, slots=None):
+      fetched.append(url)
+      if url.endswith("bad"):
+        raise TypeError("'NoneType' object is not subscriptable")
+      return {"jobs": []}, None
+
+    monkeypatch.setattr(fetcher, "fetch_board", fake_fetch)
+    # A failing board next to a healthy one on the same host
+    definition = {"http": {"breaker_threshold": 2}}
+    boards = [({"board_uri": "https://a.example/bad"}, definition),
+              ({"board_uri": "https://a.example/good"}, definition)]
+    try:
+      for _ in range(3):
+        results = list(fetcher.fetch_boards(boards))
+    finally:
+      guards.clear()
+
+    assert fetched.count("https://a.example/bad") == 2
+    assert fetched.count("https://a.example/good") == 3
+    assert [board["board_uri"] for board, _, _, _ in results] == [
+        "https://a.example/good"]
+    assert timings.counters[("boards_skipped_circuit_open",
+                             (("board", "https://a.example/bad"),))] >= 1
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from src.criteria import compile_criteria
+from src.parse import flatten_json_to_list, iter_json_leaves, location_match
+
+criteria = compile_criteria({
+    "location_whitelist": ["new york", "remote (us)"],
+    "location_states": ["CA"],
+    "role_terms": [],
+    "max_years_of_experience": 3,
+})
+
+
+def recursive_flatten(obj):
+  # The recursive flatten_json_to_list this replaced
+  result = []
+
+  def _flatten(current_obj):
+    if isinstance(current_obj, dict):
+      for value in current_obj.values():
+        _flatten(value)
+    elif isinstance(current_obj, list):
+      for item in current_obj:
+        _flatten(item)
+    else:
+      result.append(str(current_obj).replace(',', '').strip())
+
+  _flatten(obj)
+  return " ".join(result)
+
+
+def random_json(rng, depth=0):
+  kind = rng.choice(["dict", "list", "str", "int", "none"] if depth < 5
+                    else ["str", "int", "none"])
+  if kind == "dict":
+    return {f"k{i}": random_json(rng, depth + 1)
+            for i in range(rng.randint(0, 4))}
+  if kind == "list":
+    return [random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+  if kind == "str":
+    return rng.choice(["New York, NY", " Remote ", "Albany", "", "Los, Angeles"])
+  return rng.randint(0, 99) if kind == "int" else None
+
+
+class TestFlatten:
+  @pytest.mark.parametrize("seed", range(50))
+  def test_same_as_recursive(self, seed):
+    obj = random_json(random.Random(seed))
+    assert flatten_json_to_list(obj) == recursive_flatten(obj)
+
+  def test_scalars(self):
+    assert flatten_json_to_list("New York, NY") == "New York NY"
+    assert flatten_json_to_list(None) == "None"
+    assert flatten_json_to_list([]) == ""
+
+  def test_deep_nesting(self):
+    obj = "New York"
+    for _ in range(5000):
+      obj = [obj, {"name": "Boston"}]
+    leaves = list(iter_json_leaves(obj, max_depth=10))
+    assert leaves == ["Boston"] * 9
+    assert "New York" in iter_json_leaves(obj, max_depth=6000,
+                                          max_leaves=10000)
+
+  def test_max_leaves(self):
+    assert list(iter_json_leaves(list(range(10)), max_leaves=3)) == \
+        ["0", "1", "2"]
+
+  @pytest.mark.parametrize("seed", range(50))
+  def test_location_match_leaves_same_as_joined(self, seed):
+    obj = random_json(random.Random(seed))
+    leaves = list(iter_json_leaves(obj))
+    assert location_match(leaves, criteria) == \
+        location_match(" ".join(leaves), criteria)
+
+  def test_location_match_across_leaves(self):
+    assert location_match(["New", "York"], criteria)
+    assert location_match(["Los Angeles", "CA"], criteria)
+    assert not location_match(["Newark", "NJ"], criteria)
+    assert not location_match([], criteria)
@@ -0,0 +1,45 @@
+import pytest
+
+from src import gazetteer as gazetteer_module
+from src.gazetteer import Gazetteer, Place, load_gazetteer
+from src.parse import location_match
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+  return Gazetteer.build()
+
+
+class TestGazetteer:
+  def test_city_followed_by_state_abbreviation(self, gazetteer):
+    assert Place("city", "Austin", "Texas") in gazetteer.resolve("Austin, TX")
+
+  def test_city_followed_by_state_is_not_that_state(self, gazetteer):
+    places = gazetteer.resolve("Washington, DC")
+    assert Place("city", "Washington", "District of Columbia") in places
+    assert Place("state", "Washington", "Washington") not in places
+
+  def test_lowercase_words_are_not_state_abbreviations(self, gazetteer):
+    assert gazetteer.resolve("remote in or near me") == []
+
+  def test_normalize_state(self, gazetteer):
+    assert gazetteer.normalize_state("NY") == "New York"
+    assert gazetteer.normalize_state("new jersey") == "New Jersey"
+    assert gazetteer.normalize_state("Brooklyn") is None
+
+  def test_index_is_rebuilt_when_source_changes(self, tmp_path):
+    source = tmp_path / "fixed_data.py"
+    source.write_text("states = set(['Ohio'])\nstate_ids = set(['OH'])\n"
+                      "counties = set([])\ncities = set(['Akron'])\n")
+    index = str(tmp_path / "index.pickle")
+    assert load_gazetteer(index, str(source)).state_ids == {"OH": "Ohio"}
+    source.write_text("states = set(['Iowa'])\nstate_ids = set(['IA'])\n"
+                      "counties = set([])\ncities = set([])\n")
+    assert load_gazetteer(index, str(source)).state_ids == {"IA": "Iowa"}
+
+  def test_location_states_criteria(self, gazetteer, monkeypatch):
+    monkeypatch.setattr(gazetteer_module, "_gazetteer", gazetteer)
+    criteria = {"location_whitelist": [], "location_states": ["NY"]}
+    assert location_match("Albany, NY", criteria)
+    assert location_match("New York", criteria)
+    assert not location_match("Newark, NJ", criteria)
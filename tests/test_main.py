@@ -0,0 +1,79 @@
+import json
+
+from src import main as main_module
+
+api_definitions = {
+    "board-api": {
+        "request": {"type": "get"},
+        "response": {
+            "root": "jobs",
+            "job_format": {"title": "title", "url": "url",
+                           "description": "content", "location": "location"},
+        },
+    },
+}
+boards = [{"adapter": "board-api", "board_uri": "https://example.com/jobs",
+           "company_name": "Example"}]
+data = {"jobs": [
+    {"title": "Software Engineer", "url": "https://example.com/1",
+     "content": "2+ years of experience", "location": "New York, NY"},
+    {"title": "Designer", "url": "https://example.com/2",
+     "content": "1+ years of experience", "location": "Boston, MA"},
+]}
+
+
+def write_config(tmp_path, profiles):
+  (tmp_path / "src").mkdir()
+  (tmp_path / "src" / "api_definitions.json").write_text(
+      json.dumps(api_definitions))
+  (tmp_path / "src" / "boards.json").write_text(json.dumps(boards))
+  paths = []
+  for name, criteria in profiles.items():
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps(criteria))
+    paths.append(str(path))
+  return paths
+
+
+def fake_fetch_boards(boards, **kwargs):
+  for api, api_def in boards:
+    yield api, api_def, data, None
+
+
+class TestMain:
+  def test_multiple_profiles(self, monkeypatch, tmp_path):
+    paths = write_config(tmp_path, {
+        "engineers": {"location_whitelist": ["new york"],
+                      "role_terms": ["engineer"],
+                      "max_years_of_experience": 3},
+        "designers": {"location_whitelist": ["boston"],
+                      "role_terms": ["designer"],
+                      "max_years_of_experience": 3},
+    })
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_module, "fetch_boards", fake_fetch_boards)
+
+    main_module.main(["--profile", paths[0], "--profile", paths[1]])
+    engineers = (tmp_path / "jobs.engineers.rss").read_text()
+    designers = (tmp_path / "jobs.designers.rss").read_text()
+    assert "https://example.com/1" in engineers
+    assert "https://example.com/2" not in engineers
+    assert "https://example.com/2" in designers
+    assert "https://example.com/1" not in designers
+
+  def test_workers_ignored_on_one_cpu(self, monkeypatch, tmp_path):
+    write_config(tmp_path, {"criteria": {
+        "location_whitelist": ["new york"], "role_terms": ["engineer"],
+        "max_years_of_experience": 3}})
+    (tmp_path / "src" / "criteria.json").write_text(
+        (tmp_path / "criteria.json").read_text())
+    monkeypatch.chdir(tmp_path)
+
+    def create_parse_pool(workers, criteria):
+      raise AssertionError("no pool on one CPU")
+    monkeypatch.setattr(main_module, "fetch_boards", fake_fetch_boards)
+    monkeypatch.setattr(main_module, "create_parse_pool", create_parse_pool)
+    monkeypatch.setattr(main_module.os, "cpu_count", lambda: 1)
+
+    main_module.main(["--workers", "2"])
+    assert "https://example.com/1" in (tmp_path / "jobs.rss").read_text()
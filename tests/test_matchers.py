@@ -0,0 +1,59 @@
+import random
+import re
+
+import pytest
+
+from src.matchers import (NUMBER_WORDS, YEARS_OF_EXPERIENCE_PATTERNS,
+                          TermMatcher, extract_years_of_experience)
+
+terms = ["engineer", "engineering", "Software Engineer", "software", "eng",
+         "c++", "node.js", "full stack", "Engineer", "ware en", ""]
+words = ["engineer", "engineering", "software", "c++", "node.js", "full",
+         "stack", "fullstack", "softwar", "enginee", "data", "x"]
+
+
+class TestTermMatcher:
+  @pytest.mark.parametrize("threshold", [1, 1000])
+  def test_matches_per_term_substring_check(self, monkeypatch, threshold):
+    monkeypatch.setattr(TermMatcher, "SCAN_THRESHOLD", threshold)
+    matcher = TermMatcher(terms)
+    rng = random.Random(0)
+    for _ in range(2000):
+      text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+      expected = set(term for term in terms if term.lower() in text)
+      assert set(matcher.find(text)) == expected, text
+
+  def test_no_terms(self):
+    assert TermMatcher([]).find("software engineer") == []
+
+
+def search_each_pattern(text):
+  for pattern in YEARS_OF_EXPERIENCE_PATTERNS:
+    match = re.search(pattern, text)
+    if match:
+      return NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+
+
+class TestYearsOfExperience:
+  @pytest.mark.parametrize("text,expected", [
+      ("3 years of experience, 10+ years preferred", 10),
+      ("minimum of 4 years", 4),
+      ("at least 2-3 years", 2),
+      ("≥5 years", 5),
+      ("three years of experience", 3),
+      ("5-7 yrs exp", 5),
+      ("Years of experience: not listed", None),
+      ("call our phone 2 years", 2),
+  ])
+  def test_examples(self, text, expected):
+    assert extract_years_of_experience(text) == expected
+
+  def test_matches_pattern_priority_order(self):
+    tokens = ["5", "10", "-", "+", " ", "  ", "years", "yrs", "year", "yr",
+              "of", "experience", "minimum", "at", "least", "three", "one",
+              ">", "≥", "\n", "X", ",", "2-4", "Years", "phone", "fo"]
+    rng = random.Random(0)
+    for _ in range(20000):
+      text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 14)))
+      assert extract_years_of_experience(text) == search_each_pattern(text), \
+          repr(text)
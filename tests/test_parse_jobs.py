@@ -0,0 +1,143 @@
+from src.criteria import compile_criteria
+from src.parse import (create_parse_pool, parse_job, parse_jobs,
+                       parse_jobs_for_profiles)
+from src.parse_stats import ParseJobsStats
+from src.store import JobStore
+
+criteria = {
+    "location_whitelist": ["new york", "boston"],
+    "role_terms": ["engineer", "developer"],
+    "title_blacklist": ["senior"],
+    "max_years_of_experience": 3,
+}
+api_definition = {
+    "response": {
+        "root": "jobs",
+        "job_format": {"title": "title", "url": "url",
+                       "description": "content", "location": "location"},
+    },
+}
+
+
+def make_jobs(count):
+  titles = ["Software Engineer", "Senior Engineer", "Web Developer", "Designer"]
+  contents = ["2+ years of experience", "5+ years", "at least 1 year",
+              "Our Boston office", "no requirements listed"]
+  locations = ["New York, NY", "Remote", {"city": "Boston"}, []]
+  return {"jobs": [
+      {"title": titles[i % len(titles)], "url": f"https://example.com/{i}",
+       "content": contents[i % len(contents)],
+       "location": locations[i % len(locations)]}
+      for i in range(count)]}
+
+
+def without_json_str(jobs):
+  return [{k: v for k, v in job.to_dict().items()
+           if k not in ("json_str", "created_at")}
+          for job in jobs]
+
+
+class TestParseJobs:
+  def test_lean_mode_gives_same_verdicts_without_json_str(self):
+    data = make_jobs(40)
+    full = parse_jobs(data, api_definition, "Example", criteria)
+    lean = parse_jobs(data, api_definition, "Example", criteria, lean=True)
+    assert all(job.json_str for job in full["failed"])
+    assert not any(job.json_str for job in lean["failed"] + lean["passed"])
+    assert without_json_str(lean["passed"]) == without_json_str(full["passed"])
+    assert without_json_str(lean["failed"]) == without_json_str(full["failed"])
+
+  def test_process_pool_matches_serial(self):
+    data = make_jobs(60)
+    serial = parse_jobs(data, api_definition, "Example", criteria)
+    with create_parse_pool(2, criteria) as pool:
+      pooled = parse_jobs(data, api_definition, "Example", criteria,
+                          executor=pool)
+    assert without_json_str(pooled["passed"]) == \
+        without_json_str(serial["passed"])
+    assert without_json_str(pooled["failed"]) == \
+        without_json_str(serial["failed"])
+
+  def test_failed_jobs_go_to_on_failed(self, tmp_path):
+    data = make_jobs(30)
+    loaded = parse_jobs(data, api_definition, "Example", criteria)
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    # The second run with the store reuses every verdict
+    for kwargs in ({}, {"store": store}, {"store": store}):
+      rejected = []
+      jobs = parse_jobs(iter(data["jobs"]), api_definition, "Example",
+                        criteria, on_failed=rejected.append, **kwargs)
+      assert jobs["failed"] == []
+      assert without_json_str(rejected) == without_json_str(loaded["failed"])
+      assert without_json_str(jobs["passed"]) == \
+          without_json_str(loaded["passed"])
+    store.close()
+
+  def test_streamed_jobs_match_loaded_response(self, tmp_path):
+    data = make_jobs(30)
+    loaded = parse_jobs(data, api_definition, "Example", criteria)
+    streamed = parse_jobs(iter(data["jobs"]), api_definition, "Example",
+                          criteria)
+    assert without_json_str(streamed["passed"]) == \
+        without_json_str(loaded["passed"])
+    assert without_json_str(streamed["failed"]) == \
+        without_json_str(loaded["failed"])
+
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    stored = parse_jobs(iter(data["jobs"]), api_definition, "Example",
+                        criteria, store=store)
+    store.close()
+    assert without_json_str(stored["passed"]) == \
+        without_json_str(loaded["passed"])
+
+
+class TestProfiles:
+  profiles = {
+      "default": criteria,
+      "boston": dict(criteria, location_whitelist=["boston"],
+                     title_blacklist=[]),
+      "senior": dict(criteria, role_terms=["designer", "engineer"],
+                     max_years_of_experience=10, title_blacklist=[]),
+  }
+
+  def test_same_as_one_run_per_profile(self):
+    data = make_jobs(40)
+    results = parse_jobs_for_profiles(data, api_definition, "Example",
+                                      self.profiles)
+    assert list(results) == list(self.profiles)
+    for name, profile in self.profiles.items():
+      single = parse_jobs(data, api_definition, "Example", profile)
+      assert without_json_str(results[name]["passed"]) == \
+          without_json_str(single["passed"])
+      assert without_json_str(results[name]["failed"]) == \
+          without_json_str(single["failed"])
+      expected_stats = ParseJobsStats(total=40)
+      for job in data["jobs"]:
+        parse_job(job, api_definition["response"]["job_format"], "Example",
+                  compile_criteria(profile), expected_stats)
+      expected_stats.passed_all_filters = len(single["passed"])
+      assert results[name]["stats"] == expected_stats
+
+  def test_failed_jobs_go_to_on_failed(self):
+    data = make_jobs(20)
+    loaded = parse_jobs_for_profiles(data, api_definition, "Example",
+                                     self.profiles)
+    rejected = {name: [] for name in self.profiles}
+    results = parse_jobs_for_profiles(
+        data, api_definition, "Example", self.profiles,
+        on_failed=lambda name, job: rejected[name].append(job))
+    for name in self.profiles:
+      assert results[name]["failed"] == []
+      assert without_json_str(rejected[name]) == \
+          without_json_str(loaded[name]["failed"])
+
+  def test_streamed(self):
+    data = make_jobs(20)
+    loaded = parse_jobs_for_profiles(data, api_definition, "Example",
+                                     self.profiles, lean=True)
+    streamed = parse_jobs_for_profiles(iter(data["jobs"]), api_definition,
+                                       "Example", self.profiles, lean=True)
+    for name in self.profiles:
+      assert without_json_str(streamed[name]["passed"]) == \
+          without_json_str(loaded[name]["passed"])
+      assert streamed[name]["stats"] == loaded[name]["stats"]
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from src.parse import get_json_key, parse_jobs
+from src.plans import AdapterPlan, compile_job_format
+
+adapter = {
+    "vars": {"board": "{{board}}", "region": "{{region}}"},
+    "request": {
+        "type": "post",
+        "headers": {"x-board": "{{board}}"},
+        "body": {"type": "raw", "content": {
+            "limit": 30, "filters": ["{{region}}", "all"],
+            "query": "board={{board}}&region={{region}}"}},
+    },
+    "response": {"root": "jobs", "job_format": {
+        "title": "title", "url": "links.self", "description": "content",
+        "location": "location.name", "created_at": "created?"}},
+}
+
+
+def round_trip_hydrate(api_definition, api_vars):
+  # What main.hydrate_api_definition did before adapter plans
+  definition_str = json.dumps(api_definition)
+  for var_name, var_placeholder in api_definition["vars"].items():
+    if var_name in api_vars:
+      definition_str = definition_str.replace(
+          var_placeholder, api_vars[var_name])
+  return json.loads(definition_str)
+
+
+class TestAdapterPlan:
+  @pytest.mark.parametrize("api_vars", [
+      {"board": "acme", "region": "us"}, {"board": "acme"}, {}])
+  def test_hydrate_matches_round_trip(self, api_vars):
+    plan = AdapterPlan(adapter)
+    assert plan.hydrate(api_vars) == round_trip_hydrate(adapter, api_vars)
+
+  def test_shares_parts_without_placeholders(self):
+    hydrated = AdapterPlan(adapter).hydrate({"board": "acme"})
+    assert hydrated["response"] is adapter["response"]
+    assert hydrated["request"] is not adapter["request"]
+    assert adapter["request"]["headers"]["x-board"] == "{{board}}"
+
+  def test_without_vars_returns_definition(self):
+    definition = {key: value for key, value in adapter.items()
+                  if key != "vars"}
+    assert AdapterPlan(definition).hydrate({"board": "acme"}) is definition
+
+
+class TestJobFormat:
+  job = {"title": "Engineer", "links": {"self": "https://example.com/1"},
+         "content": "text", "location": {"name": "New York"}}
+
+  def test_extract_matches_get_json_key(self):
+    job = dict(self.job, created="2024-01-01T00:00:00.000Z")
+    job_format = adapter["response"]["job_format"]
+    extracted = compile_job_format(job_format).extract(job)
+    assert extracted == {
+        name: get_json_key(job, path.rstrip("?"))
+        for name, path in job_format.items()}
+
+  def test_optional_field_may_be_missing(self):
+    extracted = compile_job_format(
+        adapter["response"]["job_format"]).extract(self.job)
+    assert extracted["created_at"] is None
+
+  def test_required_field_missing(self):
+    job = dict(self.job, links={})
+    with pytest.raises(ValueError, match="Key not found: self"):
+      compile_job_format(adapter["response"]["job_format"]).extract(job)
+
+  def test_compiled_once(self):
+    assert compile_job_format(dict(adapter["response"]["job_format"])) is \
+        compile_job_format(adapter["response"]["job_format"])
+
+  @pytest.mark.parametrize("missing", [
+      "created", "title", "content", "location"])
+  def test_parse_jobs_without_optional_field(self, missing):
+    criteria = {"location_whitelist": ["new york"],
+                "role_terms": ["engineer"], "title_blacklist": [],
+                "max_years_of_experience": 3}
+    definition = {"response": {"root": "jobs", "job_format": {
+        "title": "title?", "url": "links.self", "description": "content?",
+        "location": "location.name?", "created_at": "created?"}}}
+    job = {key: value for key, value in self.job.items() if key != missing}
+    jobs = parse_jobs({"jobs": [job]}, definition, "Example", criteria)
+    [job] = jobs["failed"]
+    assert job.url == "https://example.com/1"
+    assert job.created_at
+    if missing == "location":
+      assert job.location == ""
+    elif missing == "title":
+      assert job.title is None
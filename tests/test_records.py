@@ -0,0 +1,70 @@
+import json
+
+from src.debug_output import FailedJobWriter
+from src.records import (FilterFailure, JobRecord, failed_reason,
+                         parse_failed_reason, verdicts_from_dicts,
+                         verdicts_to_dicts)
+from src.rss import convert_to_rss
+
+
+def make_record(**kwargs):
+  fields = dict(title="Engineer", url="https://example.com/1",
+                description="Build things", location="New York",
+                created_at="2024-01-02T10:00:00", company="Example",
+                role=["engineer"], years_of_experience=2)
+  fields.update(kwargs)
+  return JobRecord(**fields)
+
+
+class TestJobRecord:
+  def test_failed_reason_in_filter_order(self):
+    failures = FilterFailure.UNKNOWN_YEARS | FilterFailure.LOCATION
+    assert failed_reason(failures) == (
+        "zero location matches anywhere in job Number of years of "
+        "experience required not known/not found")
+    assert parse_failed_reason(failed_reason(failures)) == failures
+    assert failed_reason(FilterFailure(0)) == ""
+
+  def test_dict_round_trip(self):
+    record = make_record(failures=FilterFailure.ROLE, json_str="{}",
+                         extra={"team": "Platform"}, updated_at="yesterday")
+    job = record.to_dict()
+    assert job["failed_reason"] == "No matching title found anywhere in job"
+    assert job["team"] == "Platform"
+    assert JobRecord.from_dict(json.loads(json.dumps(job))) == record
+
+  def test_verdicts_keep_failures_as_a_number(self):
+    record = make_record(failures=FilterFailure.ROLE | FilterFailure.LOCATION)
+    parsed = verdicts_to_dicts({"passed": [], "failed": [record]})
+    parsed["failed"][0]["failed_reason"] = "reworded since"
+    assert verdicts_from_dicts(parsed)["failed"] == [record]
+
+  def test_passed_has_no_failed_reason(self):
+    record = make_record()
+    assert record.passed
+    assert "failed_reason" not in record.to_dict()
+    assert "json_str" not in record.to_dict()
+
+  def test_from_fields(self):
+    record = JobRecord.from_fields({"title": "Engineer", "team": "Platform"})
+    assert record.title == "Engineer"
+    assert record.extra == {"team": "Platform"}
+    assert JobRecord.from_fields({"title": "Engineer"}).extra is None
+
+  def test_rss_same_as_dict(self):
+    records = [make_record(), make_record(url="https://example.com/2",
+                                          updated_at="2024-01-03")]
+    assert convert_to_rss(records).split("<lastBuildDate>")[0] == \
+        convert_to_rss([record.to_dict() for record in records]).split(
+            "<lastBuildDate>")[0]
+
+  def test_debug_output(self, tmp_path):
+    path = str(tmp_path / "debug.ndjson")
+    with FailedJobWriter(path, raw_chars=0) as writer:
+      writer.write_jobs([make_record(failures=FilterFailure.LOCATION,
+                                     json_str="{}")], profile="boston")
+    with open(path) as f:
+      [job] = [json.loads(line) for line in f]
+    assert job["failed_reason"] == "zero location matches anywhere in job"
+    assert job["profile"] == "boston"
+    assert "json_str" not in job
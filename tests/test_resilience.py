@@ -0,0 +1,241 @@
+import random
+
+import pytest
+import requests
+
+from src.resilience import (CircuitBreaker, DeadlineExceeded, FetchGuards,
+                            ResilientRequester, TokenBucket, backoff_delay,
+                            parse_retry_after)
+from src.sessions import http_config
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+    self.sleeps = []
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+class FakeResponse:
+  def __init__(self, status_code, headers=None):
+    self.status_code = status_code
+    self.headers = headers or {}
+    self.closed = False
+
+  def close(self):
+    self.closed = True
+
+
+class Requester:
+  # Returns (or raises) the given outcomes in order
+  def __init__(self, *outcomes):
+    self.outcomes = list(outcomes)
+    self.sent = 0
+
+  def request(self, method, url, **kwargs):
+    self.sent += 1
+    outcome = self.outcomes.pop(0)
+    if isinstance(outcome, Exception):
+      raise outcome
+    return outcome
+
+
+def make_requester(outcomes, deadline=None, **config):
+  clock = FakeClock()
+  guards = FetchGuards(clock=clock, sleep=clock.sleep)
+  requester = Requester(*outcomes)
+  config = http_config({"http": dict({"rate_limit": 0}, **config)})
+  return (ResilientRequester(requester, "https://jobs.example.com/a", config,
+                             fetch_guards=guards, rng=random.Random(0),
+                             deadline=deadline),
+          requester, clock)
+
+
+class TestRetries:
+  def test_retries_server_errors(self):
+    first = FakeResponse(503)
+    resilient, requester, clock = make_requester(
+        [first, requests.ConnectionError("reset"), FakeResponse(200)])
+    assert resilient.request("get", "https://jobs.example.com/a").status_code \
+        == 200
+    assert requester.sent == 3
+    assert first.closed
+    assert len(clock.sleeps) == 2
+
+  def test_honors_retry_after(self):
+    resilient, _, clock = make_requester(
+        [FakeResponse(429, {"Retry-After": "7"}), FakeResponse(200)])
+    resilient.request("get", "https://jobs.example.com/a")
+    assert clock.sleeps == [7]
+    assert resilient.limiter.rate == 0
+
+  def test_gives_up_on_long_retry_after(self):
+    resilient, requester, clock = make_requester(
+        [FakeResponse(429, {"Retry-After": "3600"})], max_backoff=30)
+    assert resilient.request("get", "https://jobs.example.com/a").status_code \
+        == 429
+    assert requester.sent == 1
+    # The host stays paused for at most max_backoff
+    assert resilient.limiter.paused_until == 30
+
+  def test_raises_last_error(self):
+    resilient, requester, _ = make_requester(
+        [requests.Timeout("slow")] * 3, retries=2)
+    with pytest.raises(requests.Timeout):
+      resilient.request("get", "https://jobs.example.com/a")
+    assert requester.sent == 3
+
+  def test_client_errors_are_not_retried(self):
+    resilient, requester, _ = make_requester([FakeResponse(404)])
+    assert resilient.request("get", "https://jobs.example.com/a").status_code \
+        == 404
+    assert requester.sent == 1
+
+
+class TestDeadline:
+  def test_timeouts_cut_to_time_left(self):
+    resilient, _, clock = make_requester([FakeResponse(200)], deadline=5)
+    sent = {}
+    request = resilient.requester.request
+    resilient.requester.request = lambda method, url, **kwargs: (
+        sent.update(kwargs) or request(method, url, **kwargs))
+    clock.now = 2
+    resilient.request("get", "https://jobs.example.com/a", timeout=(10, 30),
+                      stream=True)
+    assert sent["timeout"] == (3, 3)
+
+  def test_no_retry_past_deadline(self):
+    resilient, requester, clock = make_requester(
+        [FakeResponse(503, {"Retry-After": "4"}), FakeResponse(200)],
+        deadline=3)
+    assert resilient.request("get", "https://jobs.example.com/a",
+                             stream=True).status_code == 503
+    assert requester.sent == 1
+    clock.now = 3
+    with pytest.raises(DeadlineExceeded):
+      resilient.request("get", "https://jobs.example.com/a")
+
+  def test_body_read_within_deadline(self):
+    resilient, _, _ = make_requester([], deadline=10)
+
+    class BodyResponse(FakeResponse):
+      def iter_content(self, chunk_size):
+        yield b'{"jobs": '
+        yield b'[1, 2]}'
+
+    resilient.requester = Requester(BodyResponse(200))
+    response = resilient.request("get", "https://jobs.example.com/a")
+    assert response.status_code == 200
+    assert response.content == b'{"jobs": [1, 2]}'
+    assert response.json() == {"jobs": [1, 2]}
+
+  def test_slow_body(self):
+    resilient, _, clock = make_requester([], deadline=10)
+
+    class TricklingResponse(FakeResponse):
+      url = "https://jobs.example.com/a"
+
+      def iter_content(self, chunk_size):
+        for _ in range(100):
+          clock.now += 1
+          yield b" "
+
+    resilient.requester = Requester(TricklingResponse(200))
+    with pytest.raises(DeadlineExceeded):
+      resilient.request("get", "https://jobs.example.com/a")
+
+
+class TestCircuitBreaker:
+  def test_half_open_failure_reopens(self):
+    clock = FakeClock()
+    breaker = CircuitBreaker(3, 10, clock=clock)
+    for _ in range(3):
+      assert breaker.allow()
+      breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+  def test_state_survives_across_runs(self, tmp_path):
+    path = str(tmp_path / "breakers.json")
+    config = http_config({"http": {"breaker_threshold": 2,
+                                   "breaker_cooldown": 300}})
+    first_run = FetchGuards(clock=FakeClock())
+    first_run.breaker("https://a.example.com", config).record_failure()
+    first_run.breaker("https://b.example.com", config).record_success()
+    first_run.save(path)
+
+    # A new process with a different clock
+    clock = FakeClock()
+    clock.now = 1000
+    second_run = FetchGuards(clock=clock)
+    second_run.load(path)
+    breaker = second_run.breaker("https://a.example.com", config)
+    assert breaker.allow()
+    breaker.record_failure()
+    second_run.save(path)
+
+    third_run = FetchGuards(clock=FakeClock())
+    third_run.load(path)
+    breaker = third_run.breaker("https://a.example.com", config)
+    assert not breaker.allow()
+    assert 299 < breaker.retry_in() <= 300
+    assert third_run.breaker("https://b.example.com", config).allow()
+
+  def test_missing_or_corrupt_state(self, tmp_path):
+    path = tmp_path / "breakers.json"
+    guards = FetchGuards()
+    guards.load(str(path))
+    path.write_text("not json")
+    guards.load(str(path))
+    assert guards.breaker("https://a.example.com", http_config({})).allow()
+
+
+class TestTokenBucket:
+  def test_rate(self):
+    clock = FakeClock()
+    bucket = TokenBucket(2, 2, clock=clock, sleep=clock.sleep)
+    for _ in range(6):
+      bucket.acquire()
+    # Two in the burst, then one every half second
+    assert clock.sleeps == [0.5] * 4
+
+  def test_slows_down_and_recovers(self):
+    bucket = TokenBucket(10, 1)
+    for _ in range(10):
+      bucket.slow_down()
+    assert bucket.rate == 10 / 16
+    for _ in range(20):
+      bucket.speed_up()
+    assert bucket.rate == 10
+
+
+class TestBackoff:
+  def test_jittered_and_capped(self):
+    rng = random.Random(0)
+    delays = [backoff_delay(attempt, 1, 5, rng=rng) for attempt in range(10)]
+    assert all(0 <= delay <= min(5, 2 ** attempt)
+               for attempt, delay in enumerate(delays))
+    assert len(set(delays)) == len(delays)
+    assert backoff_delay(0, 1, 5, retry_after=4) >= 4
+    assert backoff_delay(0, 1, 5, retry_after=6) is None
+
+  def test_parse_retry_after(self):
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Thu, 01 Jan 1970 00:01:00 GMT", now=0) == 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,52 @@
+import os
+import re
+
+import pytest
+
+from src.rss import RssWriter, convert_to_rss, read_rss_items
+
+
+def make_jobs(start, count):
+  return [{"title": f"Engineer <{i}> & co", "url": f"https://example.com/{i}",
+           "description": "<p>Build things</p>", "company": "Example",
+           "created_at": f"2024-01-{i + 1:02d}T10:00:00"}
+          for i in range(start, start + count)]
+
+
+def without_build_date(feed):
+  return re.sub("<lastBuildDate>.*?</lastBuildDate>", "", feed)
+
+
+class TestRssWriter:
+  def test_matches_convert_to_rss(self, tmp_path):
+    path = str(tmp_path / "jobs.rss")
+    jobs = make_jobs(0, 3)
+    with RssWriter(path) as feed:
+      feed.add_jobs(jobs)
+    with open(path, encoding="utf-8") as f:
+      written = f.read()
+    assert without_build_date(written) == \
+        without_build_date(convert_to_rss(jobs))
+    assert not os.path.exists(path + ".partial")
+
+  def test_incremental_keeps_old_items_up_to_the_cap(self, tmp_path):
+    path = str(tmp_path / "jobs.rss")
+    with RssWriter(path) as feed:
+      feed.add_jobs(make_jobs(0, 3))
+    with RssWriter(path, max_items=4, incremental=True) as feed:
+      feed.add_jobs(make_jobs(2, 2))
+    links = [item["link"] for item in read_rss_items(path)]
+    assert links == ["https://example.com/2", "https://example.com/3",
+                     "https://example.com/0", "https://example.com/1"]
+
+  def test_failed_run_leaves_the_feed_alone(self, tmp_path):
+    path = str(tmp_path / "jobs.rss")
+    with RssWriter(path) as feed:
+      feed.add_jobs(make_jobs(0, 1))
+    with pytest.raises(RuntimeError):
+      with RssWriter(path) as feed:
+        feed.add_jobs(make_jobs(5, 1))
+        raise RuntimeError("board failed")
+    assert [item["link"] for item in read_rss_items(path)] == \
+        ["https://example.com/0"]
+    assert not os.path.exists(path + ".partial")
@@ -0,0 +1,121 @@
+import gzip
+import http.client
+import os
+
+import pytest
+
+from src.server import FeedServer
+
+FEED = "<rss><channel><title>Jobs</title></channel></rss>"
+
+
+@pytest.fixture
+def server():
+  server = FeedServer(port=0).start()
+  yield server
+  server.stop()
+
+
+def get(server, path="/", method="GET", **headers):
+  connection = http.client.HTTPConnection("127.0.0.1", server.port,
+                                          timeout=5)
+  connection.request(method, path,
+                     headers={k.replace("_", "-"): v
+                              for k, v in headers.items()})
+  response = connection.getresponse()
+  body = response.read()
+  connection.close()
+  return response, body
+
+
+class TestFeedServer:
+  def test_no_feed_yet(self, server):
+    response, _ = get(server)
+    assert response.status == 503
+
+  def test_unknown_path(self, server):
+    server.publish(FEED)
+    response, _ = get(server, "/favicon.ico")
+    assert response.status == 404
+
+  def test_serves_feed(self, server):
+    server.publish(FEED, last_modified=1700000000)
+    response, body = get(server, "/jobs.rss")
+    assert response.status == 200
+    assert body == FEED.encode("utf-8")
+    assert response.getheader("ETag").startswith('"')
+    assert response.getheader("Last-Modified") == \
+        "Tue, 14 Nov 2023 22:13:20 GMT"
+    assert response.getheader("Content-Type").startswith(
+        "application/rss+xml")
+
+  def test_head_has_no_body(self, server):
+    server.publish(FEED)
+    response, body = get(server, method="HEAD")
+    assert response.status == 200
+    assert response.getheader("Content-Length") == str(len(FEED))
+    assert body == b""
+
+  def test_gzip(self, server):
+    server.publish(FEED)
+    plain, _ = get(server)
+    response, body = get(server, Accept_Encoding="gzip, deflate")
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == FEED.encode("utf-8")
+    assert response.getheader("ETag") == plain.getheader("ETag")
+    assert response.getheader("Vary") == "Accept-Encoding"
+
+  def test_if_none_match(self, server):
+    server.publish(FEED)
+    response, _ = get(server)
+    etag = response.getheader("ETag")
+    response, body = get(server, If_None_Match=etag)
+    assert response.status == 304
+    assert body == b""
+    response, _ = get(server, If_None_Match=f'W/{etag}, "other"')
+    assert response.status == 304
+    response, _ = get(server, If_None_Match='"other"')
+    assert response.status == 200
+
+  def test_if_modified_since(self, server):
+    server.publish(FEED, last_modified=1700000000)
+    response, _ = get(server,
+                      If_Modified_Since="Tue, 14 Nov 2023 22:13:20 GMT")
+    assert response.status == 304
+    response, _ = get(server,
+                      If_Modified_Since="Tue, 14 Nov 2023 22:13:19 GMT")
+    assert response.status == 200
+    response, _ = get(server, If_Modified_Since="not a date")
+    assert response.status == 200
+
+  def test_new_version(self, server):
+    server.publish(FEED, last_modified=1700000000)
+    old, _ = get(server)
+    server.publish(FEED.replace("Jobs", "New jobs"), last_modified=1700000060)
+    response, body = get(server, If_None_Match=old.getheader("ETag"))
+    assert response.status == 200
+    assert b"New jobs" in body
+    assert response.getheader("ETag") != old.getheader("ETag")
+
+  def test_same_body_keeps_version(self, server):
+    server.publish(FEED, last_modified=1700000000)
+    version = server.version
+    server.publish(FEED, last_modified=1700000060)
+    assert server.version is version
+
+  def test_load(self, server, tmp_path):
+    path = str(tmp_path / "feed.rss")
+    with open(path, "w") as f:
+      f.write(FEED)
+    assert server.load(path)
+    assert not server.load(path)
+    with open(path, "w") as f:
+      f.write(FEED.replace("Jobs", "More jobs"))
+    os.utime(path, ns=(0, 10 ** 18))
+    assert server.load(path)
+    _, body = get(server)
+    assert b"More jobs" in body
+
+  def test_load_missing_file(self, server, tmp_path):
+    assert not server.load(str(tmp_path / "missing.rss"))
+    assert server.version is None
@@ -0,0 +1,51 @@
+import json
+import os
+
+from src.criteria import compile_criteria
+from src.gazetteer import get_gazetteer, loaded_gazetteer
+from src.snapshot import load_snapshot, save_snapshot
+
+boards = [({"name": "Example", "adapter": "greenhouse"},
+           {"request": {"url": "https://example.com/jobs"}})]
+criteria = {"location_whitelist": ["new york"], "location_states": ["CA"],
+            "role_terms": ["engineer"], "max_years_of_experience": 3}
+
+
+def write_configs(tmp_path):
+  paths = []
+  for name in ("api_definitions", "boards", "criteria"):
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps({"name": name}))
+    paths.append(str(path))
+  return tuple(paths)
+
+
+class TestSnapshot:
+  def test_round_trip(self, tmp_path):
+    paths = write_configs(tmp_path)
+    path = str(tmp_path / "config.pickle")
+    get_gazetteer()
+    compiled = compile_criteria(criteria)
+    save_snapshot(boards, compiled, path, paths)
+    snapshot = load_snapshot(path, paths)
+    assert snapshot.boards == boards
+    assert snapshot.criteria.source == criteria
+    assert snapshot.criteria.location_states == compiled.location_states
+    assert snapshot.gazetteer is loaded_gazetteer()
+
+  def test_invalidated_by_config_change(self, tmp_path):
+    paths = write_configs(tmp_path)
+    path = str(tmp_path / "config.pickle")
+    save_snapshot(boards, compile_criteria(criteria), path, paths)
+    assert load_snapshot(path, paths) is not None
+    stat = os.stat(paths[1])
+    os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert load_snapshot(path, paths) is None
+
+  def test_missing_or_corrupt(self, tmp_path):
+    paths = write_configs(tmp_path)
+    path = tmp_path / "config.pickle"
+    assert load_snapshot(str(path), paths) is None
+    path.write_bytes(b"not a pickle")
+    assert load_snapshot(str(path), paths) is None
+    assert load_snapshot(str(path), paths + (str(tmp_path / "gone"),)) is None
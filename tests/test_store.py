@@ -0,0 +1,87 @@
+import sqlite3
+
+from src import records
+from src.parse import parse_jobs
+from src.records import FilterFailure
+from src.store import JobStore
+
+criteria = {
+    "location_whitelist": ["new york"],
+    "role_terms": ["engineer"],
+    "title_blacklist": ["senior"],
+    "max_years_of_experience": 3,
+}
+api_definition = {
+    "response": {
+        "root": "jobs",
+        "job_format": {"title": "title", "url": "url",
+                       "description": "content", "location": "location"},
+    },
+}
+
+
+def make_job(i, title="Software Engineer"):
+  return {"title": title, "url": f"https://jobs.example.com/{i}",
+          "content": "2+ years of experience", "location": "New York, NY"}
+
+
+class TestJobStore:
+  def test_unchanged_jobs_reuse_verdict_and_first_seen(self, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    data = {"jobs": [make_job(1), make_job(2, "Senior Engineer")]}
+    first = parse_jobs(data, api_definition, "Example", criteria, store=store)
+
+    data["jobs"].append(make_job(3))
+    second = parse_jobs(data, api_definition, "Example", criteria, store=store)
+
+    assert [job.url for job in second["passed"]] == [
+        "https://jobs.example.com/1", "https://jobs.example.com/3"]
+    assert second["passed"][0].created_at == first["passed"][0].created_at
+    assert second["failed"][0].failures == first["failed"][0].failures
+    assert second["failed"][0].failed_reason == \
+        first["failed"][0].failed_reason
+
+  def test_changed_criteria_refilters(self, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    data = {"jobs": [make_job(1)]}
+    parse_jobs(data, api_definition, "Example", criteria, store=store)
+    stricter = dict(criteria, max_years_of_experience=1)
+    result = parse_jobs(data, api_definition, "Example", stricter, store=store)
+    assert result["passed"] == []
+
+  def test_duplicates_are_skipped(self, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    data = {"jobs": [make_job(1), make_job(1)]}
+    result = parse_jobs(data, api_definition, "Example", criteria, store=store)
+    assert len(result["passed"]) == 1
+
+  def test_failures_survive_reworded_reasons(self, tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    data = {"jobs": [make_job(1, "Senior Engineer")]}
+    parse_jobs(data, api_definition, "Example", criteria, store=store)
+    monkeypatch.setitem(records.FAILURE_REASONS,
+                        FilterFailure.TITLE_BLACKLIST, "Blacklisted title")
+    stored = store.lookup("Example", "https://jobs.example.com/1")
+    assert stored.job.failures == FilterFailure.TITLE_BLACKLIST
+
+  def test_adds_failures_to_old_stores(self, tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE jobs (
+          company TEXT NOT NULL, url TEXT NOT NULL,
+          content_hash TEXT NOT NULL, verdict_key TEXT NOT NULL,
+          first_seen TEXT NOT NULL, last_seen TEXT NOT NULL,
+          passed INTEGER NOT NULL, job TEXT NOT NULL, stats TEXT NOT NULL,
+          PRIMARY KEY (company, url))""")
+    connection.execute(
+        "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("Example", "https://jobs.example.com/1", "hash", "key", "then",
+         "then", 0, '{"failed_reason": "No matching title found anywhere '
+         'in job"}', "{}"))
+    connection.commit()
+    connection.close()
+
+    store = JobStore(path)
+    stored = store.lookup("Example", "https://jobs.example.com/1")
+    assert stored.job.failures == FilterFailure.ROLE
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src.stream_json import iter_json_array
+
+
+def chunks(text, size):
+  data = text.encode("utf-8")
+  return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterJsonArray:
+  document = {
+      "meta": {"jobs": "not these", "note": "quotes \" and ] brackets }"},
+      "data": {"set": {"results": [
+          {"title": "Engineer", "location": {"places": ["New York, NY"]}},
+          {"title": "Développeur ≥ 3 years", "tags": []},
+          42, -2500.5e-3, None, "plain",
+      ]}},
+      "total": 5,
+  }
+
+  @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+  def test_yields_items_at_root_across_chunk_boundaries(self, size):
+    text = json.dumps(self.document, ensure_ascii=False, indent=2)
+    items = list(iter_json_array(chunks(text, size), "data.set.results"))
+    assert items == self.document["data"]["set"]["results"]
+
+  def test_top_level_list(self):
+    assert list(iter_json_array(['[1, {"a": [2]}]'], "")) == [1, {"a": [2]}]
+    assert list(iter_json_array(["[ ]"], "")) == []
+
+  def test_missing_key_raises_like_get_json_key(self):
+    with pytest.raises(ValueError, match="Key not found: jobs"):
+      list(iter_json_array([b'{"other": [1]}'], "jobs"))
+
+  def test_items_are_yielded_before_the_body_ends(self):
+    def body():
+      yield b'{"jobs": [{"id": 1}, '
+      raise AssertionError("read past the first job")
+    assert next(iter_json_array(body(), "jobs")) == {"id": 1}
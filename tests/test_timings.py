@@ -0,0 +1,76 @@
+import json
+import pickle
+
+from src import parse
+from src.criteria import compile_criteria
+from src.parse_stats import ParseJobsStats
+from src.timings import Histogram, Timings
+
+
+class TestTimings:
+  def test_histogram_quantiles_and_merge(self):
+    first = Histogram()
+    for seconds in (0.001, 0.002, 0.003):
+      first.observe(seconds)
+    second = Histogram()
+    second.observe(2.0)
+    first.merge(second)
+    assert first.count == 4
+    assert first.max == 2.0
+    assert first.quantile(0.5) == 0.0025
+    assert first.quantile(1.0) == 2.0
+    assert first.cumulative()[-1] == 4
+
+  def test_stopwatch_only_records_when_detailed(self):
+    timings = Timings()
+    clock = timings.stopwatch("filter_seconds", "filter")
+    clock.lap("role")
+    clock.stop()
+    assert timings.histograms == {}
+
+    timings.detailed = True
+    clock = timings.stopwatch("filter_seconds", "filter")
+    clock.lap("role")
+    clock.lap("years")
+    clock.stop()
+    assert sorted(labels for _, labels in timings.histograms) == \
+        [(("filter", "role"),), (("filter", "years"),)]
+
+  def test_take_survives_pickling_and_merges(self):
+    worker = Timings()
+    worker.observe("filter_seconds", 0.01, filter="role")
+    worker.count("downloaded_bytes", 100, host="a.example")
+    taken = pickle.loads(pickle.dumps(worker.take()))
+    assert worker.histograms == {} and worker.counters == {}
+
+    parent = Timings()
+    parent.count("downloaded_bytes", 50, host="a.example")
+    parent.merge(taken)
+    data = json.loads(parent.to_json())
+    assert data["counters"] == [{"name": "downloaded_bytes",
+                                 "labels": {"host": "a.example"},
+                                 "value": 150}]
+    assert data["histograms"][0]["count"] == 1
+
+  def test_prometheus_text(self):
+    timings = Timings()
+    timings.observe("fetch_page_seconds", 0.2, host='a"b')
+    timings.count("downloaded_bytes", 10)
+    text = timings.to_prometheus()
+    assert "# TYPE jobs_fetch_page_seconds histogram" in text
+    assert 'jobs_fetch_page_seconds_bucket{host="a\\"b",le="0.25"} 1' in text
+    assert 'jobs_fetch_page_seconds_bucket{host="a\\"b",le="+Inf"} 1' in text
+    assert 'jobs_fetch_page_seconds_count{host="a\\"b"} 1' in text
+    assert "jobs_downloaded_bytes_total 10" in text
+
+  def test_parse_job_laps(self, monkeypatch):
+    timings = Timings(detailed=True)
+    monkeypatch.setattr(parse, "timings", timings)
+    criteria = compile_criteria({"location_whitelist": ["new york"],
+                                 "role_terms": ["engineer"],
+                                 "max_years_of_experience": 3})
+    parse.parse_job({"title": "Engineer", "location": {"city": "New York"}},
+                    {"title": "title", "location": "location"}, "Example",
+                    criteria, ParseJobsStats())
+    steps = [labels[0][1] for _, labels in timings.histograms]
+    assert steps[:3] == ["extract", "flatten", "location"]